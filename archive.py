@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Архив результатов парсинга вместо полных JSON-копий после каждой загрузки
+
+Сегменты - файлы JSON Lines из сжатых кадров (zstd, если установлен
+zstandard, иначе gzip); каждый append дописывает в текущий сегмент один кадр.
+Строки кадра:
+    {"h": хэш, "r": инициатива}        - содержимое, хранится один раз
+    {"id": external_id, "t": время, "h": хэш}  - версия инициативы на момент t
+Версия пишется, только если содержимое изменилось с прошлой загрузки.
+
+Индекс (data/archive/index.db) хранит, где лежит каждое содержимое и
+историю версий, поэтому snapshot_at читает только нужные кадры.
+
+Запуск:
+    python archive.py stats
+    python archive.py compact --keep-days 90
+    python archive.py snapshot "2024-05-01 12:00" exports/federal_20240501.jsonl.gz
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+from collections import namedtuple, defaultdict
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = 'data/archive'
+
+# Новый сегмент начинается, когда текущий больше этого размера
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Строк в одном кадре при сжатии архива
+FRAME_LINES = 2000
+
+# Поля, которые меняются при каждом парсинге и не считаются изменением
+VOLATILE_FIELDS = ('parsed_at', 'created_date')
+
+AppendResult = namedtuple('AppendResult', ['added', 'changed', 'unchanged'])
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d+)\.jsonl\.(gz|zst)$')
+
+
+def content_hash(record):
+    """Хэш содержимого инициативы без изменчивых полей"""
+    stable = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    data = json.dumps(stable, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _compress(data, codec):
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise ImportError("Для чтения сегментов .zst установите zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class Archive:
+    """Архив инициатив с историей версий"""
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.codec = 'zst' if zstandard is not None else 'gz'
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(archive_dir, 'index.db'))
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS frames (
+                segment TEXT NOT NULL,
+                frame_offset INTEGER NOT NULL,
+                frame_size INTEGER NOT NULL,
+                PRIMARY KEY (segment, frame_offset)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bodies (
+                hash TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                frame_offset INTEGER NOT NULL,
+                frame_size INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS versions (
+                external_id TEXT NOT NULL,
+                taken_at REAL NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (external_id, taken_at)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_versions_taken_at ON versions(taken_at);
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- запись ---
+
+    def append(self, initiatives, taken_at=None):
+        """
+        Дописать результат загрузки: в архив попадают только новые и изменившиеся инициативы
+        Args:
+            initiatives: итерируемые dict с external_id
+            taken_at: время загрузки (секунды unix, по умолчанию сейчас)
+        Returns:
+            AppendResult
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        added = changed = unchanged = 0
+        bodies = []
+        versions = []
+        new_hashes = set()
+
+        for initiative in initiatives:
+            external_id = str(initiative['external_id'])
+            digest = content_hash(initiative)
+            row = self.conn.execute(
+                'SELECT hash FROM versions WHERE external_id = ? ORDER BY taken_at DESC LIMIT 1',
+                (external_id,)).fetchone()
+            if row is not None and row[0] == digest:
+                unchanged += 1
+                continue
+            if row is None:
+                added += 1
+            else:
+                changed += 1
+            # Содержимое, которое уже было (например, откат к прежней версии), не дублируем
+            if digest not in new_hashes and not self._has_body(digest):
+                new_hashes.add(digest)
+                bodies.append({'h': digest, 'r': initiative})
+            versions.append({'id': external_id, 't': taken_at, 'h': digest})
+
+        if versions:
+            segment, offset, size = self._write_frame(bodies + versions, self._current_segment())
+            with self.conn:
+                self.conn.execute('INSERT INTO frames VALUES (?, ?, ?)', (segment, offset, size))
+                self.conn.executemany('INSERT OR REPLACE INTO bodies VALUES (?, ?, ?, ?)',
+                                      [(body['h'], segment, offset, size) for body in bodies])
+                self.conn.executemany('INSERT OR REPLACE INTO versions VALUES (?, ?, ?)',
+                                      [(version['id'], version['t'], version['h']) for version in versions])
+
+        return AppendResult(added, changed, unchanged)
+
+    def _has_body(self, digest):
+        return self.conn.execute('SELECT 1 FROM bodies WHERE hash = ?', (digest,)).fetchone() is not None
+
+    def _segments(self):
+        """Сегменты по порядку: список (номер, имя файла, кодек)"""
+        segments = []
+        for name in os.listdir(self.archive_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((int(match.group(1)), name, match.group(2)))
+        return sorted(segments)
+
+    def _new_segment(self, number):
+        return f'segment-{number:06d}.jsonl.{self.codec}'
+
+    def _current_segment(self):
+        """Сегмент для дописывания: последний, если он того же кодека и не переполнен"""
+        segments = self._segments()
+        if segments:
+            number, name, codec = segments[-1]
+            if codec == self.codec and os.path.getsize(self._path(name)) < SEGMENT_MAX_BYTES:
+                return name
+            return self._new_segment(number + 1)
+        return self._new_segment(1)
+
+    def _path(self, name):
+        return os.path.join(self.archive_dir, name)
+
+    def _write_frame(self, lines, segment):
+        """Дописать кадр в сегмент; возвращает (сегмент, смещение, размер)"""
+        data = ''.join(json.dumps(line, ensure_ascii=False, default=str) + '\n' for line in lines)
+        frame = _compress(data.encode('utf-8'), SEGMENT_PATTERN.match(segment).group(2))
+        with open(self._path(segment), 'ab') as f:
+            offset = f.tell()
+            f.write(frame)
+            f.flush()
+            os.fsync(f.fileno())
+        return segment, offset, len(frame)
+
+    # --- чтение ---
+
+    def _read_frame(self, segment, offset, size):
+        with open(self._path(segment), 'rb') as f:
+            f.seek(offset)
+            data = _decompress(f.read(size), SEGMENT_PATTERN.match(segment).group(2))
+        for line in data.decode('utf-8').splitlines():
+            yield json.loads(line)
+
+    def snapshot_at(self, moment=None):
+        """
+        Инициативы в том виде, в каком они были на момент moment
+        Args:
+            moment: datetime или секунды unix (по умолчанию - последнее состояние)
+        Returns:
+            генератор dict; читается по одному кадру
+        """
+        moment = time.time() if moment is None else _timestamp(moment)
+        # Для MAX() в SQLite остальные колонки берутся из той же строки,
+        # поэтому hash - версия с последним taken_at не позже moment
+        rows = self.conn.execute('''
+            SELECT b.segment, b.frame_offset, b.frame_size, v.hash
+            FROM (SELECT hash, MAX(taken_at) FROM versions WHERE taken_at <= ? GROUP BY external_id) v
+            JOIN bodies b ON b.hash = v.hash
+        ''', (moment,))
+
+        frames = defaultdict(set)
+        for segment, offset, size, digest in rows:
+            frames[(segment, offset, size)].add(digest)
+
+        for (segment, offset, size), wanted in sorted(frames.items()):
+            for line in self._read_frame(segment, offset, size):
+                if 'r' in line and line['h'] in wanted:
+                    yield line['r']
+
+    def history(self, external_id):
+        """Версии инициативы: список (datetime, хэш)"""
+        return [(datetime.fromtimestamp(taken_at), digest) for taken_at, digest in self.conn.execute(
+            'SELECT taken_at, hash FROM versions WHERE external_id = ? ORDER BY taken_at',
+            (str(external_id),))]
+
+    def stats(self):
+        """Размер архива и число инициатив, версий и хранимых содержимых"""
+        segments = self._segments()
+        initiatives, versions = self.conn.execute(
+            'SELECT COUNT(DISTINCT external_id), COUNT(*) FROM versions').fetchone()
+        first, last = self.conn.execute('SELECT MIN(taken_at), MAX(taken_at) FROM versions').fetchone()
+        return {
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(self._path(name)) for _, name, _ in segments),
+            'initiatives': initiatives,
+            'versions': versions,
+            'bodies': self.conn.execute('SELECT COUNT(*) FROM bodies').fetchone()[0],
+            'first': datetime.fromtimestamp(first) if first else None,
+            'last': datetime.fromtimestamp(last) if last else None,
+        }
+
+    # --- обслуживание ---
+
+    def compact(self, keep_since=None):
+        """
+        Переписать архив крупными кадрами без лишних данных
+        Args:
+            keep_since: datetime или секунды unix; версии до этого момента
+                схлопываются в одну (состояние на keep_since), None - история целиком
+        Returns:
+            (байт до, байт после)
+        """
+        old_segments = self._segments()
+        size_before = sum(os.path.getsize(self._path(name)) for _, name, _ in old_segments)
+
+        with self.conn:
+            if keep_since is not None:
+                self.conn.execute('''
+                    DELETE FROM versions WHERE taken_at < ? AND taken_at < (
+                        SELECT MAX(v.taken_at) FROM versions v
+                        WHERE v.external_id = versions.external_id AND v.taken_at <= ?)
+                ''', (_timestamp(keep_since), _timestamp(keep_since)))
+            self.conn.execute('DELETE FROM bodies WHERE hash NOT IN (SELECT hash FROM versions)')
+
+            live_versions = set(self.conn.execute('SELECT external_id, taken_at FROM versions'))
+            live_hashes = {digest for (digest,) in self.conn.execute('SELECT hash FROM bodies')}
+            old_frames = self.conn.execute(
+                'SELECT segment, frame_offset, frame_size FROM frames ORDER BY segment, frame_offset').fetchall()
+            self.conn.execute('DELETE FROM frames')
+
+            # Новые сегменты нумеруются после старых: до конца транзакции
+            # индекс указывает на старые, и они остаются целыми
+            number = old_segments[-1][0] + 1 if old_segments else 1
+            written = set()
+            buffer = []
+
+            def flush():
+                nonlocal number
+                segment = self._new_segment(number)
+                if os.path.exists(self._path(segment)) and os.path.getsize(self._path(segment)) >= SEGMENT_MAX_BYTES:
+                    number += 1
+                    segment = self._new_segment(number)
+                segment, offset, size = self._write_frame(buffer, segment)
+                self.conn.execute('INSERT INTO frames VALUES (?, ?, ?)', (segment, offset, size))
+                self.conn.executemany(
+                    'UPDATE bodies SET segment = ?, frame_offset = ?, frame_size = ? WHERE hash = ?',
+                    [(segment, offset, size, line['h']) for line in buffer if 'r' in line])
+                buffer.clear()
+
+            for frame in old_frames:
+                for line in self._read_frame(*frame):
+                    if 'r' in line:
+                        if line['h'] in written or line['h'] not in live_hashes:
+                            continue
+                        written.add(line['h'])
+                    elif (line['id'], line['t']) not in live_versions:
+                        continue
+                    buffer.append(line)
+                    if len(buffer) >= FRAME_LINES:
+                        flush()
+            if buffer:
+                flush()
+
+        # Индекс уже указывает на новые сегменты - старые можно удалять
+        for _, name, _ in old_segments:
+            os.remove(self._path(name))
+        self.conn.execute('VACUUM')
+
+        size_after = sum(os.path.getsize(self._path(name)) for _, name, _ in self._segments())
+        return size_before, size_after
+
+
+def _timestamp(moment):
+    if isinstance(moment, datetime):
+        return moment.timestamp()
+    return float(moment)
+
+
+def main():
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='Архив результатов парсинга roi.ru')
+    arg_parser.add_argument('--dir', default=DEFAULT_ARCHIVE_DIR, help='каталог архива')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='размер и содержимое архива')
+    compact_parser = commands.add_parser('compact', help='переписать архив крупными кадрами')
+    compact_parser.add_argument('--keep-days', type=int,
+                                help='сколько дней истории хранить полностью (по умолчанию всю)')
+    snapshot_parser = commands.add_parser('snapshot', help='состояние на момент времени в файл')
+    snapshot_parser.add_argument('moment', help='"ГГГГ-ММ-ДД ЧЧ:ММ" или "now"')
+    snapshot_parser.add_argument('path', help='файл (.jsonl, .json, .csv, можно .gz)')
+    args = arg_parser.parse_args()
+
+    with Archive(args.dir) as archive:
+        if args.command == 'stats':
+            for key, value in archive.stats().items():
+                print(f"{key:12} {value}")
+        elif args.command == 'compact':
+            keep_since = time.time() - args.keep_days * 86400 if args.keep_days is not None else None
+            before, after = archive.compact(keep_since)
+            print(f"✓ Архив сжат: {before / 1024:.0f} КБ -> {after / 1024:.0f} КБ")
+        else:
+            from exporter import write_records
+            moment = None if args.moment == 'now' else datetime.fromisoformat(args.moment)
+            written = write_records(archive.snapshot_at(moment), args.path)
+            print(f"✓ {written} инициатив записано в {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Асинхронный парсер roi.ru (asyncio + aiohttp)
+"""
+
+import asyncio
+
+from roi_parser import ROIParser
+from transport import AiohttpTransport
+
+
+class AsyncROIParser(ROIParser):
+    """
+    Асинхронный вариант ROIParser.
+    Разбор HTML общий с синхронным парсером, а загрузка страниц идет через
+    один aiohttp-пул соединений, поэтому можно обходить сразу несколько
+    списков и тысячи детальных страниц без отдельного потока на запрос.
+
+    Публичные методы повторяют ROIParser, но являются корутинами с префиксом a
+    (aparse_initiative_details и т.д.): унаследованные синхронные методы
+    (fetch_details_concurrently) продолжают работать.
+    """
+
+    def __init__(self, base_url="https://www.roi.ru", requests_per_second=1.0,
+                 max_connections=20, **kwargs):
+        super().__init__(base_url=base_url, requests_per_second=requests_per_second, **kwargs)
+
+        # Сжатие aiohttp выбирает сам (br без brotli не распаковать)
+        headers = {k: v for k, v in self.session.headers.items() if k != 'Accept-Encoding'}
+        # Бюджет хоста и AIMD-лимит общие с синхронным транспортом
+        self.async_transport = AiohttpTransport(headers=headers, max_connections=max_connections,
+                                                rate_limits=self.rate_limits, concurrency=self.concurrency,
+                                                retry=self.transport.retry)
+
+    async def close(self):
+        await self.async_transport.close()
+        self.session.close()
+
+    async def __aenter__(self):
+        await self.async_transport.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def aparse_federal_initiatives(self, start_url=None, max_pages=3):
+        """
+        Парсинг списка инициатив (асинхронно)
+        Args:
+            start_url: начальный URL для парсинга (если None, используем self.federal_url)
+            max_pages: максимальное количество страниц для парсинга
+        Returns:
+            list: список инициатив
+        """
+        all_initiatives = []
+
+        try:
+            current_page = 1
+            current_url = start_url if start_url else self.federal_url
+
+            while current_page <= max_pages and current_url:
+                self.logger.info(f"Парсинг страницы {current_page}: {current_url}")
+
+                content = await self.async_transport.get(current_url)
+                soup = self._make_soup(content, 'list')
+
+                page_initiatives = self._parse_initiatives_page(soup)
+                all_initiatives.extend(page_initiatives)
+
+                self.logger.info(f"Страница {current_page}: найдено {len(page_initiatives)} инициатив")
+
+                next_url = self._get_next_page_url(soup, current_url)
+
+                if next_url and next_url != current_url:
+                    current_url = next_url
+                    current_page += 1
+                else:
+                    self.logger.info(f"Достигнут конец пагинации или следующая страница не найдена")
+                    break
+
+        except Exception as e:
+            self.logger.error(f"Ошибка при парсинге списка {start_url}: {e}")
+
+        self.logger.info(f"Всего распарсено инициатив: {len(all_initiatives)}")
+        return all_initiatives
+
+    async def aparse_initiative_details(self, url):
+        """
+        Парсинг детальной страницы инициативы (асинхронно)
+        """
+        try:
+            content = await self.async_transport.get(url)
+            soup = self._make_soup(content, 'detail')
+            return self._parse_details_page(soup, url)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка парсинга деталей {url}: {e}")
+            return {}
+
+    async def afetch_details_concurrently(self, initiatives, max_workers=20):
+        """
+        Загрузка детальных страниц, не более max_workers запросов одновременно.
+        Порядок инициатив сохраняется, ошибка на одной странице не влияет на остальные.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def fetch(initiative):
+            async with semaphore:
+                return await self.aparse_initiative_details(initiative['url'])
+
+        results = await asyncio.gather(
+            *(fetch(initiative) for initiative in initiatives),
+            return_exceptions=True
+        )
+
+        for initiative, details in zip(initiatives, results):
+            if isinstance(details, Exception):
+                self.logger.error(f"Ошибка загрузки деталей {initiative.get('url')}: {details}")
+                details = {}
+            initiative.update(details)
+
+        return initiatives
+
+    async def aget_initiatives_with_details(self, max_initiatives=20, max_workers=20, start_url=None):
+        """
+        Получение инициатив с детальной информацией (асинхронно)
+        """
+        initiatives = await self.aparse_federal_initiatives(start_url=start_url, max_pages=1)
+
+        if not initiatives:
+            self.logger.warning("Не удалось получить инициативы")
+            return []
+
+        initiatives = initiatives[:max_initiatives]
+        return await self.afetch_details_concurrently(initiatives, max_workers=max_workers)
+
+    async def acrawl_listings(self, start_urls, max_pages=3, with_details=False, max_workers=20):
+        """
+        Одновременный обход нескольких списков (например, всех уровней инициатив).
+        Инициатива, попавшая в несколько списков, возвращается один раз.
+        Args:
+            start_urls: URL первых страниц списков
+            max_pages: максимальное количество страниц в каждом списке
+            with_details: загружать ли детальные страницы
+            max_workers: максимум одновременных запросов к детальным страницам
+        Returns:
+            list: список инициатив
+        """
+        pages = await asyncio.gather(
+            *(self.aparse_federal_initiatives(start_url=url, max_pages=max_pages) for url in start_urls)
+        )
+
+        initiatives = []
+        seen = set()
+        for page_initiatives in pages:
+            for initiative in page_initiatives:
+                if initiative['external_id'] not in seen:
+                    seen.add(initiative['external_id'])
+                    initiatives.append(initiative)
+
+        if with_details:
+            await self.afetch_details_concurrently(initiatives, max_workers=max_workers)
+
+        return initiatives
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сравнение скорости HTML-парсеров на сохраненных страницах roi.ru
+
+Запуск:
+    python benchmarks/bench_parse_backends.py [папка_со_страницами] [повторов]
+"""
+
+import os
+import sys
+import time
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from html_backend import make_soup, HAS_LXML
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# (парсер BeautifulSoup, выборочный разбор)
+BACKENDS = [('html.parser', False), ('html.parser', True)]
+if HAS_LXML:
+    BACKENDS += [('lxml', False), ('lxml', True)]
+
+
+def load_pages(fixtures_dir):
+    """Сохраненные страницы: list_*.html - списки, detail_*.html - детальные"""
+    pages = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        if not name.endswith('.html'):
+            continue
+        if name.startswith('list_'):
+            kind = 'list'
+        elif name.startswith('detail_'):
+            kind = 'detail'
+        else:
+            continue
+        with open(os.path.join(fixtures_dir, name), 'rb') as f:
+            pages.append((name, kind, f.read()))
+    return pages
+
+
+def make_parser():
+    """ROIParser без сетевых запросов и без подробного лога"""
+    os.makedirs('logs', exist_ok=True)
+    from roi_parser import ROIParser
+    parser = ROIParser()
+    parser.logger.setLevel(logging.WARNING)
+    return parser
+
+
+def extract(parser, soup, kind):
+    if kind == 'list':
+        return parser._parse_initiatives_page(soup)
+    return parser._parse_details_page(soup, '')
+
+
+def comparable(result):
+    """Результат без полей, зависящих от времени разбора"""
+    if isinstance(result, list):
+        return [comparable(item) for item in result]
+    return {k: v for k, v in result.items() if k not in ('parsed_at', 'created_date')}
+
+
+def main():
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    parser = make_parser()
+    pages = load_pages(fixtures_dir)
+    if not pages:
+        print(f"Нет сохраненных страниц в {fixtures_dir}")
+        return
+
+    print(f"Страниц: {len(pages)}, повторов: {repeat}")
+    print(f"{'страница':28} " + ' '.join(f"{f + (' sel' if s else ''):>16}" for f, s in BACKENDS))
+    print("-" * (29 + 17 * len(BACKENDS)))
+
+    totals = {backend: 0.0 for backend in BACKENDS}
+    for name, kind, content in pages:
+        reference = None
+        cells = []
+        for features, selective in BACKENDS:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = extract(parser, make_soup(content, kind, features, selective), kind)
+            per_page = (time.perf_counter() - started) / repeat * 1000
+            totals[(features, selective)] += per_page
+
+            # Все варианты разбора должны давать одинаковый результат
+            if reference is None:
+                reference = comparable(result)
+            elif comparable(result) != reference:
+                print(f"  ! {name}: {features}{' sel' if selective else ''} дает другой результат")
+            cells.append(f"{per_page:13.2f} мс")
+        print(f"{name:28} " + ' '.join(cells))
+
+    print("-" * (29 + 17 * len(BACKENDS)))
+    print(f"{'в среднем на страницу':28} " +
+          ' '.join(f"{totals[b] / len(pages):13.2f} мс" for b in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
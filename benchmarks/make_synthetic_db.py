@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Синтетическая база инициатив для проверки интерфейса на больших объемах
+
+Запуск:
+    python benchmarks/make_synthetic_db.py data/synthetic_100k.db --rows 100000
+    python main_window.py data/synthetic_100k.db      # открыть окно на этой базе
+
+С --check дополнительно замеряется список инициатив (без окна): первая порция
+и прокрутка до конца.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from run_benchmarks import create_database
+
+
+def fill(path, rows, batch=5000):
+    """Запись rows синтетических инициатив с деталями порциями через ingest"""
+    from ingest import prepare_row, upsert_initiatives
+
+    conn = create_database(path)
+    started = time.perf_counter()
+    for first in range(0, rows, batch):
+        chunk = synthetic.initiatives(min(batch, rows - first), first_id=200000 + first, seed=first)
+        upsert_initiatives(conn, [prepare_row(row, row) for row in chunk])
+    conn.close()
+    return time.perf_counter() - started
+
+
+def check_list_model(path):
+    """Первая порция списка и прокрутка до конца через InitiativeListModel"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from initiative_model import InitiativeListModel
+
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    model = InitiativeListModel(path)
+
+    for sort_key in ('added_date', 'votes'):
+        started = time.perf_counter()
+        model.set_query('votes >= ?', (0,), sort_key)
+        model.fetchMore()
+        first_page = time.perf_counter() - started
+
+        started = time.perf_counter()
+        while model.canFetchMore():
+            model.fetchMore()
+        full_scroll = time.perf_counter() - started
+
+        print(f"  сортировка {sort_key:10}: первая порция {first_page * 1000:7.1f} мс, "
+              f"все {model.rowCount()} строк {full_scroll:6.2f} с")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Синтетическая база инициатив')
+    arg_parser.add_argument('path', help='файл базы (будет перезаписан)')
+    arg_parser.add_argument('--rows', type=int, default=100000, help='число инициатив')
+    arg_parser.add_argument('--check', action='store_true', help='замерить список инициатив')
+    args = arg_parser.parse_args()
+
+    if os.path.exists(args.path):
+        os.remove(args.path)
+    os.makedirs(os.path.dirname(os.path.abspath(args.path)), exist_ok=True)
+
+    elapsed = fill(args.path, args.rows)
+    size_mb = os.path.getsize(args.path) / 1024 / 1024
+    print(f"Создана {args.path}: {args.rows} инициатив за {elapsed:.1f} с, {size_mb:.1f} МБ")
+
+    if args.check:
+        check_list_model(args.path)
+
+
+if __name__ == "__main__":
+    main()
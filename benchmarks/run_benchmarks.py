@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки парсера и записи в БД на сохраненных страницах roi.ru
+
+Запуск:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json   # сравнить с прошлым прогоном
+
+Результат - JSON (пропускная способность, p50/p99 задержки, пиковая память),
+чтобы прогоны на разных коммитах можно было сравнивать.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from html_backend import make_soup, DEFAULT_FEATURES
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+class FixtureTransport:
+    """Транспорт ROIParser, отдающий сохраненные страницы вместо сети"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url):
+        return self.pages[url]
+
+
+def percentile(values, pct):
+    """Процентиль по ближайшему рангу"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat):
+    """
+    Замер функции: задержки repeat запусков и пиковая память одного запуска
+    Returns:
+        (список задержек в секундах, пиковая память в КБ, результат последнего запуска)
+    """
+    func()  # прогрев
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return timings, peak / 1024, result
+
+
+def summarize(name, target, timings, peak_kb, pages=0, initiatives=0, rows=0):
+    """Строка результата для JSON"""
+    mean = sum(timings) / len(timings)
+    throughput = {}
+    if pages:
+        throughput['pages_per_s'] = round(pages / mean, 2)
+    if initiatives:
+        throughput['initiatives_per_s'] = round(initiatives / mean, 1)
+    if rows:
+        throughput['rows_per_s'] = round(rows / mean, 1)
+    return {
+        'name': name,
+        'target': target,
+        'iterations': len(timings),
+        'pages': pages,
+        'initiatives': initiatives,
+        'rows': rows,
+        'throughput': throughput,
+        'latency_ms': {
+            'p50': round(percentile(timings, 50) * 1000, 3),
+            'p99': round(percentile(timings, 99) * 1000, 3),
+            'mean': round(mean * 1000, 3),
+        },
+        'peak_memory_kb': round(peak_kb, 1),
+    }
+
+
+def load_fixtures(kind):
+    pages = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.startswith(kind + '_') and name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+def make_parser(args):
+    """ROIParser без сети и без подробного лога"""
+    os.makedirs('logs', exist_ok=True)
+    from roi_parser import ROIParser
+    parser = ROIParser(requests_per_second=1e9, html_features=args.features,
+                       selective_parsing=args.selective)
+    parser.logger.setLevel(logging.WARNING)
+    return parser
+
+
+def bench_list_pages(parser, args):
+    """_parse_initiatives_page (вместе с построением дерева) на сохраненных и синтетических списках"""
+    pages = load_fixtures('list')
+    for size in args.synthetic_sizes:
+        pages.append((f'synthetic_{size}_items', synthetic.list_page(size)))
+
+    results = []
+    for name, content in pages:
+        def run():
+            soup = make_soup(content, 'list', parser.html_features, parser.selective_parsing)
+            return parser._parse_initiatives_page(soup)
+
+        repeat = args.repeat if len(content) < 500_000 else max(3, args.repeat // 10)
+        timings, peak, items = measure(run, repeat)
+        results.append(summarize(f'list_page:{name}', '_parse_initiatives_page', timings, peak,
+                                 pages=1, initiatives=len(items)))
+    return results
+
+
+def bench_detail_pages(parser, args):
+    """parse_initiative_details на сохраненных детальных страницах"""
+    pages = load_fixtures('detail')
+    parser.transport = FixtureTransport({name: content for name, content in pages})
+
+    results = []
+    for name, _ in pages:
+        timings, peak, _ = measure(lambda: parser.parse_initiative_details(name), args.repeat)
+        results.append(summarize(f'detail_page:{name}', 'parse_initiative_details', timings, peak,
+                                 pages=1, initiatives=1))
+    return results
+
+
+def create_database(path):
+    """Пустая БД со схемой приложения"""
+    from main import ROIAssistant
+    conn = sqlite3.connect(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ROIAssistant.init_database(SimpleNamespace(conn=conn, cursor=conn.cursor()))
+    return conn
+
+
+def insert_rows(conn, rows):
+    """Путь записи обновления: пакетный upsert из ingest"""
+    from ingest import prepare_row, upsert_initiatives
+    return upsert_initiatives(conn, [prepare_row(row, row if 'full_text' in row else None)
+                                     for row in rows])
+
+
+def bench_db_insert(args):
+    """Запись в БД: первая загрузка (все строки новые) и повторное обновление (все уже есть)"""
+    rows = synthetic.initiatives(args.db_rows)
+    repeat = max(3, args.repeat // 10)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        counter = [0]
+
+        def fresh_insert():
+            counter[0] += 1
+            conn = create_database(os.path.join(tmp, f'fresh_{counter[0]}.db'))
+            try:
+                return insert_rows(conn, rows)
+            finally:
+                conn.close()
+
+        timings, peak, _ = measure(fresh_insert, repeat)
+        results.append(summarize(f'db_insert:new_{args.db_rows}', 'insert', timings, peak,
+                                 rows=len(rows)))
+
+        conn = create_database(os.path.join(tmp, 'refresh.db'))
+        insert_rows(conn, rows)
+        timings, peak, _ = measure(lambda: insert_rows(conn, rows), repeat)
+        conn.close()
+        results.append(summarize(f'db_insert:refresh_{args.db_rows}', 'insert', timings, peak,
+                                 rows=len(rows)))
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Изменение p50 относительно сохраненного прогона"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+
+    print(f"\nСравнение с {baseline_path}:")
+    for result in current['results']:
+        base = baseline.get(result['name'])
+        if not base:
+            continue
+        before, after = base['latency_ms']['p50'], result['latency_ms']['p50']
+        change = (after - before) / before * 100 if before else 0.0
+        mark = '  <-- медленнее' if change > 10 else ''
+        print(f"  {result['name']:45} {before:10.3f} -> {after:10.3f} мс ({change:+6.1f}%){mark}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Бенчмарки парсера roi.ru')
+    arg_parser.add_argument('--repeat', type=int, default=30, help='повторов на страницу')
+    arg_parser.add_argument('--features', default=DEFAULT_FEATURES, help='парсер BeautifulSoup')
+    arg_parser.add_argument('--selective', action='store_true', help='выборочный разбор страниц')
+    arg_parser.add_argument('--synthetic-sizes', type=int, nargs='*', default=[1000, 5000],
+                            help='размеры синтетических списков')
+    arg_parser.add_argument('--db-rows', type=int, default=2000, help='строк в тесте записи в БД')
+    arg_parser.add_argument('--output', help='файл для JSON (по умолчанию stdout)')
+    arg_parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    args = arg_parser.parse_args()
+
+    parser = make_parser(args)
+
+    results = []
+    results += bench_list_pages(parser, args)
+    results += bench_detail_pages(parser, args)
+    results += bench_db_insert(args)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'html_features': args.features,
+            'selective': args.selective,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"Результаты сохранены в {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Синтетические страницы и записи roi.ru для бенчмарков
+"""
+
+import random
+
+TOPICS = ['благоустройстве дворовых территорий', 'бесплатном проезде для пенсионеров',
+          'запрете продажи энергетиков детям', 'обязательной маркировке товаров',
+          'снижении налога для самозанятых', 'строительстве велодорожек',
+          'компенсации за капитальный ремонт', 'раздельном сборе мусора',
+          'защите бездомных животных', 'ограничении шума в ночное время',
+          'поддержке сельских фельдшеров', 'доступности среды для инвалидов']
+
+LEVELS = ['Федеральный', 'Региональный', 'Муниципальный']
+
+
+def _votes(number):
+    """Число голосов так, как его пишет сайт: 12 345"""
+    return f'{number:,}'.replace(',', ' ')
+
+
+def list_page(count, first_id=200000, seed=0, next_href='/poll/last/?level=1&page=2'):
+    """
+    Страница списка с count карточками инициатив (разметка как в fixtures/list_*.html)
+    """
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        number = first_id + i
+        items.append(
+            f'<div class="item col-{1 + i % 2}">'
+            f'<div class="item-head"><span class="number">№ {number}</span></div>'
+            f'<div class="link"><a href="/{number}/">О {TOPICS[number % len(TOPICS)]} ({number})</a></div>'
+            f'<div class="hour"><b>{_votes(rng.randint(5, 99000))}</b> голосов за</div>'
+            f'<div class="jurisdiction">Уровень инициативы: {LEVELS[number % len(LEVELS)]}</div>'
+            f'</div>\n'
+        )
+    pagination = (f'<div class="pagination"><a class="next" href="{next_href}">Следующая</a></div>'
+                  if next_href else '')
+    return ('<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+            '<title>Инициативы</title></head><body><main class="content">'
+            '<div class="items-list">\n' + ''.join(items) + '</div>' + pagination +
+            '</main></body></html>').encode('utf-8')
+
+
+def initiatives(count, first_id=200000, seed=0, with_details=True):
+    """Записи в формате ROIParser (как после parse_initiative_details)"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        number = first_id + i
+        title = f'О {TOPICS[number % len(TOPICS)]} ({number})'
+        votes = rng.randint(0, 99000)
+        row = {
+            'external_id': f'roi_{number}',
+            'title': title,
+            'description': f'{title}. Количество голосов: {votes}',
+            'url': f'https://www.roi.ru/{number}/',
+            'category': 'Не указана',
+            'level': LEVELS[number % len(LEVELS)],
+            'votes': votes,
+            'anti_votes': 0,
+            'created_date': '2026-01-01',
+            'parsed_at': '2026-01-01T00:00:00',
+            'source': 'roi.ru',
+        }
+        if with_details:
+            row.update({
+                'anti_votes': rng.randint(0, 5000),
+                'full_text': ' '.join(['Предлагаю законодательно закрепить порядок учета мнения жителей.'] * 20),
+                'proposal_text': 'Направлено в экспертную рабочую группу.',
+                'result_text': 'Повышение качества жизни граждан.',
+                'end_date': '2027-05-12',
+                'author': 'Иванов Иван Иванович',
+                'status': 'на голосовании',
+            })
+        rows.append(row)
+    return rows
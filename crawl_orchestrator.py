@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Обход всех списков roi.ru за одно обновление
+
+Списки (уровни x разделы: на голосовании и завершенные) обходятся
+одновременно общим пулом потоков; страницы одного списка идут по порядку,
+потому что ссылка на следующую берется из текущей. Частоту запросов и
+число одновременных запросов ограничивает транспорт парсера (бюджет хоста,
+AIMD, повторы), а не число потоков.
+Инициатива, найденная в нескольких списках, отдается один раз, и ее
+детальная страница загружается тоже один раз.
+
+crawl_into пишет найденное в базу после каждой страницы и ведет очередь
+обхода (frontier.py): прерванный обход продолжается следующим запуском.
+
+Запуск:
+    python crawl_orchestrator.py --max-pages 5
+    python crawl_orchestrator.py --levels 1 --sections poll/last --no-details
+"""
+
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Уровни инициатив (параметр level списка)
+LEVELS = {
+    1: 'Федеральный',
+    2: 'Региональный',
+    3: 'Муниципальный',
+}
+
+# Разделы со списками: на голосовании и завершенные
+SECTIONS = ('poll/last', 'poll/complete')
+
+# Страниц в одном списке, если не задано иное (обход до конца пагинации)
+MAX_PAGES = 200
+
+Listing = namedtuple('Listing', ['section', 'level', 'url'])
+
+CrawlStats = namedtuple('CrawlStats', ['pages', 'listed', 'duplicates', 'details', 'errors'])
+
+# Загружена страница списка: новые инициативы без деталей (initiatives) и
+# поставленные в очередь на детали (queued); next_url - если следующая страница запланирована
+PageResult = namedtuple('PageResult', ['listing', 'page', 'url', 'next_url', 'initiatives', 'queued', 'error'])
+
+# Загружена детальная страница (при ошибке details = {})
+DetailResult = namedtuple('DetailResult', ['initiative', 'details', 'error'])
+
+
+def listings(base_url, sections=SECTIONS, levels=tuple(LEVELS)):
+    """Первые страницы всех списков: каждый раздел на каждом уровне"""
+    base_url = base_url.rstrip('/')
+    return [Listing(section, level, f"{base_url}/{section}/?level={level}")
+            for section in sections for level in levels]
+
+
+class CrawlOrchestrator:
+    """
+    Планировщик загрузок для ROIParser: страницы списков и детальные
+    страницы качаются одним пулом, разбор HTML - методами парсера
+    """
+
+    def __init__(self, parser, listings_to_crawl=None, max_pages=MAX_PAGES, max_workers=8):
+        """
+        Args:
+            parser: ROIParser (транспорт, кэш и разбор страниц)
+            listings_to_crawl: списки Listing (по умолчанию все разделы и уровни)
+            max_pages: максимум страниц в каждом списке
+            max_workers: потоков загрузки (одновременных запросов не больше parser.concurrency)
+        """
+        self.parser = parser
+        self.listings = listings_to_crawl or listings(parser.base_url)
+        self.max_pages = max_pages
+        self.max_workers = max(1, max_workers)
+        self.logger = parser.logger
+        self.pages = 0
+        self.listed = 0
+        self.duplicates = 0
+        self.details = 0
+        self.errors = 0
+        self._errors_lock = threading.Lock()
+
+    def stats(self):
+        return CrawlStats(self.pages, self.listed, self.duplicates, self.details, self.errors)
+
+    def _fetch(self, url):
+        # Бюджет, число одновременных запросов и повторы - в транспорте парсера
+        return self.parser.transport.get(url)
+
+    def _fetch_list_page(self, listing, page, url):
+        """Страница списка: (listing, номер, url, инициативы, следующий url, ошибка)"""
+        try:
+            soup = self.parser._make_soup(self._fetch(url), 'list')
+            return (listing, page, url, self.parser._parse_initiatives_page(soup),
+                    self.parser._get_next_page_url(soup, url), None)
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки списка {url}: {e}")
+            self._count_error()
+            return listing, page, url, [], None, e
+
+    def _fetch_details(self, initiative):
+        try:
+            details = self.parser._details_from_content(self._fetch(initiative['url']), initiative['url'])
+            return DetailResult(initiative, details, None)
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки деталей {initiative['url']}: {e}")
+            self._count_error()
+            return DetailResult(initiative, {}, e)
+
+    def _count_error(self):
+        # Вызывается из потоков пула
+        with self._errors_lock:
+            self.errors += 1
+
+    def _events(self, list_seeds, detail_seeds=(), seen=(), needs_details=None, on_submit=None):
+        """
+        Планировщик загрузок: страницы списков и детали одним пулом
+        Args:
+            list_seeds: (Listing, номер страницы, url) - с каких страниц начать
+            detail_seeds: инициативы, детали которых нужно загрузить
+            seen: external_id, которые уже встречались (при продолжении обхода)
+            on_submit: функция url - вызывается перед отправкой загрузки в пул
+        Yields:
+            PageResult и DetailResult по мере готовности
+        """
+        seen = set(seen)
+        waiting = deque(detail_seeds)     # инициативы в очереди на загрузку деталей
+        list_futures = set()
+        detail_futures = set()
+
+        def submit_page(listing, page, url):
+            if on_submit is not None:
+                on_submit(url)
+            list_futures.add(executor.submit(self._fetch_list_page, listing, page, url))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for listing, page, url in list_seeds:
+                self.logger.info(f"Список {listing.section}, уровень {listing.level}: {url}")
+                submit_page(listing, page, url)
+
+            while list_futures or detail_futures or waiting:
+                # Деталей в очереди пула не больше двух на поток, чтобы
+                # следующие страницы списков не ждали за тысячами деталей
+                while waiting and len(detail_futures) < self.max_workers * 2:
+                    initiative = waiting.popleft()
+                    if on_submit is not None:
+                        on_submit(initiative['url'])
+                    detail_futures.add(executor.submit(self._fetch_details, initiative))
+
+                done, _ = wait(list_futures | detail_futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in detail_futures:
+                        detail_futures.discard(future)
+                        self.details += 1
+                        yield future.result()
+                        continue
+
+                    list_futures.discard(future)
+                    listing, page, url, page_initiatives, next_url, error = future.result()
+                    self.pages += 1
+                    self.logger.info(f"{listing.section}?level={listing.level}, страница {page}: "
+                                     f"найдено {len(page_initiatives)} инициатив")
+
+                    if not (page < self.max_pages and next_url and next_url != url):
+                        next_url = None
+
+                    fresh = []
+                    queued = []
+                    for initiative in page_initiatives:
+                        # Дубликаты из других списков отсеиваются до загрузки деталей
+                        if initiative['external_id'] in seen:
+                            self.duplicates += 1
+                            continue
+                        seen.add(initiative['external_id'])
+                        self.listed += 1
+                        if needs_details is None or needs_details(initiative):
+                            queued.append(initiative)
+                        else:
+                            fresh.append(initiative)
+                    waiting.extend(queued)
+                    yield PageResult(listing, page, url, next_url, fresh, queued, error)
+                    # Следующая страница - после того, как потребитель записал эту
+                    # (и поставил следующую в очередь обхода, чтобы попытка учлась)
+                    if next_url:
+                        submit_page(listing, page + 1, next_url)
+        finally:
+            # Потребитель мог остановить обход: еще не начатые загрузки не нужны
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.logger.info(f"Обход завершен: {self.stats()}")
+
+    def crawl(self, needs_details=None, on_page=None):
+        """
+        Обход всех списков
+        Args:
+            needs_details: функция initiative -> bool; если вернула False,
+                детальная страница не загружается (None - загружать для всех)
+            on_page: функция (страниц всего, инициатив на странице)
+        Yields:
+            (initiative, details) по мере готовности; details = None, если не загружались
+        """
+        seeds = [(listing, 1, listing.url) for listing in self.listings]
+        for event in self._events(seeds, needs_details=needs_details):
+            if isinstance(event, DetailResult):
+                yield event.initiative, event.details
+                continue
+            if on_page is not None:
+                on_page(self.pages, len(event.initiatives) + len(event.queued))
+            for initiative in event.initiatives:
+                yield initiative, None
+
+    def crawl_into(self, conn, frontier=None, needs_details=None, on_page=None, on_details=None,
+                   on_rows=None, should_stop=None):
+        """
+        Обход с записью в базу после каждой страницы списка и каждой детальной страницы
+        Args:
+            conn: соединение с базой инициатив
+            frontier: Frontier - очередь обхода в той же базе; ее изменения
+                фиксируются в одной транзакции с инициативами, и прерванный
+                обход продолжается следующим вызовом с места остановки
+            on_page: функция (страниц всего, инициатив на странице)
+            on_details: функция (загружено деталей всего)
+            on_rows: функция (IngestResult с начала обхода) - после каждой записи
+            should_stop: функция без аргументов; True - остановить обход
+        Returns:
+            IngestResult за весь обход
+        """
+        from ingest import IngestResult, prepare_row, upsert_initiatives
+
+        list_seeds = [(listing, 1, listing.url) for listing in self.listings]
+        detail_seeds = []
+        if frontier is not None:
+            # Продолжаем, только если прерван обход тех же списков
+            if frontier.unfinished() and frontier.seeds() == {listing.url for listing in self.listings}:
+                list_seeds, detail_seeds = self._resume_seeds(frontier)
+                self.logger.info(f"Продолжение обхода: страниц списков {len(list_seeds)}, "
+                                 f"деталей {len(detail_seeds)}")
+            else:
+                frontier.start(self.listings)
+
+        totals = IngestResult(0, 0, 0)
+
+        def write(rows, update_frontier):
+            nonlocal totals
+            # Очередь меняется до upsert: его commit фиксирует и то, и другое
+            with conn:
+                if frontier is not None:
+                    update_frontier()
+                result = upsert_initiatives(conn, rows)
+            totals = IngestResult(*(total + part for total, part in zip(totals, result)))
+            if on_rows is not None:
+                on_rows(totals)
+
+        def page_done(event):
+            if event.error is not None:
+                frontier.failed(event.url, event.error)
+                return
+            frontier.done(event.url)
+            if event.next_url:
+                frontier.add_list_page(event.listing, event.page + 1, event.next_url)
+            frontier.add_details(event.queued)
+
+        def details_done(event):
+            if event.error is not None:
+                frontier.failed(event.initiative['url'], event.error)
+            else:
+                frontier.done(event.initiative['url'])
+
+        seen = {initiative['external_id'] for initiative in detail_seeds}
+        while True:
+            stopped = False
+            events = self._events(list_seeds, detail_seeds, seen=seen, needs_details=needs_details,
+                                  on_submit=frontier.claim if frontier is not None else None)
+            try:
+                for event in events:
+                    if isinstance(event, PageResult):
+                        seen.update(initiative['external_id'] for initiative in event.initiatives + event.queued)
+                        if on_page is not None:
+                            on_page(self.pages, len(event.initiatives) + len(event.queued))
+                        write([prepare_row(initiative) for initiative in event.initiatives],
+                              lambda: page_done(event))
+                    else:
+                        if on_details is not None:
+                            on_details(self.details)
+                        write([prepare_row(event.initiative, event.details)], lambda: details_done(event))
+
+                    if should_stop is not None and should_stop():
+                        stopped = True
+                        break
+            finally:
+                events.close()
+                if frontier is not None:
+                    frontier.release()
+
+            # Адреса с ошибкой загрузки вернулись в очередь (до MAX_ATTEMPTS попыток) -
+            # повторяем их в этом же обходе, чтобы незавершенная очередь означала
+            # только прерванный обход
+            if stopped or frontier is None or not frontier.unfinished():
+                break
+            list_seeds, detail_seeds = self._resume_seeds(frontier)
+            self.logger.info(f"Повтор после ошибок: страниц списков {len(list_seeds)}, "
+                             f"деталей {len(detail_seeds)}")
+
+        return totals
+
+    def _resume_seeds(self, frontier):
+        """Ожидающие адреса очереди: (страницы списков для _events, инициативы для деталей)"""
+        items = frontier.resume()
+        list_seeds = [(Listing(**item.payload), item.page, item.url)
+                      for item in items if item.kind == 'list']
+        detail_seeds = [item.payload for item in items if item.kind == 'detail']
+        return list_seeds, detail_seeds
+
+
+def main():
+    import argparse
+    from database import DEFAULT_DB_PATH, get_database
+    from ingest import load_known_keys
+    from migrations import migrate
+    from frontier import Frontier
+    from roi_parser import ROIParser
+    from http_cache import HTTPCache
+
+    arg_parser = argparse.ArgumentParser(description='Обход всех списков инициатив roi.ru')
+    arg_parser.add_argument('--db', default=DEFAULT_DB_PATH, help='файл базы')
+    arg_parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help='страниц в каждом списке')
+    arg_parser.add_argument('--levels', default=','.join(map(str, LEVELS)), help='уровни через запятую')
+    arg_parser.add_argument('--sections', default=','.join(SECTIONS), help='разделы через запятую')
+    arg_parser.add_argument('--workers', type=int, default=8, help='потоков загрузки')
+    arg_parser.add_argument('--rps', type=float, default=1.0, help='запросов в секунду на хост')
+    arg_parser.add_argument('--no-details', action='store_true', help='не загружать детальные страницы')
+    arg_parser.add_argument('--restart', action='store_true', help='не продолжать прерванный обход, начать заново')
+    args = arg_parser.parse_args()
+
+    parser = ROIParser(requests_per_second=args.rps, http_cache=HTTPCache())
+    orchestrator = CrawlOrchestrator(
+        parser,
+        listings(parser.base_url, args.sections.split(','), [int(level) for level in args.levels.split(',')]),
+        max_pages=args.max_pages, max_workers=args.workers)
+
+    database = get_database(args.db)
+    conn = database.connection()
+    migrate(conn)
+    frontier = Frontier(conn)
+    if args.restart:
+        frontier.reset()
+    known_ids, known_urls = load_known_keys(conn)
+
+    def is_new(initiative):
+        return not args.no_details and initiative['external_id'] not in known_ids \
+            and initiative['url'] not in known_urls
+
+    try:
+        result = orchestrator.crawl_into(conn, frontier, needs_details=is_new)
+    except KeyboardInterrupt:
+        print("\nОбход остановлен - следующий запуск продолжит его")
+        return
+    finally:
+        database.close()
+
+    stats = orchestrator.stats()
+    print(f"✓ Страниц: {stats.pages}, инициатив: {stats.listed} (повторов в списках: {stats.duplicates}), "
+          f"деталей: {stats.details}, ошибок: {stats.errors}")
+    print(f"  Добавлено: {result.added}, обновлено: {result.updated}, без изменений: {result.unchanged}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий доступ к data/roi.db для консоли, окон и фоновых потоков
+
+Соединение открывается один раз на поток и живет до закрытия программы:
+WAL позволяет окну читать, пока фоновое обновление пишет, а кэш
+подготовленных запросов sqlite3 (cached_statements) работает, только пока
+соединение не пересоздается.
+"""
+
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = 'data/roi.db'
+
+# Сколько подготовленных запросов хранит каждое соединение
+CACHED_STATEMENTS = 256
+
+PRAGMAS = [
+    ('journal_mode', 'WAL'),       # читатели не ждут писателя
+    ('synchronous', 'NORMAL'),     # в режиме WAL надежно и без fsync на каждый коммит
+    ('cache_size', -32000),        # 32 МБ кэша страниц
+    ('mmap_size', 268435456),      # чтение файла базы через mmap (до 256 МБ)
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),        # ждать блокировку записи до 5 секунд
+]
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Новое соединение с настройками PRAGMAS"""
+    conn = sqlite3.connect(db_path, timeout=5.0, cached_statements=CACHED_STATEMENTS)
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+class Database:
+    """
+    Долгоживущие соединения с одной базой: по одному на поток
+    (sqlite3 не разрешает использовать соединение из чужого потока)
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def connection(self):
+        """Соединение текущего потока (создается при первом обращении)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def close(self):
+        """Закрыть соединение текущего потока (фоновый поток вызывает в конце работы)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Обновить статистику планировщика по запросам этого соединения
+            conn.execute('PRAGMA optimize')
+            conn.close()
+            self._local.conn = None
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path=DEFAULT_DB_PATH):
+    """Общий Database для файла базы - все модули программы работают через него"""
+    with _databases_lock:
+        database = _databases.get(db_path)
+        if database is None:
+            database = Database(db_path)
+            _databases[db_path] = database
+        return database
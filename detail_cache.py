@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Карточка выбранной инициативы для MainWindow: готовый HTML в LRU-кэше
+
+Запись кэша действительна, пока у строки тот же row_version (миграция 8):
+проверка - один поиск по первичному ключу без чтения длинных текстов.
+Соседние строки списка готовятся заранее в фоновом потоке, поэтому при
+листании стрелками карточка показывается сразу.
+"""
+
+import sys
+from collections import OrderedDict, namedtuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import get_database
+
+Detail = namedtuple('Detail', 'html title votes anti_votes end_date url')
+
+DETAIL_SQL = '''
+    SELECT row_version, title, votes, anti_votes, full_text, proposal_text, result_text,
+           combined_text, end_date, url
+    FROM initiatives WHERE id = ?
+'''
+
+# Сколько памяти занимает HTML в кэше (байт)
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def render_detail(title, votes, anti_votes, full_text, proposal_text, result_text,
+                  combined_text, end_date, url):
+    """HTML карточки инициативы (без обращения к БД и виджетам)"""
+    display_text = ""
+
+    if full_text:
+        display_text += f"<h3>{title}</h3>"
+        display_text += f"<div style='margin-bottom: 20px;'>{full_text}</div>"
+
+    if result_text:
+        display_text += "<h4>Практический результат:</h4>"
+        display_text += f"<div style='margin-bottom: 20px; padding: 10px; background: #f0f7ff; border-radius: 5px;'>{result_text}</div>"
+
+    if proposal_text:
+        display_text += "<h4>Решение:</h4>"
+        display_text += f"<div style='margin-bottom: 20px; padding: 10px; background: #f0fff0; border-radius: 5px;'>{proposal_text}</div>"
+
+    if not display_text and combined_text:
+        display_text = f"<h3>{title}</h3><div>{combined_text}</div>"
+
+    if not display_text:
+        display_text = f"<h3>{title}</h3><p>Полный текст инициативы отсутствует в базе данных.</p>"
+
+    return Detail(display_text, title, votes, anti_votes, end_date, url)
+
+
+def load_detail(conn, initiative_id):
+    """
+    Карточка из БД
+    Returns:
+        (row_version, Detail) или None, если инициативы нет
+    """
+    row = conn.execute(DETAIL_SQL, (initiative_id,)).fetchone()
+    if row is None:
+        return None
+    return row[0], render_detail(*row[1:])
+
+
+class DetailCache:
+    """LRU-кэш карточек: ключ - id, запись хранит row_version, объем ограничен max_bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()   # id -> (row_version, Detail, размер)
+
+    def get(self, initiative_id, row_version):
+        """Карточка, если она построена для этой версии строки, иначе None"""
+        entry = self._entries.get(initiative_id)
+        if entry is None or entry[0] != row_version:
+            return None
+        self._entries.move_to_end(initiative_id)
+        return entry[1]
+
+    def put(self, initiative_id, row_version, detail):
+        self.discard(initiative_id)
+        size = sys.getsizeof(detail.html)
+        self._entries[initiative_id] = (row_version, detail, size)
+        self.size += size
+        # Вытесняем давно не открывавшиеся карточки
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def revalidate(self, initiative_id, old_version, new_version):
+        """
+        Строка изменилась, но не в том, что показывает карточка (например, голос
+        пользователя): запись, построенная для old_version, остается действительной
+        """
+        entry = self._entries.get(initiative_id)
+        if entry is not None and entry[0] == old_version:
+            self._entries[initiative_id] = (new_version,) + entry[1:]
+
+    def discard(self, initiative_id):
+        entry = self._entries.pop(initiative_id, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def __contains__(self, initiative_id):
+        return initiative_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _PrefetchSignals(QObject):
+    loaded = pyqtSignal(int, int, object)   # id, row_version, Detail
+    skipped = pyqtSignal(int)               # id: строки нет или загрузка упала
+
+
+class _PrefetchTask(QRunnable):
+    def __init__(self, db_path, ids, signals):
+        super().__init__()
+        self.db_path = db_path
+        self.ids = ids
+        self.signals = signals
+
+    def run(self):
+        # У потока пула свое долгоживущее соединение (Database.connection)
+        conn = get_database(self.db_path).connection()
+        for initiative_id in self.ids:
+            try:
+                loaded = load_detail(conn, initiative_id)
+            except Exception:
+                loaded = None
+            if loaded is not None:
+                self.signals.loaded.emit(initiative_id, *loaded)
+            else:
+                self.signals.skipped.emit(initiative_id)
+
+
+class DetailPrefetcher(QObject):
+    """
+    Фоновая подготовка карточек соседних строк. Готовые карточки кладутся в
+    кэш в потоке интерфейса (через сигнал), поэтому кэшу не нужны блокировки.
+    """
+
+    def __init__(self, db_path, cache, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.cache = cache
+        self._pending = set()
+        # Один поток, который не завершается между запросами: соединение с БД
+        # открывается один раз
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+        self.signals = _PrefetchSignals(self)
+        self.signals.loaded.connect(self._on_loaded)
+        self.signals.skipped.connect(self._on_skipped)
+
+    def prefetch(self, ids):
+        """Подготовить карточки, которых еще нет в кэше"""
+        ids = [initiative_id for initiative_id in ids
+               if initiative_id is not None and initiative_id not in self.cache
+               and initiative_id not in self._pending]
+        if ids:
+            self._pending.update(ids)
+            self.pool.start(_PrefetchTask(self.db_path, ids, self.signals))
+
+    def _on_loaded(self, initiative_id, row_version, detail):
+        self._pending.discard(initiative_id)
+        self.cache.put(initiative_id, row_version, detail)
+
+    def _on_skipped(self, initiative_id):
+        # Без этого строка больше никогда не попала бы в фоновую подготовку
+        self._pending.discard(initiative_id)
+
+    def wait(self):
+        self.pool.clear()
+        self.pool.waitForDone()
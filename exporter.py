@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Потоковый экспорт инициатив из БД в CSV, JSON Lines, JSON и Parquet
+
+Строки читаются из SQLite порциями (fetchmany) и сразу пишутся в файл,
+поэтому память не зависит от размера выгрузки. Формат определяется по
+расширению: .csv, .jsonl, .json, .parquet; .gz в конце - сжатие gzip
+(для текстовых форматов). Parquet требует pyarrow.
+
+Запуск:
+    python exporter.py exports/initiatives.jsonl.gz
+    python exporter.py exports/voted.csv --columns id,title,vote --where "vote IS NOT NULL"
+"""
+
+import os
+import csv
+import gzip
+import json
+import time
+
+from database import DEFAULT_DB_PATH
+
+FORMATS = ('csv', 'jsonl', 'json', 'parquet')
+
+# Строк в одной порции чтения (и в одной группе строк Parquet)
+CHUNK_SIZE = 1000
+
+CSV_DELIMITER = ';'
+
+# Колонки записей парсера для CSV и Parquet (в JSON записи пишутся целиком)
+RECORD_COLUMNS = ('external_id', 'title', 'description', 'url', 'category', 'level', 'votes',
+                  'anti_votes', 'created_date', 'parsed_at', 'source', 'full_text', 'proposal_text',
+                  'result_text', 'end_date', 'combined_text', 'author', 'status', 'initiative_status',
+                  'views', 'comments')
+
+
+def detect_format(path):
+    """
+    Формат и сжатие по имени файла
+    Returns:
+        (формат, gzip ли)
+    """
+    name = path.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip('.')
+    if extension not in FORMATS:
+        raise ValueError(f"Неизвестный формат экспорта: {path} (поддерживаются {', '.join(FORMATS)}, .gz)")
+    if compressed and extension == 'parquet':
+        raise ValueError("Parquet сжимается сам - расширение .gz для него не нужно")
+    return extension, compressed
+
+
+def export(conn, path, columns=None, where_sql='1=1', params=(), order_by='added_date DESC',
+           headers=None, table='initiatives', chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    Выгрузка строк таблицы в файл
+    Args:
+        columns: список колонок (по умолчанию все)
+        where_sql, params: условие отбора
+        order_by: порядок строк (None - как хранятся, быстрее всего)
+        headers: подписи колонок для CSV (по умолчанию имена колонок)
+        on_progress: функция (записано, всего) - вызывается после каждой порции
+    Returns:
+        число записанных строк
+    """
+    fmt, compressed = detect_format(path)
+    if columns is None:
+        columns = [column[1] for column in conn.execute(f'PRAGMA table_info({table})')]
+
+    total = None
+    if on_progress is not None:
+        total = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where_sql}', params).fetchone()[0]
+
+    sql = f'SELECT {", ".join(columns)} FROM {table} WHERE {where_sql}'
+    if order_by:
+        sql += f' ORDER BY {order_by}'
+    # Отдельный курсор: чтение идет порциями до конца записи
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+
+    def chunks():
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    try:
+        types = _column_types(conn, table, columns) if fmt == 'parquet' else None
+        return _write(path, fmt, compressed, columns, chunks(), headers=headers, types=types,
+                      total=total, on_progress=on_progress)
+    finally:
+        cursor.close()
+
+
+def write_records(records, path, columns=None, chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    Запись словарей (например, результата парсера) в файл тем же способом
+    Args:
+        records: итерируемые dict
+        columns: ключи для записи; по умолчанию JSON/JSON Lines получают записи
+            целиком, а CSV и Parquet - колонки RECORD_COLUMNS
+    Returns:
+        число записанных строк
+    """
+    fmt, compressed = detect_format(path)
+    if columns is None and fmt in ('csv', 'parquet'):
+        columns = RECORD_COLUMNS
+
+    if columns is None:
+        def convert(record):
+            return record
+    else:
+        def convert(record):
+            return tuple(record.get(column) for column in columns)
+
+    def chunks():
+        chunk = []
+        for record in records:
+            chunk.append(convert(record))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    return _write(path, fmt, compressed, columns, chunks(), on_progress=on_progress)
+
+
+def _write(path, fmt, compressed, columns, chunks, headers=None, types=None, total=None, on_progress=None):
+    """
+    Запись порций строк во временный файл и переименование (недописанный файл не остается)
+    columns=None - строки уже dict (только для JSON и JSON Lines)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f'{path}.part'
+
+    written = 0
+
+    def progress(rows):
+        nonlocal written
+        written += len(rows)
+        if on_progress is not None:
+            on_progress(written, total)
+
+    try:
+        if fmt == 'parquet':
+            _write_parquet(temp_path, columns, chunks, types, progress)
+        else:
+            opener = gzip.open if compressed else open
+            with opener(temp_path, 'wt', encoding='utf-8', newline='') as f:
+                if fmt == 'csv':
+                    writer = csv.writer(f, delimiter=CSV_DELIMITER)
+                    writer.writerow(headers or columns)
+                    for rows in chunks:
+                        writer.writerows(rows)
+                        progress(rows)
+                elif fmt == 'jsonl':
+                    for rows in chunks:
+                        f.writelines(_json_dumps(columns, row) + '\n' for row in rows)
+                        progress(rows)
+                else:
+                    # Массив JSON без отступов, по одной записи в строке
+                    f.write('[')
+                    first = True
+                    for rows in chunks:
+                        for row in rows:
+                            f.write('\n' if first else ',\n')
+                            f.write(_json_dumps(columns, row))
+                            first = False
+                        progress(rows)
+                    f.write('\n]\n')
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return written
+
+
+def _json_dumps(columns, row):
+    record = row if columns is None else dict(zip(columns, row))
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _column_types(conn, table, columns):
+    """Объявленные типы колонок (для схемы Parquet)"""
+    declared = {column[1]: (column[2] or '').upper() for column in conn.execute(f'PRAGMA table_info({table})')}
+    return [declared.get(column, '') for column in columns]
+
+
+def _write_parquet(path, columns, chunks, types, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Для экспорта в Parquet установите pyarrow: pip install pyarrow")
+
+    # Целые колонки - int64, остальные - строки
+    integer = ['INT' in column_type for column_type in (types or [''] * len(columns))]
+    schema = pa.schema([(column, pa.int64() if is_int else pa.string())
+                        for column, is_int in zip(columns, integer)])
+    # Каждая порция - отдельная группа строк: в памяти одна порция
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for rows in chunks:
+            data = {column: [row[i] if integer[i] or row[i] is None else str(row[i]) for row in rows]
+                    for i, column in enumerate(columns)}
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            progress(rows)
+
+
+def print_progress(written, total):
+    """Прогресс для консоли"""
+    if total:
+        print(f"\r  Записано {written} из {total} ({written * 100 // total}%)", end='', flush=True)
+    else:
+        print(f"\r  Записано {written}", end='', flush=True)
+
+
+def main():
+    import argparse
+    from database import connect
+
+    arg_parser = argparse.ArgumentParser(description='Экспорт инициатив из БД')
+    arg_parser.add_argument('path', help='файл экспорта (.csv, .jsonl, .json, .parquet, можно .gz)')
+    arg_parser.add_argument('--db', default=DEFAULT_DB_PATH, help='файл базы')
+    arg_parser.add_argument('--columns', help='колонки через запятую (по умолчанию все)')
+    arg_parser.add_argument('--where', default='1=1', help='условие SQL для отбора строк')
+    arg_parser.add_argument('--order-by', default='added_date DESC', help='порядок строк')
+    args = arg_parser.parse_args()
+
+    conn = connect(args.db)
+    started = time.perf_counter()
+    written = export(conn, args.path,
+                     columns=args.columns.split(',') if args.columns else None,
+                     where_sql=args.where, order_by=args.order_by or None,
+                     on_progress=print_progress)
+    conn.close()
+    print(f"\n✓ Экспортировано {written} строк в {args.path} за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фильтр списка инициатив: статус, уровень, порог голосов и поиск по тексту
+сводятся в одно параметризованное условие WHERE для InitiativeListModel
+"""
+
+from collections import namedtuple
+
+from search import build_match
+
+# Условие для каждого фильтра по статусу (None - без условия)
+STATUS_FILTERS = {
+    'all': None,
+    'new': "status = 'new'",
+    'voted': "vote IN ('for', 'against')",
+    'ignored': "(vote = 'ignore' OR status = 'ignored')",
+}
+
+
+class InitiativeFilter(namedtuple('InitiativeFilter', 'status level min_votes text')):
+    """
+    Набор условий списка
+    Args:
+        status: ключ STATUS_FILTERS
+        level: уровень инициативы или None (все уровни)
+        min_votes: минимум голосов ЗА
+        text: строка поиска (ищется по FTS-индексу)
+    """
+    __slots__ = ()
+
+    def __new__(cls, status='all', level=None, min_votes=0, text=''):
+        return super().__new__(cls, status, level, min_votes, (text or '').strip())
+
+    def where(self):
+        """Условие WHERE по таблице initiatives и его параметры"""
+        conditions = []
+        params = []
+        # Без порога условие не добавляется: счетчик по статусу или уровню
+        # тогда берется из одного индекса
+        if self.min_votes > 0:
+            conditions.append('votes >= ?')
+            params.append(self.min_votes)
+        if STATUS_FILTERS[self.status]:
+            conditions.append(STATUS_FILTERS[self.status])
+        if self.level:
+            conditions.append('level = ?')
+            params.append(self.level)
+        return ' AND '.join(conditions) or '1=1', params
+
+    def match(self):
+        """Запрос FTS5 для строки поиска или None"""
+        return build_match(self.text)
+
+    def is_active(self):
+        """Сужает ли фильтр полный список"""
+        return self != InitiativeFilter()
+
+
+def levels(conn):
+    """Уровни инициатив, которые есть в базе (из счетчиков статистики)"""
+    return [key for (key,) in conn.execute(
+        "SELECT key FROM initiative_counters WHERE kind = 'level' AND key != '' AND count > 0 ORDER BY key")]
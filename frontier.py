@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Очередь обхода сайта в таблице crawl_frontier (миграция 9)
+
+Каждая страница списка и детальная страница текущего обхода - строка с
+состоянием pending / in_progress / done / failed, числом попыток и временем
+загрузки. Методы Frontier не делают commit: изменения фиксируются вместе с
+записью найденных инициатив (CrawlOrchestrator.crawl_into), поэтому после
+падения очередь и таблица initiatives согласованы, и следующий запуск
+продолжает с места остановки, не загружая готовые страницы повторно.
+
+Запуск:
+    python frontier.py [путь_к_бд]            # состояние очереди
+    python frontier.py [путь_к_бд] --reset    # начать следующий обход заново
+"""
+
+import json
+import time
+from collections import namedtuple
+
+from database import DEFAULT_DB_PATH
+
+# После стольких неудачных попыток адрес больше не загружается
+MAX_ATTEMPTS = 3
+
+STATES = ('pending', 'in_progress', 'done', 'failed')
+
+FrontierItem = namedtuple('FrontierItem', ['url', 'kind', 'page', 'payload'])
+
+
+class Frontier:
+    """Очередь обхода в базе инициатив (соединение - то же, что пишет инициативы)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def seeds(self):
+        """Первые страницы списков текущего обхода"""
+        return {url for (url,) in self.conn.execute(
+            "SELECT url FROM crawl_frontier WHERE kind = 'list' AND page = 1")}
+
+    def unfinished(self):
+        """Есть ли незагруженные адреса (прошлый обход прервался)"""
+        return self.conn.execute(
+            "SELECT 1 FROM crawl_frontier WHERE state IN ('pending', 'in_progress') LIMIT 1"
+        ).fetchone() is not None
+
+    def start(self, listings):
+        """Новый обход: очередь очищается, в нее ставятся первые страницы списков"""
+        with self.conn:
+            self.conn.execute('DELETE FROM crawl_frontier')
+            for listing in listings:
+                self.add_list_page(listing, 1, listing.url)
+
+    def resume(self):
+        """
+        Продолжение прерванного обхода: загрузки, начатые до сбоя, снова в очереди
+        Returns:
+            FrontierItem ожидающих адресов (payload - dict)
+        """
+        with self.conn:
+            self.conn.execute("UPDATE crawl_frontier SET state = 'pending' WHERE state = 'in_progress'")
+        return [FrontierItem(url, kind, page, json.loads(payload) if payload else None)
+                for url, kind, page, payload in self.conn.execute(
+                    "SELECT url, kind, page, payload FROM crawl_frontier WHERE state = 'pending' "
+                    "ORDER BY kind = 'detail', added_at")]
+
+    def add_list_page(self, listing, page, url):
+        self.conn.execute('''
+            INSERT OR IGNORE INTO crawl_frontier (url, kind, page, payload, added_at)
+            VALUES (?, 'list', ?, ?, ?)
+        ''', (url, page, json.dumps(listing._asdict(), ensure_ascii=False), time.time()))
+
+    def add_details(self, initiatives):
+        """Детальные страницы в очередь; инициатива хранится, чтобы после сбоя записать ее с деталями"""
+        now = time.time()
+        self.conn.executemany('''
+            INSERT OR IGNORE INTO crawl_frontier (url, kind, payload, added_at)
+            VALUES (?, 'detail', ?, ?)
+        ''', [(initiative['url'], json.dumps(initiative, ensure_ascii=False, default=str), now)
+              for initiative in initiatives])
+
+    def claim(self, url):
+        """Загрузка началась (фиксируется сразу, чтобы попытка учитывалась и после сбоя)"""
+        with self.conn:
+            self.conn.execute('''
+                UPDATE crawl_frontier SET state = 'in_progress', attempts = attempts + 1, last_fetched = ?
+                WHERE url = ?
+            ''', (time.time(), url))
+
+    def done(self, url):
+        self.conn.execute(
+            "UPDATE crawl_frontier SET state = 'done', error = NULL, last_fetched = ? WHERE url = ?",
+            (time.time(), url))
+
+    def failed(self, url, error):
+        """
+        Ошибка загрузки: адрес остается в очереди до MAX_ATTEMPTS попыток
+        (CrawlOrchestrator.crawl_into повторяет его в том же обходе), потом - failed
+        """
+        self.conn.execute('''
+            UPDATE crawl_frontier
+            SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?
+            WHERE url = ?
+        ''', (MAX_ATTEMPTS, str(error), url))
+
+    def release(self):
+        """Остановленный обход: начатые, но не законченные загрузки снова ожидают"""
+        with self.conn:
+            self.conn.execute("UPDATE crawl_frontier SET state = 'pending' WHERE state = 'in_progress'")
+
+    def counts(self):
+        """Число адресов по состояниям: {(вид, состояние): число}"""
+        return {(kind, state): count for kind, state, count in self.conn.execute(
+            'SELECT kind, state, COUNT(*) FROM crawl_frontier GROUP BY kind, state')}
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM crawl_frontier')
+
+
+def main():
+    import argparse
+    from database import connect
+    from migrations import migrate
+
+    arg_parser = argparse.ArgumentParser(description='Очередь обхода сайта')
+    arg_parser.add_argument('db', nargs='?', default=DEFAULT_DB_PATH, help='файл базы')
+    arg_parser.add_argument('--reset', action='store_true', help='очистить очередь')
+    args = arg_parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+    frontier = Frontier(conn)
+    if args.reset:
+        frontier.reset()
+        print("✓ Очередь обхода очищена")
+    counts = frontier.counts()
+    for kind, title in (('list', 'Страницы списков'), ('detail', 'Детальные страницы')):
+        print(f"{title}: " + ', '.join(f"{state} {counts.get((kind, state), 0)}" for state in STATES))
+    if frontier.unfinished():
+        print("Обход не завершен - следующий запуск продолжит его")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
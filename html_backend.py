@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Выбор HTML-парсера для страниц roi.ru и выборочный разбор (SoupStrainer)
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# lxml в разы быстрее встроенного html.parser; если его нет - работаем по-старому
+DEFAULT_FEATURES = 'lxml' if HAS_LXML else 'html.parser'
+
+# Блоки страницы списка, которые читает ROIParser: карточки инициатив и пагинация
+LIST_PAGE_CLASSES = {'col-1', 'col-2', 'item', 'pagination', 'yiiPager'}
+
+# Блоки детальной страницы: текст, правая колонка с голосами и датой,
+# заголовки разделов и следующие за ними блоки результата/решения
+DETAIL_PAGE_CLASSES = {'petition-text-block', 'col-right', 'paragraph-transform',
+                       'decision-item', 'author', 'voting-solution'}
+DETAIL_PAGE_TAGS = {'h2'}
+
+
+def _classes(attrs):
+    """Классы элемента из сырых атрибутов (строка или список)"""
+    value = (attrs or {}).get('class') or ''
+    if isinstance(value, str):
+        return value.split()
+    return value
+
+
+def _list_block(name, attrs=None):
+    return name == 'div' and not LIST_PAGE_CLASSES.isdisjoint(_classes(attrs))
+
+
+def _detail_block(name, attrs=None):
+    return name in DETAIL_PAGE_TAGS or not DETAIL_PAGE_CLASSES.isdisjoint(_classes(attrs))
+
+
+class _BlockStrainer(SoupStrainer):
+    """
+    SoupStrainer, пропускающий верхнеуровневые блоки по функции match(name, attrs).
+    bs4 < 4.13 вызывает функцию-имя с (name, attrs) сам, в bs4 >= 4.13 решение
+    принимает allow_tag_creation.
+    """
+
+    def __init__(self, match):
+        super().__init__(match)
+        self.match = match
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.match(name, attrs)
+
+
+STRAINERS = {
+    'list': _BlockStrainer(_list_block),
+    'detail': _BlockStrainer(_detail_block),
+}
+
+
+def make_soup(content, page=None, features=None, selective=False):
+    """
+    Разбор HTML страницы
+    Args:
+        content: HTML (bytes или str)
+        page: тип страницы - 'list' или 'detail' (нужен для selective)
+        features: парсер BeautifulSoup ('lxml', 'html.parser', ...), по умолчанию самый быстрый доступный
+        selective: строить дерево только из нужных блоков страницы
+    Returns:
+        BeautifulSoup
+    """
+    parse_only = STRAINERS.get(page) if selective else None
+    return BeautifulSoup(content, features or DEFAULT_FEATURES, parse_only=parse_only)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Дисковый HTTP-кэш страниц roi.ru с условными запросами
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import json
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Время жизни записи по классу URL (первое совпадение), секунды
+DEFAULT_TTL_RULES = [
+    (r'/poll/complete', 7 * 24 * 3600),   # списки завершенных инициатив почти не меняются
+    (r'/poll/', 5 * 60),                  # списки на голосовании обновляются часто
+    (r'/\d+/?$', 30 * 60),                # детальные страницы (меняется число голосов)
+]
+
+# Для детальной страницы, голосование по которой закончилось
+CLOSED_INITIATIVE_TTL = 30 * 24 * 3600
+
+# Заголовки ответа, которые храним вместе с телом
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HTTPCache:
+    """
+    Кэш тел ответов на диске.
+    Индекс (ETag, Last-Modified, время загрузки и последнего обращения) хранится
+    в SQLite, тела - отдельными файлами. При превышении max_bytes удаляются
+    записи, к которым дольше всего не обращались (LRU).
+    """
+
+    def __init__(self, cache_dir='data/http_cache', max_bytes=200 * 1024 * 1024,
+                 ttl_rules=None, default_ttl=30 * 60):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_rules = [(re.compile(pattern), ttl)
+                          for pattern, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Кэшем пользуются потоки загрузки деталей, поэтому общее соединение + блокировка
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                ttl INTEGER
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)')
+        self.conn.commit()
+
+    def ttl_for(self, url):
+        """Время жизни записи по классу URL"""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _path(self, filename):
+        return os.path.join(self.cache_dir, filename)
+
+    def lookup(self, url):
+        """
+        Поиск записи в кэше
+        Returns:
+            dict или None: body, headers, etag, last_modified, fresh
+        """
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT filename, headers, etag, last_modified, fetched_at, ttl FROM entries WHERE url = ?',
+                (url,)
+            ).fetchone()
+            if not row:
+                return None
+
+            filename, headers, etag, last_modified, fetched_at, ttl = row
+            try:
+                with open(self._path(filename), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                # Файл удален вручную - забываем запись
+                self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self.conn.commit()
+                return None
+
+            now = time.time()
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE url = ?', (now, url))
+            self.conn.commit()
+
+        if ttl is None:
+            ttl = self.ttl_for(url)
+
+        return {
+            'body': body,
+            'headers': json.loads(headers) if headers else {},
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': now - fetched_at < ttl,
+        }
+
+    def is_fresh(self, url):
+        """Есть ли в кэше неустаревшая запись (без чтения тела)"""
+        with self._lock:
+            row = self.conn.execute('SELECT fetched_at, ttl FROM entries WHERE url = ?', (url,)).fetchone()
+        if not row:
+            return False
+        fetched_at, ttl = row
+        return time.time() - fetched_at < (ttl if ttl is not None else self.ttl_for(url))
+
+    def contains(self, url):
+        with self._lock:
+            return self.conn.execute('SELECT 1 FROM entries WHERE url = ?', (url,)).fetchone() is not None
+
+    def store(self, url, body, headers):
+        """Сохранение тела ответа и валидаторов (ETag / Last-Modified)"""
+        stored = {name: headers[name] for name in STORED_HEADERS if name in headers}
+        filename = hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html'
+        tmp_path = self._path(filename + '.tmp.%d' % threading.get_ident())
+
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self._path(filename))
+
+        now = time.time()
+        with self._lock:
+            self.conn.execute('''
+                INSERT INTO entries (url, filename, size, headers, etag, last_modified, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    filename = excluded.filename,
+                    size = excluded.size,
+                    headers = excluded.headers,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    last_access = excluded.last_access
+            ''', (url, filename, len(body), json.dumps(stored), stored.get('ETag'),
+                  stored.get('Last-Modified'), now, now))
+            self.conn.commit()
+            self._evict()
+
+    def revalidated(self, url, headers):
+        """Сервер ответил 304: запись снова свежая"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute('''
+                UPDATE entries SET fetched_at = ?, last_access = ?,
+                    etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+            ''', (now, now, headers.get('ETag'), headers.get('Last-Modified'), url))
+            self.conn.commit()
+
+    def set_ttl(self, url, ttl):
+        """Индивидуальное время жизни записи (например, для завершенной инициативы)"""
+        with self._lock:
+            self.conn.execute('UPDATE entries SET ttl = ? WHERE url = ?', (ttl, url))
+            self.conn.commit()
+
+    def _evict(self):
+        """Удаление давно не использованных записей сверх лимита размера"""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        victims = []
+        for url, filename, size in self.conn.execute(
+                'SELECT url, filename, size FROM entries ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            victims.append((url, filename))
+            total -= size
+
+        for url, filename in victims:
+            try:
+                os.remove(self._path(filename))
+            except OSError:
+                pass
+        self.conn.executemany('DELETE FROM entries WHERE url = ?', [(url,) for url, _ in victims])
+        self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            for (filename,) in self.conn.execute('SELECT filename FROM entries').fetchall():
+                try:
+                    os.remove(self._path(filename))
+                except OSError:
+                    pass
+            self.conn.execute('DELETE FROM entries')
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session с дисковым кэшем для GET-запросов.
+    Свежие записи отдаются без обращения к сети, устаревшие перепроверяются
+    условным запросом (If-None-Match / If-Modified-Since).
+    В режиме offline сеть не используется вовсе: отдаются сохраненные страницы.
+    """
+
+    def __init__(self, cache, offline=False):
+        super().__init__()
+        self.cache = cache
+        self.offline = offline
+
+    def is_fresh(self, url):
+        """Будет ли запрос обслужен из кэша без обращения к сети"""
+        if self.offline:
+            return self.cache.contains(url)
+        return self.cache.is_fresh(url)
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != 'GET' or params:
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        entry = self.cache.lookup(url)
+
+        if entry and (entry['fresh'] or self.offline):
+            return self._cached_response(url, entry)
+
+        if self.offline:
+            raise requests.ConnectionError(f"Страница отсутствует в кэше (offline): {url}")
+
+        headers = dict(headers or {})
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().request(method, url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.revalidated(url, response.headers)
+            return self._cached_response(url, entry)
+
+        if response.status_code == 200:
+            self.cache.store(url, response.content, response.headers)
+
+        return response
+
+    def _cached_response(self, url, entry):
+        """Сборка requests.Response из записи кэша"""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = url
+        response._content = entry['body']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
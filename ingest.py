@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запись результатов парсинга roi.ru в таблицу initiatives
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+IngestResult = namedtuple('IngestResult', ['added', 'updated', 'unchanged'])
+
+# Поля со страницы списка - есть у каждой спарсенной инициативы
+LIST_FIELDS = ('title', 'description', 'url', 'level', 'votes')
+
+# Поля с детальной страницы - обновляются, только если детали загружались
+DETAIL_FIELDS = ('anti_votes', 'full_text', 'proposal_text', 'result_text', 'end_date',
+                 'combined_text', 'author', 'initiative_status')
+
+# Новая строка получает все поля; существующая - только изменившиеся
+# поля списка и те поля деталей, которые пришли в этой загрузке.
+# Статус и голос пользователя (status, vote, vote_date) не трогаем.
+UPSERT_SQL = '''
+    INSERT INTO initiatives
+    (external_id, title, description, url, category, created_date, status, level,
+     votes, anti_votes, source, full_text, proposal_text, result_text, end_date,
+     combined_text, author, initiative_status)
+    VALUES (:external_id, :title, :description, :url, :category, :created_date, 'new', :level,
+            :votes, COALESCE(:anti_votes, 0), :source, :full_text, :proposal_text, :result_text,
+            :end_date, :combined_text, :author, :initiative_status)
+    ON CONFLICT(external_id) DO UPDATE SET
+        title = excluded.title,
+        description = excluded.description,
+        url = excluded.url,
+        level = excluded.level,
+        votes = excluded.votes,
+        {detail_updates}
+    WHERE {changed}
+'''.format(
+    detail_updates=',\n        '.join(
+        f'{field} = COALESCE(:{field}, {field})' for field in DETAIL_FIELDS),
+    changed=' OR '.join(
+        [f'{field} IS NOT excluded.{field}' for field in LIST_FIELDS] +
+        [f'(:{field} IS NOT NULL AND {field} IS NOT :{field})' for field in DETAIL_FIELDS])
+)
+
+
+def to_int(value):
+    """Число голосов: int как есть, строки вида '12 345' - по цифрам"""
+    if isinstance(value, int):
+        return value
+    digits = ''.join(filter(str.isdigit, str(value or '')))
+    return int(digits) if digits else 0
+
+
+def prepare_row(initiative, details=None):
+    """
+    Строка для upsert_initiatives из инициативы со страницы списка
+    и (необязательно) результата parse_initiative_details
+    """
+    row = {
+        'external_id': initiative['external_id'],
+        'title': initiative['title'],
+        'description': initiative.get('description', ''),
+        'url': initiative['url'],
+        'category': initiative.get('category', 'Федеральные'),
+        'created_date': initiative.get('created_date', datetime.now().strftime('%Y-%m-%d')),
+        'level': initiative.get('level', 'Федеральный'),
+        'votes': to_int(initiative.get('votes')),
+        'source': initiative.get('source', 'roi.ru'),
+    }
+    for field in DETAIL_FIELDS:
+        row[field] = None
+
+    if details:
+        all_text_parts = []
+        if details.get('full_text'):
+            all_text_parts.append(details['full_text'])
+        if details.get('result_text'):
+            all_text_parts.append(f"Практический результат: {details['result_text']}")
+        if details.get('proposal_text'):
+            all_text_parts.append(f"Решение: {details['proposal_text']}")
+
+        row.update({
+            'votes': to_int(details.get('votes', row['votes'])),
+            'anti_votes': to_int(details.get('anti_votes')),
+            'full_text': details.get('full_text', ''),
+            'proposal_text': details.get('proposal_text', ''),
+            'result_text': details.get('result_text', ''),
+            'end_date': details.get('end_date', ''),
+            'combined_text': '\n\n'.join(all_text_parts),
+            'author': details.get('author', ''),
+            'initiative_status': details.get('status', 'на голосовании'),
+        })
+
+    return row
+
+
+def load_known_keys(conn):
+    """
+    Множества external_id и url всех инициатив в базе.
+    Загружаются один раз перед обходом, чтобы не проверять каждую инициативу отдельным запросом.
+    """
+    external_ids = set()
+    urls = set()
+    for external_id, url in conn.execute('SELECT external_id, url FROM initiatives'):
+        external_ids.add(external_id)
+        if url:
+            urls.add(url)
+    return external_ids, urls
+
+
+def _match_existing(conn, rows):
+    """
+    Поиск уже сохраненных инициатив для пакета строк одним запросом через временную таблицу
+    Returns:
+        (множество существующих external_id, словарь url -> external_id существующей строки)
+    """
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS ingest_keys (external_id TEXT, url TEXT)')
+    conn.execute('DELETE FROM ingest_keys')
+    conn.executemany('INSERT INTO ingest_keys (external_id, url) VALUES (?, ?)',
+                     [(row['external_id'], row['url']) for row in rows])
+
+    existing_ids = set()
+    url_owners = {}
+    for external_id, url in conn.execute('''
+        SELECT i.external_id, i.url FROM initiatives i
+        JOIN ingest_keys k ON i.external_id = k.external_id
+        UNION
+        SELECT i.external_id, i.url FROM initiatives i
+        JOIN ingest_keys k ON i.url = k.url
+    '''):
+        existing_ids.add(external_id)
+        if url:
+            url_owners[url] = external_id
+
+    conn.execute('DELETE FROM ingest_keys')
+    return existing_ids, url_owners
+
+
+def upsert_initiatives(conn, rows):
+    """
+    Пакетная запись инициатив одной транзакцией.
+    Дубликаты внутри пакета и с базой ищутся по external_id и по url;
+    новые строки вставляются, у существующих обновляются только изменившиеся поля.
+    Args:
+        conn: соединение sqlite3
+        rows: строки из prepare_row
+    Returns:
+        IngestResult(added, updated, unchanged)
+    """
+    # Дубликаты внутри пакета: последняя версия инициативы побеждает
+    unique = {}
+    for row in rows:
+        unique[row['external_id']] = row
+    by_url = {}
+    for row in unique.values():
+        by_url[row['url']] = row
+    batch = list(by_url.values())
+
+    if not batch:
+        return IngestResult(0, 0, 0)
+
+    with conn:
+        existing_ids, url_owners = _match_existing(conn, batch)
+
+        to_write = []
+        added = 0
+        matched = 0
+        for row in batch:
+            owner = url_owners.get(row['url'])
+            if row['external_id'] in existing_ids:
+                if owner is not None and owner != row['external_id']:
+                    # url уже принадлежит другой инициативе - не трогаем обе
+                    matched += 1
+                    continue
+                matched += 1
+            elif owner is not None:
+                # Та же страница под другим идентификатором - обновляем найденную строку
+                row = dict(row, external_id=owner)
+                matched += 1
+            else:
+                added += 1
+            to_write.append(row)
+
+        # rowcount не учитывает строки, измененные триггерами
+        cursor = conn.executemany(UPSERT_SQL, to_write)
+        updated = cursor.rowcount - added
+
+    return IngestResult(added, updated, matched - updated)
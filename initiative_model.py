@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модель и делегат списка инициатив для MainWindow
+
+Модель хранит только легкие поля (без текстов инициатив) и подгружает строки
+порциями через canFetchMore/fetchMore, делегат рисует только видимые строки.
+"""
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+from database import get_database
+from search import FTS_JOIN, snippets
+
+IdRole = Qt.UserRole + 1
+VotesRole = Qt.UserRole + 2
+AntiVotesRole = Qt.UserRole + 3
+VoteRole = Qt.UserRole + 4
+LevelRole = Qt.UserRole + 5
+SnippetRole = Qt.UserRole + 6
+
+# Поля строки списка - без full_text/combined_text
+LIST_COLUMNS = 'id, title, votes, anti_votes, vote, level'
+ID, TITLE, VOTES, ANTI_VOTES, VOTE, LEVEL = range(6)
+
+# Те же поля для запроса вместе с initiatives_fts (там тоже есть колонка title)
+JOINED_COLUMNS = ', '.join(f'initiatives.{column}' for column in LIST_COLUMNS.split(', '))
+
+# Ключи сортировки: колонка порядка (по убыванию); вторым ключом всегда id.
+# 'rank' - по релевантности поиска (только вместе с match)
+SORT_KEYS = {
+    'added_date': 'added_date',
+    'votes': 'votes',
+    'rank': 'rank',
+}
+
+
+class InitiativeListModel(QAbstractListModel):
+    """
+    Список инициатив с ленивой подгрузкой.
+    Страницы выбираются по ключу (значение сортировки, id), а не через OFFSET,
+    поэтому прокрутка в конец большой таблицы не замедляется.
+    """
+
+    def __init__(self, db_path, batch_size=200, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        # Общее соединение потока интерфейса (модель живет в нем)
+        self.conn = get_database(db_path).connection()
+        self.rows = []
+        self.keys = []       # (значение сортировки, id) каждой строки - для вставки новых
+        self.positions = {}  # id -> номер строки
+        self.where_sql = '1=1'
+        self.params = ()
+        self.match = None
+        self.snippets = {}   # id -> фрагмент текста с найденными словами (считается при показе)
+        self.sort_key = 'added_date'
+        self.limit = None
+        self._last_key = None
+        self._exhausted = True
+        self._max_id = 0
+
+    def set_query(self, where_sql='1=1', params=(), sort_key='added_date', limit=None, match=None):
+        """
+        Новый набор строк: условие WHERE (с параметрами), ключ сортировки, ограничение числа строк
+        и запрос полнотекстового поиска (search.build_match)
+        """
+        if sort_key == 'rank' and match is None:
+            sort_key = 'added_date'
+        self.beginResetModel()
+        self.where_sql = where_sql
+        self.params = tuple(params)
+        self.match = match
+        self.sort_key = SORT_KEYS[sort_key]
+        self.limit = limit
+        self.rows = []
+        self.keys = []
+        self.positions = {}
+        self.snippets = {}
+        self._last_key = None
+        self._exhausted = False
+        self._max_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM initiatives').fetchone()[0]
+        self.endResetModel()
+
+    def _filter(self):
+        """Условие WHERE и параметры вместе с поиском по тексту"""
+        if self.match is None:
+            return f'({self.where_sql})', list(self.params)
+        return (f'({self.where_sql}) AND id IN (SELECT rowid FROM initiatives_fts WHERE initiatives_fts MATCH ?)',
+                list(self.params) + [self.match])
+
+    def total_count(self):
+        """Сколько строк подходит под текущее условие (с учетом limit)"""
+        where_sql, params = self._filter()
+        count = self.conn.execute(f'SELECT COUNT(*) FROM initiatives WHERE {where_sql}', params).fetchone()[0]
+        return min(count, self.limit) if self.limit is not None else count
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+
+        size = self.batch_size
+        if self.limit is not None:
+            size = min(size, self.limit - len(self.rows))
+            if size <= 0:
+                self._exhausted = True
+                return
+
+        if self.match is None:
+            sql = f'SELECT {LIST_COLUMNS}, {self.sort_key} FROM initiatives WHERE ({self.where_sql})'
+            params = list(self.params)
+        else:
+            sql = (f'SELECT {JOINED_COLUMNS}, {self.sort_key} FROM {FTS_JOIN} '
+                   f'WHERE initiatives_fts MATCH ? AND ({self.where_sql})')
+            params = [self.match] + list(self.params)
+
+        if self.sort_key == 'rank':
+            # Релевантность не хранится в таблице - продолжение по номеру строки
+            sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+            params += [size, len(self.rows)]
+        else:
+            if self._last_key is not None:
+                sql += f' AND ({self.sort_key}, id) < (?, ?)'
+                params += list(self._last_key)
+            sql += f' ORDER BY {self.sort_key} DESC, id DESC LIMIT ?'
+            params.append(size)
+
+        batch = self.conn.execute(sql, params).fetchall()
+        if len(batch) < size:
+            self._exhausted = True
+        if not batch:
+            return
+
+        self._last_key = (batch[-1][-1], batch[-1][ID])
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for offset, row in enumerate(batch):
+            self.positions[row[ID]] = first + offset
+            self.rows.append(row[:-1])
+            self.keys.append((row[-1], row[ID]))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row[TITLE]
+        if role == IdRole:
+            return row[ID]
+        if role == VotesRole:
+            return row[VOTES]
+        if role == AntiVotesRole:
+            return row[ANTI_VOTES]
+        if role == VoteRole:
+            return row[VOTE]
+        if role == LevelRole:
+            return row[LEVEL]
+        if role == SnippetRole:
+            return self.snippet(row[ID])
+        if role == Qt.ToolTipRole:
+            return self.snippet(row[ID]) or row[TITLE]
+        return None
+
+    def snippet(self, initiative_id):
+        """Фрагмент с найденными словами (только при поиске по тексту)"""
+        if self.match is None:
+            return None
+        if initiative_id not in self.snippets:
+            self.snippets.update(snippets(self.conn, self.match, [initiative_id]))
+        return self.snippets.get(initiative_id)
+
+    def id_at(self, row):
+        return self.rows[row][ID] if 0 <= row < len(self.rows) else None
+
+    def row_of(self, initiative_id):
+        """Номер загруженной строки инициативы или None"""
+        return self.positions.get(initiative_id)
+
+    def refresh_row(self, initiative_id):
+        """
+        Перечитать одну строку из БД (например, после голосования).
+        Строка, которая больше не подходит под условие, удаляется из списка.
+        Returns:
+            номер строки или None, если строки нет (или она удалена)
+        """
+        row = self.row_of(initiative_id)
+        if row is None:
+            return None
+        where_sql, params = self._filter()
+        fresh = self.conn.execute(
+            f'SELECT {LIST_COLUMNS} FROM initiatives WHERE id = ? AND {where_sql}',
+            [initiative_id] + params).fetchone()
+        if fresh is None:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            del self.keys[row]
+            self.snippets.pop(initiative_id, None)
+            self.endRemoveRows()
+            self.positions = {item[ID]: i for i, item in enumerate(self.rows)}
+            return None
+        self.rows[row] = fresh
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return row
+
+    def insert_new_rows(self):
+        """
+        Показать строки, добавленные в базу после set_query (например, фоновым обновлением).
+        Строка вставляется на свое место в порядке сортировки, если это место уже
+        загружено; остальные придут обычной подгрузкой при прокрутке.
+        При сортировке по релевантности новые строки появятся при следующем поиске.
+        Returns:
+            сколько строк вставлено
+        """
+        if self.sort_key == 'rank':
+            return 0
+        where_sql, params = self._filter()
+        fresh = self.conn.execute(
+            f'SELECT {LIST_COLUMNS}, {self.sort_key} FROM initiatives '
+            f'WHERE {where_sql} AND id > ? ORDER BY id',
+            params + [self._max_id]).fetchall()
+        if not fresh:
+            return 0
+        self._max_id = fresh[-1][ID]
+
+        inserted = 0
+        for row in fresh:
+            key = (row[-1], row[ID])
+            if not self._exhausted and self._last_key is not None and key < self._last_key:
+                continue
+            # keys упорядочены по убыванию - ищем первую строку с ключом меньше нового
+            position = len(self.keys)
+            for i, existing in enumerate(self.keys):
+                if existing < key:
+                    position = i
+                    break
+            if self.limit is not None and position >= self.limit:
+                continue
+
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.rows.insert(position, row[:-1])
+            self.keys.insert(position, key)
+            self.endInsertRows()
+            inserted += 1
+
+            if self.limit is not None and len(self.rows) > self.limit:
+                last = len(self.rows) - 1
+                self.beginRemoveRows(QModelIndex(), last, last)
+                self.rows.pop()
+                self.keys.pop()
+                self.endRemoveRows()
+
+        self.positions = {row[ID]: i for i, row in enumerate(self.rows)}
+        return inserted
+
+    def refresh_loaded(self):
+        """Перечитать загруженные строки (голоса могли измениться после обновления)"""
+        if not self.rows:
+            return
+        fresh = {}
+        ids = [row[ID] for row in self.rows]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self.conn.execute(
+                    f'SELECT {LIST_COLUMNS} FROM initiatives WHERE id IN ({placeholders})', chunk):
+                fresh[row[ID]] = row
+        self.rows = [fresh.get(row[ID], row) for row in self.rows]
+        self.dataChanged.emit(self.index(0), self.index(len(self.rows) - 1))
+
+
+class InitiativeDelegate(QStyledItemDelegate):
+    """
+    Отрисовка строки списка: заголовок, голоса и три кнопки голосования.
+    Кнопки - нарисованные прямоугольники, клики по ним ловит editorEvent.
+    """
+    voted = pyqtSignal(int, object)  # id, vote_type (None - отмена голоса)
+
+    ROW_HEIGHT = 92
+    BUTTONS = [
+        ('for', '👍', QColor('#4CAF50'), QColor('#2E7D32')),
+        ('against', '👎', QColor('#f44336'), QColor('#C62828')),
+        ('ignore', 'в игнор', QColor('#9E9E9E'), QColor('#616161')),
+    ]
+    VOTE_TEXT = {
+        'for': '✅ Ваш голос: ЗА',
+        'against': '❌ Ваш голос: ПРОТИВ',
+        'ignore': '➖ Игнорировано',
+    }
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def _button_rects(self, rect):
+        """Прямоугольники кнопок в правой части строки"""
+        widths = [60, 60, 90]
+        right = rect.right() - 8
+        rects = []
+        for width in reversed(widths):
+            rects.insert(0, QRect(right - width, rect.bottom() - 38, width, 30))
+            right -= width + 4
+        return rects
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(3, 3, -3, -3)
+
+        # Фон и рамка карточки
+        if option.state & QStyle.State_Selected:
+            background, border = QColor('#e3f2fd'), QColor('#2196F3')
+        elif option.state & QStyle.State_MouseOver:
+            background, border = QColor('#f5f5f5'), QColor('#2196F3')
+        else:
+            background, border = QColor('white'), QColor('#e0e0e0')
+        painter.setPen(QPen(border))
+        painter.setBrush(background)
+        painter.drawRoundedRect(rect, 5, 5)
+
+        # Заголовок - не больше двух строк
+        title_font = QFont(option.font)
+        title_font.setBold(True)
+        painter.setFont(title_font)
+        painter.setPen(QColor('#2196F3'))
+        title_rect = rect.adjusted(8, 4, -8, -44)
+        title = painter.fontMetrics().elidedText(index.data(Qt.DisplayRole) or '', Qt.ElideRight,
+                                                 title_rect.width() * 2 - 20)
+        painter.drawText(title_rect, Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, title)
+
+        # Голоса и номер
+        painter.setFont(option.font)
+        painter.setPen(QColor('#666'))
+        info_rect = QRect(rect.left() + 8, rect.bottom() - 42, rect.width() // 2, 38)
+        vote = index.data(VoteRole)
+        info = f"👍 {index.data(VotesRole)} | 👎 {index.data(AntiVotesRole)}   #{index.data(IdRole)}"
+        if vote in self.VOTE_TEXT:
+            info += f"\n{self.VOTE_TEXT[vote]}"
+        painter.drawText(info_rect, Qt.AlignLeft | Qt.AlignVCenter, info)
+
+        # Кнопки голосования; выбранная - темнее, остальные - серые
+        for (vote_type, label, color, active_color), button in zip(self.BUTTONS, self._button_rects(rect)):
+            if vote is None:
+                fill = color
+            else:
+                fill = active_color if vote == vote_type else QColor('#bdbdbd')
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(fill)
+            painter.drawRoundedRect(button, 6, 6)
+            painter.setPen(QColor('white'))
+            painter.drawText(button, Qt.AlignCenter, label)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            rect = option.rect.adjusted(3, 3, -3, -3)
+            for (vote_type, *_), button in zip(self.BUTTONS, self._button_rects(rect)):
+                if button.contains(event.pos()):
+                    # Повторное нажатие той же кнопки отменяет выбор
+                    current = index.data(VoteRole)
+                    self.voted.emit(index.data(IdRole), None if current == vote_type else vote_type)
+                    return True
+        return super().editorEvent(event, model, option, index)
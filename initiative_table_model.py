@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Табличная модель инициатив для ROI_GUI
+
+Строки загружаются один раз, дальше модель только применяет изменения:
+по таймеру проверяется PRAGMA data_version (меняется, когда другое соединение
+записало в базу), и если запись была - выбираются строки с row_version больше
+запомненной (миграция 8). Измененные строки обновляются на месте, новые
+вставляются, неподходящие под фильтр удаляются - выделение и прокрутка
+таблицы сохраняются.
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor, QFont
+
+from search import FTS_JOIN, snippets
+
+# Длинные тексты в таблице не показываются (они есть в окне деталей)
+HIDDEN_COLUMNS = ('full_text', 'proposal_text', 'result_text', 'combined_text', 'row_version')
+
+STATUS_COLORS = {
+    'new': QColor(173, 216, 230),      # голубой
+    'voted': QColor(144, 238, 144),    # зеленый
+    'ignored': QColor(255, 182, 193),  # розовый
+}
+
+# Порядок строк: колонка и направление (rank - релевантность поиска)
+ORDERS = {
+    'added_date': ('added_date', True),
+    'votes': ('votes', True),
+    'rank': (None, False),
+}
+
+
+class InitiativeTableModel(QAbstractTableModel):
+    """Все подходящие под фильтр инициативы; изменения базы применяются построчно"""
+
+    def __init__(self, conn, parent=None):
+        super().__init__(parent)
+        self.conn = conn
+        self.columns = [column[1] for column in conn.execute('PRAGMA table_info(initiatives)')
+                        if column[1] not in HIDDEN_COLUMNS]
+        self.column_sql = ', '.join(f'initiatives.{column}' for column in self.columns)
+        self.id_column = self.columns.index('id')
+        self.rows = []
+        self.positions = {}   # id -> номер строки
+        self.where_sql = '1=1'
+        self.params = ()
+        self.order = 'added_date'
+        self.limit = None
+        self.truncated = False   # есть подходящие строки за пределом limit
+        self.match = None
+        self.snippets = {}
+        self.row_version = 0
+        self.total = 0
+        self.max_id = 0
+        self.data_version = None
+
+    # --- загрузка ---
+
+    def set_query(self, where_sql='1=1', params=(), order='added_date', limit=None, match=None):
+        """Новый фильтр: условие по initiatives, порядок (ключ ORDERS), ограничение, запрос FTS5"""
+        if order == 'rank' and match is None:
+            order = 'added_date'
+        self.where_sql = where_sql
+        self.params = tuple(params)
+        self.order = order
+        self.limit = limit
+        self.match = match
+        self.reload()
+
+    def reload(self):
+        """Полная перезагрузка строк по текущему фильтру"""
+        self.row_version, self.total, self.max_id = self._versions()
+        self.data_version = self._data_version()
+
+        sql, params = self._select()
+        column, descending = ORDERS[self.order]
+        if column is None:
+            sql += ' ORDER BY rank'
+        else:
+            sql += f' ORDER BY initiatives.{column} {"DESC" if descending else "ASC"}, initiatives.id DESC'
+        if self.limit is not None:
+            sql += ' LIMIT ?'
+            params.append(self.limit)
+
+        self.beginResetModel()
+        self.rows = [list(row) for row in self.conn.execute(sql, params)]
+        self.positions = {row[self.id_column]: i for i, row in enumerate(self.rows)}
+        self.truncated = self.limit is not None and len(self.rows) >= self.limit
+        self.snippets = {}
+        self.endResetModel()
+
+    def _select(self, ids=None):
+        """SELECT строк по фильтру (и, если заданы, только с этими id)"""
+        if self.match is None:
+            sql = f'SELECT {self.column_sql} FROM initiatives WHERE ({self.where_sql})'
+            params = list(self.params)
+        else:
+            sql = f'SELECT {self.column_sql} FROM {FTS_JOIN} WHERE initiatives_fts MATCH ? AND ({self.where_sql})'
+            params = [self.match] + list(self.params)
+        if ids is not None:
+            sql += f' AND initiatives.id IN ({", ".join("?" * len(ids))})'
+            params += list(ids)
+        return sql, params
+
+    def _versions(self):
+        """Последняя версия строк, число инициатив (из счетчиков статистики) и последний id"""
+        return self.conn.execute('''
+            SELECT
+                (SELECT COALESCE(MAX(row_version), 0) FROM initiatives),
+                (SELECT COALESCE(SUM(count), 0) FROM initiative_counters WHERE kind = 'total'),
+                (SELECT COALESCE(MAX(id), 0) FROM initiatives)
+        ''').fetchone()
+
+    def _data_version(self):
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    # --- изменения ---
+
+    def poll(self):
+        """
+        Применить изменения, записанные другими соединениями (вызывается таймером).
+        Если в базу никто не писал - один PRAGMA без чтения таблицы.
+        Returns:
+            число измененных строк или None, если изменений не было
+        """
+        data_version = self._data_version()
+        if data_version == self.data_version:
+            return None
+        self.data_version = data_version
+        return self.sync()
+
+    def sync(self):
+        """
+        Применить все изменения после запомненной row_version (и свои тоже:
+        data_version не меняется от записи через это же соединение)
+        Returns:
+            число измененных строк
+        """
+        # Сначала граница версий, потом строки до нее: запись между двумя
+        # запросами попадет в следующую синхронизацию, а не потеряется
+        row_version, total, max_id = self._versions()
+        changed = [row_id for (row_id,) in self.conn.execute(
+            'SELECT id FROM initiatives WHERE row_version > ? AND row_version <= ? ORDER BY row_version',
+            (self.row_version, row_version))]
+
+        # Удаления row_version не отмечает: если строк меньше, чем было плюс
+        # вставленные (id растут), значит что-то удалили - перезагружаем
+        inserted = sum(1 for row_id in changed if row_id > self.max_id)
+        if total < self.total + inserted:
+            self.reload()
+            return len(changed)
+        self.row_version, self.total, self.max_id = row_version, total, max_id
+
+        dropped = 0
+        for start in range(0, len(changed), 500):
+            dropped += self._apply(changed[start:start + 500])
+        # В топе по голосам ушедшие строки освобождают места - их занимают
+        # следующие строки, которых нет среди измененных
+        if dropped and self.truncated and len(self.rows) < self.limit:
+            self.reload()
+        return len(changed)
+
+    def _apply(self, ids):
+        """
+        Обновить, вставить или удалить строки с этими id по текущему фильтру
+        Returns:
+            число строк, которые были в таблице и выпали из нее
+        """
+        sql, params = self._select(ids)
+        matching = {row[self.id_column]: list(row) for row in self.conn.execute(sql, params)}
+
+        dropped = 0
+        for row_id in ids:
+            fresh = matching.get(row_id)
+            position = self.positions.get(row_id)
+            if position is not None and fresh is None:
+                self._remove(position)
+                dropped += 1
+            elif position is not None and self._sort_value(self.rows[position]) == self._sort_value(fresh):
+                self.rows[position] = fresh
+                self.snippets.pop(row_id, None)
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.columns) - 1))
+            elif fresh is not None:
+                # Новая строка или изменился ключ сортировки - ставим на свое место
+                if position is not None:
+                    self._remove(position)
+                self._insert(fresh)
+                if position is not None and row_id not in self.positions:
+                    dropped += 1
+
+        if self.limit is not None:
+            while len(self.rows) > self.limit:
+                self._remove(len(self.rows) - 1)
+                self.truncated = True
+        return dropped
+
+    def _sort_value(self, row):
+        column, _ = ORDERS[self.order]
+        if column is None:
+            return None
+        value = row[self.columns.index(column)]
+        return (value if value is not None else '', row[self.id_column])
+
+    def _insert(self, row):
+        # По релевантности новая строка добавляется в конец, иначе строки
+        # упорядочены по убыванию ключа - двоичный поиск места
+        position = len(self.rows)
+        key = self._sort_value(row)
+        if key is not None:
+            low, high = 0, len(self.rows)
+            while low < high:
+                middle = (low + high) // 2
+                if self._sort_value(self.rows[middle]) > key:
+                    low = middle + 1
+                else:
+                    high = middle
+            position = low
+        # За последней строкой обрезанного топа могут быть незагруженные строки -
+        # место в хвосте неизвестно, такую строку не вставляем
+        if self.limit is not None and (position >= self.limit or
+                                       (self.truncated and position == len(self.rows))):
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, row)
+        self.endInsertRows()
+        self._reindex(position)
+
+    def _remove(self, position):
+        row_id = self.rows[position][self.id_column]
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self.rows[position]
+        self.endRemoveRows()
+        self.positions.pop(row_id, None)
+        self.snippets.pop(row_id, None)
+        self._reindex(position)
+
+    def _reindex(self, start):
+        for i in range(start, len(self.rows)):
+            self.positions[self.rows[i][self.id_column]] = i
+
+    # --- доступ ---
+
+    def id_at(self, row):
+        return self.rows[row][self.id_column] if 0 <= row < len(self.rows) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        row = self.rows[index.row()]
+        column = self.columns[index.column()]
+        value = row[index.column()]
+
+        if role == Qt.DisplayRole:
+            return str(value) if value is not None else ''
+        if role == Qt.BackgroundRole and column == 'status':
+            return STATUS_COLORS.get(value)
+        if column == 'votes' and value and value > 1000:
+            # Много голосов - жирным темно-зеленым
+            if role == Qt.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+            if role == Qt.ForegroundRole:
+                return QColor(0, 100, 0)
+        if role == Qt.ToolTipRole and self.match is not None:
+            # Найденный фрагмент текста считается при наведении
+            row_id = row[self.id_column]
+            if row_id not in self.snippets:
+                self.snippets.update(snippets(self.conn, self.match, [row_id]))
+            return self.snippets.get(row_id)
+        return None
@@ -6,7 +6,6 @@ ROI Assistant - Программа для работы с roi.ru
 
 import sys
 import os
-import sqlite3
 from datetime import datetime
 
 class ROIAssistant:
@@ -17,15 +16,47 @@ class ROIAssistant:
         print("=" * 60)
         
         try:
-            from browser.roi_parser import ROIParser
+            from roi_parser import ROIParser
+            from http_cache import HTTPCache
             
-            parser = ROIParser()
+            parser = ROIParser(http_cache=HTTPCache())
             print("Парсинг федеральных инициатив...")
             print("(Это может занять некоторое время)")
             print("-" * 40)
             
-            # Получаем инициативы (только первую страницу для теста)
-            initiatives = parser.parse_federal_initiatives(max_pages=1)
+            # Получаем инициативы (только первую страницу для теста).
+            # Генератор отдает инициативы по мере разбора страниц, поэтому
+            # запись в базу начинается, не дожидаясь конца обхода
+            from ingest import prepare_row, upsert_initiatives
+            
+            initiatives = []
+            batch = []
+            added_count = 0
+            updated_count = 0
+            duplicate_count = 0
+            
+            def write(batch):
+                # Новая или уже известная - скажет итог upsert, без отдельного чтения таблицы
+                nonlocal added_count, updated_count, duplicate_count
+                result = upsert_initiatives(self.conn, batch)
+                added_count += result.added
+                updated_count += result.updated
+                duplicate_count += result.unchanged
+                print(f"  Записано {len(batch)}: новых {result.added}, обновлено {result.updated}, "
+                      f"без изменений {result.unchanged}")
+            
+            for i, initiative in enumerate(parser.iter_federal_initiatives(max_pages=1), 1):
+                initiatives.append(initiative)
+                batch.append(prepare_row(initiative))
+                print(f"  [{i}] {initiative['title'][:60]}...")
+                
+                # Записываем порциями, чтобы строки появлялись в базе сразу
+                if len(batch) >= 50:
+                    write(batch)
+                    batch = []
+            
+            if batch:
+                write(batch)
             
             if not initiatives:
                 print("Не удалось получить инициативы.")
@@ -35,74 +66,35 @@ class ROIAssistant:
             
             print(f"Получено инициатив: {len(initiatives)}")
             
-            added_count = 0
-            duplicate_count = 0
-            
-            for i, initiative in enumerate(initiatives, 1):
-                # Проверяем, есть ли уже такая инициатива
-                self.cursor.execute(
-                    "SELECT id FROM initiatives WHERE external_id = ? OR url = ?",
-                    (initiative['external_id'], initiative['url'])
-                )
-                
-                if not self.cursor.fetchone():
-                    # Добавляем новую инициативу
-                    self.cursor.execute('''
-                        INSERT INTO initiatives 
-                        (external_id, title, description, url, category, 
-                         created_date, status, level, votes, source)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        initiative['external_id'],
-                        initiative['title'],
-                        initiative.get('description', ''),
-                        initiative['url'],
-                        initiative.get('category', 'Федеральные'),
-                        initiative.get('created_date', datetime.now().strftime('%Y-%m-%d')),
-                        'new',
-                        initiative.get('level', 'Федеральный'),
-                        initiative.get('votes', '0'),
-                        initiative.get('source', 'roi.ru')
-                    ))
-                    added_count += 1
-                    print(f"✓ [{i}] Добавлена: {initiative['title'][:60]}...")
-                else:
-                    duplicate_count += 1
-                    print(f"  [{i}] Уже есть: {initiative['title'][:60]}...")
-            
-            self.conn.commit()
-            
-            # Сохраняем также в JSON для резервной копии
-            import json
-            import os
-            os.makedirs('exports', exist_ok=True)
-            json_file = f"exports/federal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(initiatives, f, ensure_ascii=False, indent=2)
+            # Резервная копия: в архив дописываются только изменившиеся инициативы
+            from archive import Archive
+            with Archive() as archive:
+                archived = archive.append(initiatives)
             
             print(f"\n{'='*60}")
             print("ОБНОВЛЕНИЕ ЗАВЕРШЕНО!")
             print(f"{'='*60}")
             print(f"Добавлено новых: {added_count}")
-            print(f"Пропущено (уже есть): {duplicate_count}")
+            print(f"Обновлено: {updated_count}")
+            print(f"Без изменений: {duplicate_count}")
             print(f"Всего в базе: {self.cursor.execute('SELECT COUNT(*) FROM initiatives').fetchone()[0]}")
-            print(f"JSON сохранен: {json_file}")
+            print(f"В архив: новых {archived.added}, изменилось {archived.changed} ({archive.archive_dir})")
             
             # Логируем действие
             self.cursor.execute(
                 "INSERT INTO logs (level, message) VALUES (?, ?)",
-                ('INFO', f'Загрузка федеральных инициатив: добавлено {added_count}, дубликатов {duplicate_count}')
+                ('INFO', f'Загрузка федеральных инициатив: добавлено {added_count}, обновлено {updated_count}, без изменений {duplicate_count}')
             )
             self.conn.commit()
             
         except ImportError:
-            print("✗ Модуль парсера не найден. Убедитесь что файл browser/roi_parser.py существует")
+            print("✗ Модуль парсера не найден. Убедитесь что файл roi_parser.py существует")
         except Exception as e:
             print(f"✗ Ошибка загрузки: {e}")
             import traceback
             traceback.print_exc()
         
-    input("\nНажмите Enter для продолжения...")
+        input("\nНажмите Enter для продолжения...")
 
 
 
@@ -113,7 +105,7 @@ class ROIAssistant:
         print("=" * 60)
         
         try:
-            from browser.roi_parser import ROIParser
+            from roi_parser import ROIParser
             
             parser = ROIParser()
             print("Парсинг сайта roi.ru...")
@@ -164,7 +156,7 @@ class ROIAssistant:
             self.conn.commit()
             
         except ImportError:
-            print("✗ Модуль парсера не найден. Убедитесь что файл browser/roi_parser.py существует")
+            print("✗ Модуль парсера не найден. Убедитесь что файл roi_parser.py существует")
         except Exception as e:
             print(f"✗ Ошибка обновления: {e}")
             import traceback
@@ -181,7 +173,10 @@ class ROIAssistant:
         self.create_folders()
         
         # СОЕДИНЕНИЕ С БД ДОЛЖНО БЫТЬ ЗДЕСЬ
-        self.conn = sqlite3.connect('data/roi.db')
+        # Общее долгоживущее соединение (WAL, кэш запросов) - то же, что у окон
+        from database import get_database
+        self.db = get_database('data/roi.db')
+        self.conn = self.db.connection()
         self.cursor = self.conn.cursor()
 
         # Инициализируем базу данных
@@ -203,78 +198,23 @@ class ROIAssistant:
         try:
             # self.conn = sqlite3.connect('data/roi.db')
             # self.cursor = self.conn.cursor()
-                        
-            # Таблица инициатив
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS initiatives (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        external_id TEXT UNIQUE,
-                        title TEXT NOT NULL,
-                        description TEXT,
-                        url TEXT,
-                        category TEXT,
-                        level TEXT DEFAULT 'Федеральный',
-                        votes TEXT DEFAULT '0',
-                        anti_votes TEXT DEFAULT '0',
-                        status TEXT DEFAULT 'new',
-                        vote TEXT,
-                        vote_date TEXT,
-                        source TEXT DEFAULT 'roi.ru',
-                        full_text TEXT,
-                        proposal_text TEXT,
-                        result_text TEXT,
-                        end_date TEXT,
-                        combined_text TEXT,
-                        author TEXT,
-                        initiative_status TEXT,
-                        created_date TEXT,  
-                        added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-            # ПРОВЕРКА: какие таблицы созданы
-                self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = self.cursor.fetchall()
-                print(f"Таблицы в базе: {tables}")
-
-            # Таблица логов
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS logs (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        level TEXT,
-                        message TEXT,
-                        details TEXT
-                    )
-                ''')
+            from migrations import migrate
             
-            # Таблица пользовательских настроек
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS settings (
-                        key TEXT PRIMARY KEY,
-                        value TEXT
-                    )
-                ''')
+            # Таблицы, индексы и начальные настройки создаются миграциями схемы
+            for migration in migrate(self.conn):
+                print(f"✓ Миграция схемы {migration.version}: {migration.description}")
             
-            # Начальные настройки
-                default_settings = [
-                    ('check_interval', '300'),  # 5 минут
-                    ('auto_vote', 'false'),
-                    ('browser_type', 'firefox'),
-                    ('language', 'ru')
-                ]
+            # ПРОВЕРКА: какие таблицы созданы
+            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = self.cursor.fetchall()
+            print(f"Таблицы в базе: {tables}")
             
-                self.cursor.executemany(
-                    'INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
-                    default_settings
-                )
-                
-                self.conn.commit()
-                print("✓ База данных инициализирована")
+            print("✓ База данных инициализирована")
             
             # Показываем статистику
-                self.cursor.execute("SELECT COUNT(*) FROM initiatives")
-                count = self.cursor.fetchone()[0]
-                print(f"  Всего инициатив в базе: {count}")
+            self.cursor.execute("SELECT COUNT(*) FROM initiatives")
+            count = self.cursor.fetchone()[0]
+            print(f"  Всего инициатив в базе: {count}")
             
         except Exception as e:
             print(f"✗ Ошибка инициализации БД: {e}")
@@ -283,8 +223,8 @@ class ROIAssistant:
     
     def __del__(self):
         """Деструктор - закрываем соединение с БД"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'db'):
+            self.db.close()
             
     def test_libraries(self):
         """Тест установленных библиотек"""
@@ -295,6 +235,7 @@ class ROIAssistant:
             ('sqlite3', 'Встроена в Python'),
             ('requests', 'Для HTTP запросов'),
             ('BeautifulSoup', 'Для парсинга HTML'),
+            ('lxml', 'Быстрый HTML-парсер (необязательно)'),
             ('PyQt5', 'Для графического интерфейса'),
             ('selenium', 'Для автоматизации браузера')
         ]
@@ -310,6 +251,9 @@ class ROIAssistant:
                 elif lib_name == 'BeautifulSoup':
                     from bs4 import BeautifulSoup
                     status = "✓"
+                elif lib_name == 'lxml':
+                    import lxml
+                    status = "✓"
                 elif lib_name == 'PyQt5':
                     from PyQt5.QtCore import Qt
                     status = "✓"
@@ -395,18 +339,27 @@ class ROIAssistant:
         print("\nСтатистика:")
         print("-" * 40)
         
-        queries = [
-            ("Всего инициатив:", "SELECT COUNT(*) FROM initiatives"),
-            ("Новых для голосования:", "SELECT COUNT(*) FROM initiatives WHERE status = 'new'"),
-            ("Уже проголосовано:", "SELECT COUNT(*) FROM initiatives WHERE status = 'voted'"),
-            ("Игнорировано:", "SELECT COUNT(*) FROM initiatives WHERE status = 'ignored'"),
-            ("За последние 7 дней:", "SELECT COUNT(*) FROM initiatives WHERE date(added_date) > date('now', '-7 days')")
+        from stats import get_stats
+        stats = get_stats(self.conn)
+        
+        labels = [
+            ("Всего инициатив:", 'total'),
+            ("Новых для голосования:", 'new'),
+            ("Уже проголосовано:", 'voted'),
+            ("Игнорировано:", 'ignored'),
+            ("За последние 7 дней:", 'week')
         ]
         
-        for label, query in queries:
-            self.cursor.execute(query)
-            count = self.cursor.fetchone()[0]
-            print(f"{label:25} {count}")
+        for label, key in labels:
+            print(f"{label:25} {stats[key]}")
+        
+        # Больше всего голосов за сутки - по истории снимков
+        from snapshots import trending
+        rising = [row for row in trending(self.conn, window_hours=24, limit=5) if row[3] > 0]
+        if rising:
+            print("\nНабирают голоса за сутки:")
+            for initiative_id, title, votes, gain in rising:
+                print(f"  +{gain:<8} ({votes}) {title[:50]}")
     
     def show_recent_initiatives(self):
         """Показать последние инициативы"""
@@ -519,26 +472,20 @@ class ROIAssistant:
     def export_to_csv(self):
         """Экспорт данных в CSV"""
         try:
-            import csv
             from datetime import datetime
+            from exporter import export, print_progress
             
             filename = f"exports/initiatives_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             
-            self.cursor.execute('''
-                SELECT id, title, description, category, status, vote, added_date
-                FROM initiatives
-                ORDER BY added_date DESC
-            ''')
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile, delimiter=';')
-                # Заголовки
-                writer.writerow(['ID', 'Название', 'Описание', 'Категория', 'Статус', 'Голос', 'Дата добавления'])
-                # Данные
-                for row in self.cursor.fetchall():
-                    writer.writerow(row)
+            # Строки читаются и пишутся порциями, вся таблица в память не грузится
+            written = export(
+                self.conn, filename,
+                columns=['id', 'title', 'description', 'category', 'status', 'vote', 'added_date'],
+                headers=['ID', 'Название', 'Описание', 'Категория', 'Статус', 'Голос', 'Дата добавления'],
+                on_progress=print_progress
+            )
             
-            print(f"✓ Данные экспортированы в {filename}")
+            print(f"\n✓ Экспортировано {written} инициатив в {filename}")
             
         except Exception as e:
             print(f"✗ Ошибка экспорта: {e}")
@@ -560,22 +507,27 @@ class ROIAssistant:
         try:
             import sys
             from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout
-            from PyQt5.QtWidgets import QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView
-            from PyQt5.QtWidgets import QComboBox, QLineEdit, QTextEdit, QMessageBox, QStatusBar
+            from PyQt5.QtWidgets import QLabel, QPushButton, QTableView, QHeaderView
+            from PyQt5.QtWidgets import QComboBox, QLineEdit, QTextEdit, QMessageBox, QStatusBar, QSpinBox
             from PyQt5.QtCore import Qt, QTimer
-            from PyQt5.QtGui import QFont, QColor
+            from PyQt5.QtGui import QFont
+            from initiative_table_model import InitiativeTableModel
             
             class ROI_GUI(QMainWindow):
+                # Как часто проверять, не записал ли кто-то в базу (PRAGMA data_version)
+                POLL_INTERVAL_MS = 5000
+                
                 def __init__(self, db_conn):
                     super().__init__()
                     self.db_conn = db_conn
+                    self.model = InitiativeTableModel(db_conn, self)
                     self.initUI()
                     self.load_data()
                     
-                    # Автообновление каждые 30 секунд
+                    # Автообновление: только строки, измененные с прошлой проверки
                     self.timer = QTimer()
-                    self.timer.timeout.connect(self.load_data)
-                    self.timer.start(30000)  # 30 секунд
+                    self.timer.timeout.connect(self.poll_changes)
+                    self.timer.start(self.POLL_INTERVAL_MS)
                 
                 def initUI(self):
                     # Настройка главного окна
@@ -672,10 +624,24 @@ class ROIAssistant:
                     
                     # Поиск
                     self.search_input = QLineEdit()
-                    self.search_input.setPlaceholderText('Поиск по названию...')
+                    self.search_input.setPlaceholderText('Поиск по названию и тексту...')
                     self.search_input.textChanged.connect(self.apply_filters)
                     filter_layout.addWidget(self.search_input)
                     
+                    # Порог голосов и сортировка считаются в SQL (индекс по votes)
+                    self.min_votes = QSpinBox()
+                    self.min_votes.setRange(0, 100000000)
+                    self.min_votes.setSingleStep(1000)
+                    self.min_votes.setPrefix('Голосов от: ')
+                    self.min_votes.valueChanged.connect(self.apply_filters)
+                    filter_layout.addWidget(self.min_votes)
+                    
+                    self.sort_order = QComboBox()
+                    self.sort_order.addItems(['Сначала новые', 'Больше голосов', 'Топ-100 по голосам',
+                                              'По релевантности'])
+                    self.sort_order.currentTextChanged.connect(self.apply_filters)
+                    filter_layout.addWidget(self.sort_order)
+                    
                     filter_layout.addStretch()
                     
                     # Показано/всего
@@ -685,29 +651,33 @@ class ROIAssistant:
                     filter_panel.setLayout(filter_layout)
                     main_layout.addWidget(filter_panel)
                     
-                    # 3. Таблица с данными
-                    self.table = QTableWidget()
-                    self.table.setColumnCount(10)  # Увеличим количество колонок
-                    self.table.setHorizontalHeaderLabels([
-                        'ID', 'Название', 'Категория', 'Уровень', 'Голоса',
-                        'Статус', 'Голос', 'Дата создания', 'Дата добавления', 'URL'
-                    ])
+                    # 3. Таблица с данными: строки держит модель, изменения базы
+                    # она применяет построчно (выделение и прокрутка сохраняются)
+                    self.table = QTableView()
+                    self.table.setModel(self.model)
+                    self.table.setSelectionBehavior(QTableView.SelectRows)
+                    self.table.setSelectionMode(QTableView.SingleSelection)
+                    self.table.verticalHeader().setDefaultSectionSize(28)
+                    self.table.verticalHeader().hide()
                     
                     # Настройка таблицы
-                    self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)  # Название растягивается
-                    self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)  # ID по содержимому
+                    header = self.table.horizontalHeader()
+                    header.setSectionResizeMode(QHeaderView.Interactive)
+                    header.setResizeContentsPrecision(200)  # ширина колонок по первым строкам
+                    header.setSectionResizeMode(self.model.columns.index('title'), QHeaderView.Stretch)  # Название растягивается
+                    header.setSectionResizeMode(self.model.id_column, QHeaderView.ResizeToContents)  # ID по содержимому
                     self.table.setAlternatingRowColors(True)
                     self.table.setStyleSheet("""
-                        QTableWidget {
+                        QTableView {
                             alternate-background-color: #f8f9fa;
                         }
-                        QTableWidget::item {
+                        QTableView::item {
                             padding: 5px;
                         }
                     """)
                     
                     # Двойной клик по строке
-                    self.table.cellDoubleClicked.connect(self.show_details)
+                    self.table.doubleClicked.connect(lambda index: self.show_details(index.row(), index.column()))
                     
                     main_layout.addWidget(self.table, 1)  # 1 = растягиваемое
                     
@@ -788,106 +758,66 @@ class ROIAssistant:
                 def load_data(self):
                     """Загрузка данных из базы"""
                     try:
-                        cursor = self.db_conn.cursor()
-                        
-                        # Получаем все колонки таблицы
-                        cursor.execute("PRAGMA table_info(initiatives)")
-                        columns_info = cursor.fetchall()
-                        columns = [col[1] for col in columns_info]
-                        
-                        # Формируем SQL запрос с ВСЕМИ полями
-                        columns_str = ', '.join(columns)
-                        sql = f'''
-                            SELECT {columns_str}
-                            FROM initiatives 
-                            ORDER BY added_date DESC
-                        '''
-                        
-                        cursor.execute(sql)
-                        data = cursor.fetchall()
-                        
-                        # Настраиваем таблицу
-                        self.table.setColumnCount(len(columns))
-                        self.table.setHorizontalHeaderLabels(columns)
-                        
-                        # Заполняем данные
-                        self.table.setRowCount(len(data))
-                        
-                        for row_idx, row_data in enumerate(data):
-                            for col_idx, cell_data in enumerate(row_data):
-                                item = QTableWidgetItem(str(cell_data) if cell_data is not None else '')
-                                
-                                # Цветовые маркеры для статусов
-                                if columns[col_idx] == 'status':
-                                    if cell_data == 'new':
-                                        item.setBackground(QColor(173, 216, 230))  # голубой
-                                    elif cell_data == 'voted':
-                                        item.setBackground(QColor(144, 238, 144))  # зеленый
-                                    elif cell_data == 'ignored':
-                                        item.setBackground(QColor(255, 182, 193))  # розовый
-                                
-                                # Для голосов - выделяем жирным если много
-                                if columns[col_idx] == 'votes' and cell_data:
-                                    try:
-                                        if int(cell_data) > 1000:
-                                            font = item.font()
-                                            font.setBold(True)
-                                            item.setFont(font)
-                                            item.setForeground(QColor(0, 100, 0))  # темно-зеленый
-                                    except:
-                                        pass
-                                
-                                self.table.setItem(row_idx, col_idx, item)
-                        
-                        # Автоматически подгоняем ширину колонок
+                        self.model.reload()
                         self.table.resizeColumnsToContents()
                         
                         # Обновляем счетчик
-                        self.count_label.setText(f"Показано: {len(data)} записей")
-                        self.statusBar().showMessage(f'Загружено записей: {len(data)}')
+                        self.count_label.setText(f"Показано: {self.model.rowCount()} записей")
+                        self.statusBar().showMessage(f'Загружено записей: {self.model.rowCount()}')
                         
                     except Exception as e:
                         QMessageBox.critical(self, 'Ошибка', f'Не удалось загрузить данные: {e}')
                 
+                def poll_changes(self):
+                    """Применить изменения, записанные в базу другими программами (по таймеру)"""
+                    try:
+                        changed = self.model.poll()
+                        if changed:
+                            self.count_label.setText(f"Показано: {self.model.rowCount()} записей")
+                            self.statusBar().showMessage(f'Обновлено записей: {changed}', 3000)
+                    except Exception as e:
+                        print(f"Ошибка обновления: {e}")
+                
                 def apply_filters(self):
                     """Применение фильтров"""
                     try:
-                        status_filter = self.status_filter.currentText()
-                        search_text = self.search_input.text().lower()
+                        from search import build_match
                         
-                        cursor = self.db_conn.cursor()
+                        status_filter = self.status_filter.currentText()
                         
-                        # Базовый запрос
-                        sql = "SELECT * FROM initiatives WHERE 1=1"
+                        conditions = []
                         params = []
                         
                         # Фильтр по статусу
                         if status_filter == 'Новые':
-                            sql += " AND status = 'new'"
+                            conditions.append("status = 'new'")
                         elif status_filter == 'Голосованные':
-                            sql += " AND status = 'voted'"
+                            conditions.append("status = 'voted'")
                         elif status_filter == 'Игнорированные':
-                            sql += " AND status = 'ignored'"
-                        
-                        # Поиск по тексту
-                        if search_text:
-                            sql += " AND LOWER(title) LIKE ?"
-                            params.append(f'%{search_text}%')
-                        
-                        sql += " ORDER BY added_date DESC"
-                        
-                        cursor.execute(sql, params)
-                        data = cursor.fetchall()
-                        
-                        # Обновляем таблицу
-                        self.table.setRowCount(len(data))
-                        
-                        for row_idx, row_data in enumerate(data):
-                            for col_idx, cell_data in enumerate(row_data):
-                                self.table.setItem(row_idx, col_idx, 
-                                                 QTableWidgetItem(str(cell_data) if cell_data is not None else ''))
-                        
-                        self.count_label.setText(f"Показано: {len(data)} записей (фильтровано)")
+                            conditions.append("status = 'ignored'")
+                        
+                        # Порог голосов
+                        if self.min_votes.value() > 0:
+                            conditions.append("votes >= ?")
+                            params.append(self.min_votes.value())
+                        
+                        # Сортировка
+                        sort_order = self.sort_order.currentText()
+                        if sort_order == 'Больше голосов':
+                            order, limit = 'votes', None
+                        elif sort_order == 'Топ-100 по голосам':
+                            order, limit = 'votes', 100
+                        elif sort_order == 'По релевантности':
+                            order, limit = 'rank', None
+                        else:
+                            order, limit = 'added_date', None
+                        
+                        # Поиск по тексту - через полнотекстовый индекс; найденный
+                        # фрагмент модель показывает подсказкой к строке
+                        self.model.set_query(' AND '.join(conditions) or '1=1', params, order, limit,
+                                             match=build_match(self.search_input.text()))
+                        
+                        self.count_label.setText(f"Показано: {self.model.rowCount()} записей (фильтровано)")
                         
                     except Exception as e:
                         print(f"Ошибка фильтрации: {e}")
@@ -897,8 +827,7 @@ class ROIAssistant:
                     try:
                         cursor = self.db_conn.cursor()
                         
-                        # Получаем ID из первого столбца
-                        item_id = self.table.item(row, 0).text()
+                        item_id = self.model.id_at(row)
                         
                         cursor.execute("SELECT * FROM initiatives WHERE id = ?", (item_id,))
                         record = cursor.fetchone()
@@ -927,12 +856,12 @@ class ROIAssistant:
                 def vote_selected(self, vote_type):
                     """Голосование за выбранную инициативу"""
                     try:
-                        current_row = self.table.currentRow()
+                        current_row = self.table.currentIndex().row()
                         if current_row < 0:
                             QMessageBox.warning(self, 'Предупреждение', 'Выберите инициативу из таблицы')
                             return
                         
-                        item_id = self.table.item(current_row, 0).text()
+                        item_id = self.model.id_at(current_row)
                         
                         # Обновляем в базе
                         cursor = self.db_conn.cursor()
@@ -943,18 +872,10 @@ class ROIAssistant:
                         ''', (vote_type, item_id))
                         self.db_conn.commit()
                         
-                        # Обновляем отображение
-                        status_item = self.table.item(current_row, 5)  # статус
-                        vote_item = self.table.item(current_row, 6)   # голос
-                        
-                        if status_item:
-                            status_item.setText('voted')
-                            status_item.setBackground(QColor(144, 238, 144))
-                        
-                        if vote_item:
-                            vote_text = {'for': 'За', 'against': 'Против', 'ignore': 'Игнорировать'}.get(vote_type, '')
-                            vote_item.setText(vote_text)
+                        # Обновляем отображение: модель перечитывает только измененную строку
+                        self.model.sync()
                         
+                        vote_text = {'for': 'За', 'against': 'Против', 'ignore': 'Игнорировать'}.get(vote_type, '')
                         self.statusBar().showMessage(f'Голос сохранен: {vote_text} для инициативы #{item_id}', 3000)
                         
                     except Exception as e:
@@ -964,26 +885,17 @@ class ROIAssistant:
                     """Экспорт в CSV"""
                     try:
                         from datetime import datetime
-                        import csv
+                        from exporter import export
                         
                         filename = f"exports/gui_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
                         
-                        cursor = self.db_conn.cursor()
-                        cursor.execute("SELECT * FROM initiatives ORDER BY added_date DESC")
+                        def on_progress(written, total):
+                            self.statusBar().showMessage(f'Экспорт: {written} из {total}')
+                            QApplication.processEvents()
                         
-                        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                            writer = csv.writer(csvfile, delimiter=';')
-                            
-                            # Заголовки
-                            cursor.execute("PRAGMA table_info(initiatives)")
-                            headers = [col[1] for col in cursor.fetchall()]
-                            writer.writerow(headers)
-                            
-                            # Данные
-                            for row in cursor.fetchall():
-                                writer.writerow(row)
+                        written = export(self.db_conn, filename, on_progress=on_progress)
                         
-                        QMessageBox.information(self, 'Экспорт', f'Данные экспортированы в:\n{filename}')
+                        QMessageBox.information(self, 'Экспорт', f'Экспортировано {written} инициатив в:\n{filename}')
                         self.statusBar().showMessage(f'Экспорт завершен: {filename}', 3000)
                         
                     except Exception as e:
@@ -992,22 +904,21 @@ class ROIAssistant:
                 def show_stats(self):
                     """Показать статистику"""
                     try:
-                        cursor = self.db_conn.cursor()
-                        
-                        queries = [
-                            ("Всего инициатив:", "SELECT COUNT(*) FROM initiatives"),
-                            ("Новых:", "SELECT COUNT(*) FROM initiatives WHERE status = 'new'"),
-                            ("Голосованных:", "SELECT COUNT(*) FROM initiatives WHERE status = 'voted'"),
-                            ("Игнорированных:", "SELECT COUNT(*) FROM initiatives WHERE status = 'ignored'"),
-                            ("Федеральных:", "SELECT COUNT(*) FROM initiatives WHERE level = 'Федеральный'"),
-                            ("За сегодня:", "SELECT COUNT(*) FROM initiatives WHERE date(added_date) = date('now')")
+                        from stats import get_stats
+                        stats = get_stats(self.db_conn)
+                        
+                        labels = [
+                            ("Всего инициатив:", 'total'),
+                            ("Новых:", 'new'),
+                            ("Голосованных:", 'voted'),
+                            ("Игнорированных:", 'ignored'),
+                            ("Федеральных:", 'federal'),
+                            ("За сегодня:", 'today')
                         ]
                         
                         stats_text = "<b>Статистика:</b><br><br>"
-                        for label, query in queries:
-                            cursor.execute(query)
-                            count = cursor.fetchone()[0]
-                            stats_text += f"{label} <b>{count}</b><br>"
+                        for label, key in labels:
+                            stats_text += f"{label} <b>{stats[key]}</b><br>"
                         
                         msg = QMessageBox()
                         msg.setWindowTitle('Статистика')
@@ -5,9 +5,7 @@
 """
 
 import sys
-import sqlite3
 import logging
-import time
 from datetime import datetime
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
@@ -16,6 +14,15 @@ from PyQt5.QtCore import QSettings
 
 import traceback
 
+from initiative_model import InitiativeListModel, InitiativeDelegate, IdRole
+from refresh_worker import RefreshWorker
+from database import get_database
+from stats import get_stats
+from filters import InitiativeFilter, levels
+from detail_cache import DetailCache, DetailPrefetcher, load_detail
+from refresh_daemon import (CHECK_INTERVALS, format_run, last_runs, lock_holder, read_settings,
+                            request_refresh, save_settings as save_refresh_settings)
+
 def exception_hook(exctype, value, traceback_obj):
     """Функция для перехвата необработанных исключений"""
     print("\n" + "="*60)
@@ -27,287 +34,18 @@ def exception_hook(exctype, value, traceback_obj):
 
 sys.excepthook = exception_hook
 
-class InitiativeListItem(QWidget):
-    """Виджет элемента списка инициатив"""
-    clicked = pyqtSignal(int)  # id инициативы
-    voted = pyqtSignal(int, str)  # id, vote_type
-    
-    def __init__(self, initiative_data):
-        super().__init__()
-        self.initiative = initiative_data
-        self.initiative_id = initiative_data[0]
-        self.user_vote = initiative_data[8]  # Сохраняем текущий выбор пользователя
-        self.initUI()
-        
-    def initUI(self):
-        layout = QVBoxLayout()
-        layout.setSpacing(5)
-        
-        # Заголовок (кликабельный)
-        title = QLabel(f"<b>{self.initiative[2]}</b>")
-        title.setWordWrap(True)
-        title.setStyleSheet("font-size: 12pt; padding: 5px; color: #2196F3;")
-        title.setCursor(Qt.PointingHandCursor)
-        title.mousePressEvent = lambda e: self.clicked.emit(self.initiative_id)
-        layout.addWidget(title)
-        
-        # Инфо строка с голосами
-        info_layout = QHBoxLayout()
-        
-        # Голоса ЗА
-        votes_for = self.initiative[6] if len(self.initiative) > 6 else '0'
-        anti_votes = self.initiative[7] if len(self.initiative) > 7 else '0'  # Новое поле anti_votes
-        
-        votes_label = QLabel(f"👍 {votes_for} | 👎 {anti_votes}")
-        votes_label.setStyleSheet("color: #666; font-size: 10pt; font-weight: bold;")
-        info_layout.addWidget(votes_label)
-        
-        info_layout.addStretch()
-        
-        # ID
-        id_label = QLabel(f"#{self.initiative[0]}")
-        id_label.setStyleSheet("color: #999; font-size: 9pt;")
-        info_layout.addWidget(id_label)
-        
-        layout.addLayout(info_layout)
-        
-        # Кнопки голосования (компактные)
-        btn_layout = QHBoxLayout()
-        btn_layout.setSpacing(2)
-        
-        # Кнопка "За"
-        self.btn_for = QPushButton(" 👍 ")  # 👍   btn_for = QPushButton("👍")
-        self.btn_for.setToolTip("Проголосовать ЗА")
-        self.btn_for.setFixedSize(60, 44)
-        self.btn_for.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                border-radius: 6px;
-                font-size: 11pt;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        self.btn_for.clicked.connect(lambda: self.vote('for'))
-        self.btn_for.setCursor(Qt.PointingHandCursor)
-        btn_layout.addWidget(self.btn_for)
-        
-        # Кнопка "Против"
-        self.btn_against = QPushButton("👎")
-        self.btn_against.setToolTip("Проголосовать ПРОТИВ")
-        self.btn_against.setFixedSize(60, 44)
-        self.btn_against.setStyleSheet("""
-            QPushButton {
-                background-color: #f44336;
-                border-radius: 6px;
-                font-size: 11pt;
-            }
-            QPushButton:hover {
-                background-color: #da190b;
-            }
-        """)
-        self.btn_against.clicked.connect(lambda: self.vote('against'))
-        self.btn_against.setCursor(Qt.PointingHandCursor)
-        btn_layout.addWidget(self.btn_against)
-        
-        # Кнопка "Игнорировать"
-        self.btn_ignore = QPushButton("в игнор")
-        self.btn_ignore.setToolTip("Игнорировать")
-        self.btn_ignore.setFixedSize(120, 44)
-        self.btn_ignore.setStyleSheet("""
-            QPushButton {
-                background-color: #9E9E9E;
-                border-radius: 6px;
-                font-size: 11pt;
-            }
-            QPushButton:hover {
-                background-color: #757575;
-            }
-        """)
-        self.btn_ignore.clicked.connect(lambda: self.vote('ignore'))
-        self.btn_ignore.setCursor(Qt.PointingHandCursor)
-        btn_layout.addWidget(self.btn_ignore)
-        
-        layout.addLayout(btn_layout)
-        
-        # Статус голосования
-        if self.initiative[8]:  # Если есть статус голосования
-            status_text = {
-                'for': '✅ Ваш голос: ЗА',
-                'against': '❌ Ваш голос: ПРОТИВ',
-                'ignore': '➖ Игнорировано'
-            }.get(self.initiative[8], '')
-            
-            if status_text:
-                status_label = QLabel(status_text)
-                status_label.setStyleSheet("color: #2196F3; font-size: 9pt; padding: 2px;")
-                layout.addWidget(status_label)
-                
-                # Обновляем внешний вид кнопок в соответствии с выбором
-                self.update_buttons_appearance(self.initiative[8])
-        
-        # Разделитель
-        line = QFrame()
-        line.setFrameShape(QFrame.HLine)
-        line.setFrameShadow(QFrame.Sunken)
-        line.setStyleSheet("color: #eee;")
-        layout.addWidget(line)
-        
-        self.setLayout(layout)
-        self.setStyleSheet("""
-            QWidget {
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 5px;
-                padding: 8px;
-                margin: 3px;
-            }
-            QWidget:hover {
-                background: #f5f5f5;
-                border-color: #2196F3;
-            }
-        """)
-    
-    def update_buttons_appearance(self, vote_type):
-        """Обновление внешнего вида кнопок в зависимости от типа голоса"""
-        if vote_type == 'for':
-            # Выделить кнопку "За", остальные сделать неактивными
-            self.btn_for.setStyleSheet("""
-                QPushButton {
-                    background-color: #2E7D32;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.8;
-                }
-            """)
-            self.btn_against.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-            self.btn_ignore.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-        elif vote_type == 'against':
-            # Выделить кнопку "Против", остальные сделать неактивными
-            self.btn_for.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-            self.btn_against.setStyleSheet("""
-                QPushButton {
-                    background-color: #C62828;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.8;
-                }
-            """)
-            self.btn_ignore.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-        elif vote_type == 'ignore':
-            # Выделить кнопку "Игнорировать", остальные сделать неактивными
-            self.btn_for.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-            self.btn_against.setStyleSheet("""
-                QPushButton {
-                    background-color: #bdbdbd;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.5;
-                }
-            """)
-            self.btn_ignore.setStyleSheet("""
-                QPushButton {
-                    background-color: #616161;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                    opacity: 0.8;
-                }
-            """)
-    
-    def vote(self, vote_type):
-        """Обработка голосования"""
-        # Если пользователь нажимает ту же кнопку дважды, это отменяет выбор
-        if self.user_vote == vote_type:
-            # Отменить выбор
-            self.user_vote = None
-            # Сбросить стиль кнопок к нормальному состоянию
-            self.btn_for.setStyleSheet("""
-                QPushButton {
-                    background-color: #4CAF50;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """)
-            self.btn_against.setStyleSheet("""
-                QPushButton {
-                    background-color: #f44336;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                }
-                QPushButton:hover {
-                    background-color: #da190b;
-                }
-            """)
-            self.btn_ignore.setStyleSheet("""
-                QPushButton {
-                    background-color: #9E9E9E;
-                    border-radius: 6px;
-                    font-size: 11pt;
-                }
-                QPushButton:hover {
-                    background-color: #757575;
-                }
-            """)
-            # Отправить сигнал об отмене голоса
-            self.voted.emit(self.initiative_id, None)
-        else:
-            # Обновить текущий выбор
-            self.user_vote = vote_type
-            # Обновляем внешний вид кнопок
-            self.update_buttons_appearance(vote_type)
-            # Отправить сигнал о новом голосе
-            self.voted.emit(self.initiative_id, vote_type)
-    
-    def mousePressEvent(self, event):
-        """Обработка клика по виджету"""
-        self.clicked.emit(self.initiative_id)
-        super().mousePressEvent(event)
-
 class MainWindow(QMainWindow):
+    # Пауза после последнего нажатия клавиши перед запросом к БД
+    FILTER_DELAY_MS = 250
+    # Как часто проверять, не записала ли служба refresh_daemon.py новый запуск
+    RUNS_POLL_MS = 30000
+    
     def __init__(self, db_path='data/roi.db'):
         super().__init__()
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self.current_initiative_id = None  # ID текущей выбранной инициативы
+        self.refresh_worker = None  # фоновое обновление с roi.ru
         
         # начальный URL для парсинга
         self.start_url = "https://www.roi.ru/poll/last/?level=1"
@@ -316,8 +54,34 @@ class MainWindow(QMainWindow):
         settings = QSettings('ROI_Assistant', 'Settings')
         self.start_url = settings.value('start_url', "https://www.roi.ru/poll/last/?level=1")
         self.max_pages = int(settings.value('max_pages', 1))
+        self.crawl_all = settings.value('crawl_all', False, type=bool)
+        
+        # Одно долгоживущее соединение на поток вместо connect на каждый клик
+        self.db = get_database(self.db_path)
+        
+        # Базы, созданные старыми версиями, обновляем до текущей схемы
+        from migrations import migrate
+        migrate(self.db.connection())
+        
+        # Готовые карточки инициатив; соседние строки готовятся в фоне
+        self.detail_cache = DetailCache()
+        self.detail_prefetcher = DetailPrefetcher(self.db_path, self.detail_cache, self)
+        
         self.initUI()
         self.load_initiatives()
+        self.update_stats()
+        
+        # Обновляет базу служба refresh_daemon.py - окно только читает ее итоги
+        self.last_run_id = 0
+        self.last_run_label = QLabel('Обновлений еще не было')
+        self.statusBar().addPermanentWidget(self.last_run_label)
+        runs = last_runs(self.db.connection(), limit=1, finished=True)
+        if runs:
+            self.show_last_run(runs[0])
+        self.runs_timer = QTimer(self)
+        self.runs_timer.setInterval(self.RUNS_POLL_MS)
+        self.runs_timer.timeout.connect(self.check_refresh_runs)
+        self.runs_timer.start()
     
     def initUI(self):
         self.setWindowTitle('ROI Assistant - Голосование за инициативы')
@@ -428,26 +192,62 @@ class MainWindow(QMainWindow):
         search_layout.addWidget(search_label)
         
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Введите текст для поиска...")
+        self.search_input.setPlaceholderText("Поиск по названию и тексту инициативы...")
         self.search_input.setStyleSheet("padding: 5px; border: 1px solid #ddd; border-radius: 3px;")
         self.search_input.textChanged.connect(self.filter_initiatives)
+        self.search_input.returnPressed.connect(self.load_initiatives)
         search_layout.addWidget(self.search_input, 1)  # 1 = растягиваем
         
-        list_layout.addLayout(search_layout)
-        
-        # Список инициатив с прокруткой
-        self.initiatives_scroll = QScrollArea()
-        self.initiatives_scroll.setWidgetResizable(True)
-        self.initiatives_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        # Ввод в поле поиска и счетчик голосов применяются не на каждое
+        # нажатие, а после паузы - один запрос вместо десятка
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(self.FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.load_initiatives)
         
-        self.initiatives_container = QWidget()
-        self.initiatives_layout = QVBoxLayout()
-        self.initiatives_layout.setAlignment(Qt.AlignTop)
-        self.initiatives_layout.setSpacing(2)
-        self.initiatives_container.setLayout(self.initiatives_layout)
+        list_layout.addLayout(search_layout)
         
-        self.initiatives_scroll.setWidget(self.initiatives_container)
-        list_layout.addWidget(self.initiatives_scroll, 1)  # 1 = растягиваем
+        # Порог голосов и сортировка - выполняются в SQL по индексу votes
+        order_layout = QHBoxLayout()
+        
+        self.min_votes_spinbox = QSpinBox()
+        self.min_votes_spinbox.setRange(0, 100000000)
+        self.min_votes_spinbox.setSingleStep(1000)
+        self.min_votes_spinbox.setPrefix("Голосов от: ")
+        # Значение спинбокса не передаем в QTimer.start(int) - иначе оно станет интервалом
+        self.min_votes_spinbox.valueChanged.connect(lambda _: self.filter_timer.start())
+        order_layout.addWidget(self.min_votes_spinbox)
+        
+        self.level_combo = QComboBox()
+        self.update_level_combo()
+        self.level_combo.currentIndexChanged.connect(self.load_initiatives)
+        order_layout.addWidget(self.level_combo)
+        
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(["Сначала новые", "Больше голосов", "Топ-100 по голосам", "По релевантности"])
+        self.sort_combo.currentTextChanged.connect(self.load_initiatives)
+        order_layout.addWidget(self.sort_combo, 1)
+        
+        list_layout.addLayout(order_layout)
+        
+        # Список инициатив: модель подгружает строки порциями,
+        # делегат рисует только видимые
+        self.initiatives_model = InitiativeListModel(self.db_path)
+        self.initiatives_delegate = InitiativeDelegate(self)
+        self.initiatives_delegate.voted.connect(self.on_vote)
+        
+        self.initiatives_view = QListView()
+        self.initiatives_view.setModel(self.initiatives_model)
+        self.initiatives_view.setItemDelegate(self.initiatives_delegate)
+        self.initiatives_view.setUniformItemSizes(True)
+        self.initiatives_view.setMouseTracking(True)
+        self.initiatives_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.initiatives_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.initiatives_view.setStyleSheet("QListView { border: none; background: #fafafa; }")
+        self.initiatives_view.selectionModel().currentChanged.connect(
+            lambda current, previous: self.on_initiative_selected(current.data(IdRole))
+            if current.isValid() else None)
+        list_layout.addWidget(self.initiatives_view, 1)  # 1 = растягиваем
         
         # Информация о количестве
         self.count_label = QLabel("Инициатив: 0")
@@ -470,95 +270,76 @@ class MainWindow(QMainWindow):
         # Статус бар
         self.statusBar().showMessage('Готово')
     
+    def current_filter(self):
+        """Фильтр списка по состоянию панелей"""
+        return InitiativeFilter(
+            status=self.status_filter_combo.currentData(),
+            level=self.level_combo.currentData(),
+            min_votes=self.min_votes_spinbox.value(),
+            text=self.search_input.text()
+        )
+    
+    def update_level_combo(self):
+        """Список уровней для фильтра (после обновления могли появиться новые)"""
+        current = self.level_combo.currentData()
+        self.level_combo.blockSignals(True)
+        self.level_combo.clear()
+        self.level_combo.addItem("Все уровни", None)
+        for level in levels(self.db.connection()):
+            self.level_combo.addItem(level, level)
+        index = self.level_combo.findData(current)
+        self.level_combo.setCurrentIndex(max(index, 0))
+        self.level_combo.blockSignals(False)
+    
     def load_initiatives(self):
         """Загрузка инициатив из базы данных"""
-        # Очищаем текущий список
-        for i in reversed(range(self.initiatives_layout.count())): 
-            widget = self.initiatives_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-        
-        # Загружаем из БД ВСЕ поля
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Запрашиваем все поля, включая новые
-        cursor.execute('''
-            SELECT id, external_id, title, description, url, category, 
-                   votes, anti_votes, status, vote, vote_date, added_date,
-                   full_text, proposal_text, result_text, end_date, combined_text,
-                   author, initiative_status, level, created_date, source
-            FROM initiatives 
-            ORDER BY added_date DESC
-        ''')
-        
-        initiatives = cursor.fetchall()
-        conn.close()
-        
-        # Добавляем в интерфейс
-        for initiative in initiatives:
-            item = InitiativeListItem(initiative)
-            item.clicked.connect(self.on_initiative_selected)
-            item.voted.connect(self.on_vote)
-            self.initiatives_layout.addWidget(item)
-        
-        # Обновляем статистику
-        self.update_stats()
+        # Все условия фильтра - один параметризованный запрос модели
+        # (поиск по тексту - через полнотекстовый индекс); строки
+        # подгружаются порциями по мере прокрутки
+        self.filter_timer.stop()
+        initiative_filter = self.current_filter()
+        where_sql, params = initiative_filter.where()
+        
+        sort_order = self.sort_combo.currentText()
+        if sort_order == "Больше голосов":
+            sort_key, limit = 'votes', None
+        elif sort_order == "Топ-100 по голосам":
+            sort_key, limit = 'votes', 100
+        elif sort_order == "По релевантности":
+            sort_key, limit = 'rank', None
+        else:
+            sort_key, limit = 'added_date', None
         
-        # Обновляем счетчик
-        self.count_label.setText(f"Инициатив: {len(initiatives)}")
+        self.initiatives_model.set_query(where_sql, params, sort_key, limit, match=initiative_filter.match())
+        self.initiatives_model.fetchMore()
+        total = self.update_count_label()
         
         # Обновляем статус
-        self.statusBar().showMessage(f'Загружено инициатив: {len(initiatives)}')
+        self.statusBar().showMessage(f'Загружено инициатив: {total}')
         
         # Если есть инициативы, выбираем первую
-        if initiatives:
-            self.on_initiative_selected(initiatives[0][0])
+        if self.initiatives_model.rowCount():
+            self.initiatives_view.setCurrentIndex(self.initiatives_model.index(0))
     
     def on_initiative_selected(self, initiative_id):
         """Обработка выбора инициативы из списка"""
         self.current_initiative_id = initiative_id
         
-        # Загружаем детальную информацию из БД
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT title, votes, anti_votes, full_text, proposal_text, result_text, 
-                   combined_text, end_date, author, initiative_status, url
-            FROM initiatives WHERE id = ?
-        ''', (initiative_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            title, votes, anti_votes, full_text, proposal_text, result_text, \
-            combined_text, end_date, author, status, url = result
-            
-            # Формируем полный текст для отображения
-            display_text = ""
-            
-            if full_text:
-                display_text += f"<h3>{title}</h3>"
-                display_text += f"<div style='margin-bottom: 20px;'>{full_text}</div>"
-            
-            if result_text:
-                display_text += f"<h4>Практический результат:</h4>"
-                display_text += f"<div style='margin-bottom: 20px; padding: 10px; background: #f0f7ff; border-radius: 5px;'>{result_text}</div>"
-            
-            if proposal_text:
-                display_text += f"<h4>Решение:</h4>"
-                display_text += f"<div style='margin-bottom: 20px; padding: 10px; background: #f0fff0; border-radius: 5px;'>{proposal_text}</div>"
-            
-            if not display_text and combined_text:
-                display_text = f"<h3>{title}</h3><div>{combined_text}</div>"
-            
-            if not display_text:
-                display_text = f"<h3>{title}</h3><p>Полный текст инициативы отсутствует в базе данных.</p>"
+        # Карточка из кэша, если строка не менялась (проверка без чтения текстов),
+        # иначе читаем тексты и строим HTML
+        version = self.row_version(initiative_id)
+        detail = self.detail_cache.get(initiative_id, version) if version is not None else None
+        if detail is None and version is not None:
+            loaded = load_detail(self.db.connection(), initiative_id)
+            if loaded:
+                self.detail_cache.put(initiative_id, *loaded)
+                detail = loaded[1]
+        
+        if detail:
+            title, votes, anti_votes, end_date = detail.title, detail.votes, detail.anti_votes, detail.end_date
             
             # Устанавливаем текст
-            self.initiative_text_display.setHtml(display_text)
+            self.initiative_text_display.setHtml(detail.html)
             
             # Обновляем панель информации
             self.detail_votes_label.setText(f"Голосов: 👍 {votes} | 👎 {anti_votes}")
@@ -577,30 +358,26 @@ class MainWindow(QMainWindow):
             
             # Обновляем статус
             self.statusBar().showMessage(f'Выбрана инициатива: {title[:50]}...', 3000)
+            
+            # Соседние строки - следующие при листании стрелками
+            row = self.initiatives_model.row_of(initiative_id)
+            if row is not None:
+                self.detail_prefetcher.prefetch(
+                    [self.initiatives_model.id_at(row + offset) for offset in (1, -1, 2, 3, -2)])
+    
+    def update_count_label(self):
+        """Число инициатив под текущим фильтром"""
+        total = self.initiatives_model.total_count()
+        if self.current_filter().is_active():
+            self.count_label.setText(f"Инициатив: {total} (отфильтровано)")
+        else:
+            self.count_label.setText(f"Инициатив: {total}")
+        return total
     
     def filter_initiatives(self, search_text):
         """Фильтрация инициатив по поисковому запросу"""
-        search_text = search_text.strip().lower()
-        
-        # Получаем все виджеты инициатив
-        for i in range(self.initiatives_layout.count()):
-            widget = self.initiatives_layout.itemAt(i).widget()
-            if widget:
-                # Ищем текст в заголовке
-                title = widget.initiative[2].lower()
-                if search_text == '' or search_text in title:
-                    widget.show()
-                else:
-                    widget.hide()
-        
-        # Подсчитываем видимые
-        visible_count = 0
-        for i in range(self.initiatives_layout.count()):
-            widget = self.initiatives_layout.itemAt(i).widget()
-            if widget and widget.isVisible():
-                visible_count += 1
-        
-        self.count_label.setText(f"Инициатив: {visible_count} (отфильтровано)")
+        # Запрос выполнится после паузы в наборе (filter_timer)
+        self.filter_timer.start()
     
     def create_top_panel(self):
         """Создание верхней панели"""
@@ -626,8 +403,8 @@ class MainWindow(QMainWindow):
         layout.addStretch()
         
         # Кнопки
-        btn_update = QPushButton('🔄 Обновить список')
-        btn_update.setStyleSheet("""
+        self.btn_update = QPushButton('🔄 Обновить список')
+        self.btn_update.setStyleSheet("""
             QPushButton {
                 background: white;
                 color: #2196F3;
@@ -641,8 +418,8 @@ class MainWindow(QMainWindow):
                 background: #E3F2FD;
             }
         """)
-        btn_update.clicked.connect(self.update_initiatives)
-        btn_update.setCursor(Qt.PointingHandCursor)
+        self.btn_update.clicked.connect(self.update_initiatives)
+        self.btn_update.setCursor(Qt.PointingHandCursor)
         
         btn_open_web = QPushButton('🌐 Открыть на сайте')
         btn_open_web.setStyleSheet("""
@@ -682,7 +459,7 @@ class MainWindow(QMainWindow):
         btn_settings.clicked.connect(self.show_settings)
         btn_settings.setCursor(Qt.PointingHandCursor)
         
-        layout.addWidget(btn_update)
+        layout.addWidget(self.btn_update)
         layout.addWidget(btn_open_web)
         layout.addWidget(btn_settings)
         
@@ -711,9 +488,11 @@ class MainWindow(QMainWindow):
         
         layout.addStretch()
         
-        # Фильтры
-        filter_combo = QComboBox()
-        filter_combo.addItems(['Все инициативы', 'Только новые', 'Только голосованные', 'Только игнорированные'])
+        # Фильтры: текст пункта и ключ filters.STATUS_FILTERS
+        self.status_filter_combo = filter_combo = QComboBox()
+        for text, status in [('Все инициативы', 'all'), ('Только новые', 'new'),
+                             ('Только голосованные', 'voted'), ('Только игнорированные', 'ignored')]:
+            filter_combo.addItem(text, status)
         filter_combo.setStyleSheet("""
             QComboBox {
                 padding: 5px;
@@ -795,11 +574,9 @@ class MainWindow(QMainWindow):
     def open_current_in_browser(self):
         """Открытие текущей выбранной инициативы в браузере"""
         if self.current_initiative_id:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.db.connection().cursor()
             cursor.execute('SELECT url FROM initiatives WHERE id = ?', (self.current_initiative_id,))
             result = cursor.fetchone()
-            conn.close()
             
             if result and result[0]:
                 import webbrowser
@@ -812,14 +589,15 @@ class MainWindow(QMainWindow):
     
     def filter_by_status(self, filter_text):
         """Фильтрация инициатив по статусу"""
+        self.load_initiatives()
         self.statusBar().showMessage(f'Фильтр: {filter_text}', 2000)
-        # TODO: Реализовать фильтрацию по статусу
     
     def on_vote(self, initiative_id, vote_type):
         """Обработка голосования"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.db.connection()
             cursor = conn.cursor()
+            old_version = self.row_version(initiative_id)
             
             if vote_type is None:
                 # Отмена голоса - сбросить значения в БД
@@ -837,7 +615,11 @@ class MainWindow(QMainWindow):
                 ''', (vote_type, datetime.now().isoformat(), initiative_id))
             
             conn.commit()
-            conn.close()
+            
+            # Перерисовываем только строку этой инициативы; если она больше
+            # не подходит под фильтр (например, «Только новые») - убираем ее
+            if self.initiatives_model.refresh_row(initiative_id) is None:
+                self.update_count_label()
             
             # Обновляем статистику
             self.update_stats()
@@ -848,27 +630,23 @@ class MainWindow(QMainWindow):
             else:
                 self.statusBar().showMessage(f'Голос сохранен: {vote_type}', 3000)
             
-            # Обновляем отображение текущей инициативы
-            if self.current_initiative_id == initiative_id:
-                self.on_initiative_selected(initiative_id)
+            # Голос не меняет карточку инициативы - перерисовывать ее не нужно,
+            # а запись кэша остается действительной для новой версии строки
+            self.detail_cache.revalidate(initiative_id, old_version, self.row_version(initiative_id))
             
         except Exception as e:
             QMessageBox.critical(self, 'Ошибка', f'Не удалось сохранить голос: {e}')
     
+    def row_version(self, initiative_id):
+        """Версия строки инициативы (меняется при любой записи) или None"""
+        row = self.db.connection().execute(
+            'SELECT row_version FROM initiatives WHERE id = ?', (initiative_id,)).fetchone()
+        return row[0] if row else None
+    
     def update_stats(self):
         """Обновление статистики"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        stats = {
-            'new': cursor.execute("SELECT COUNT(*) FROM initiatives WHERE status = 'new'").fetchone()[0],
-            'for': cursor.execute("SELECT COUNT(*) FROM initiatives WHERE vote = 'for'").fetchone()[0],
-            'against': cursor.execute("SELECT COUNT(*) FROM initiatives WHERE vote = 'against'").fetchone()[0],
-            'ignore': cursor.execute("SELECT COUNT(*) FROM initiatives WHERE vote = 'ignore'").fetchone()[0],
-            'total': cursor.execute("SELECT COUNT(*) FROM initiatives").fetchone()[0]
-        }
-        
-        conn.close()
+        # Счетчики ведут триггеры БД - чтение не зависит от размера таблицы
+        stats = get_stats(self.db.connection())
         
         # Обновляем виджеты статистики
         stats_panel = self.findChild(QWidget).findChild(QWidget).findChild(QWidget)
@@ -885,40 +663,152 @@ class MainWindow(QMainWindow):
             progress = int((total_voted / stats['total']) * 100)
             self.progress_bar.setValue(progress)
     
+    def show_last_run(self, run):
+        """Итог последнего обновления в строке состояния"""
+        self.last_run_id = run.id
+        conn = self.db.connection()
+        daemon = 'служба работает' if lock_holder(conn, 'daemon') else 'служба не запущена'
+        self.last_run_label.setText(f'Обновление {format_run(run)} | {daemon}')
+    
+    def check_refresh_runs(self):
+        """Новый завершенный запуск службы - показываем записанные им инициативы"""
+        if self.refresh_worker is not None:
+            return  # свое обновление покажет on_refresh_finished
+        runs = last_runs(self.db.connection(), limit=1, finished=True)
+        if not runs or runs[0].id == self.last_run_id:
+            return
+        run = runs[0]
+        self.show_last_run(run)
+        if not (run.added or run.updated):
+            return
+        
+        if self.initiatives_model.insert_new_rows():
+            self.update_count_label()
+        self.initiatives_model.refresh_loaded()
+        self.update_level_combo()
+        self.update_stats()
+        self.statusBar().showMessage(
+            f'Фоновое обновление: добавлено {run.added} новых, обновлено {run.updated}', 5000)
+    
     def update_initiatives(self):
         """Обновление списка инициатив с сайта ROI.ru"""
+        # Повторное нажатие во время загрузки останавливает обновление
+        if self.refresh_worker is not None and self.refresh_worker.isRunning():
+            self.refresh_worker.cancel()
+            self.btn_update.setEnabled(False)
+            self.statusBar().showMessage('Остановка обновления...')
+            return
+        
+        conn = self.db.connection()
+        if lock_holder(conn, 'daemon'):
+            # Сайт загружает служба: окно только просит ее обновить базу сейчас,
+            # итог и новые инициативы покажет check_refresh_runs
+            request_refresh(conn)
+            self.statusBar().showMessage(
+                'Запрос отправлен службе обновления - новые инициативы появятся, когда она закончит', 10000)
+            return
+        
+        if self.crawl_all:
+            question = ('Обновить все списки инициатив с сайта roi.ru?\n\n'
+                        'Программа обойдет все уровни (федеральный, региональный, муниципальный),\n'
+                        f'активные и завершенные инициативы, до {self.max_pages} стр. в каждом списке.\n')
+        else:
+            question = ('Обновить список федеральных инициатив с сайта roi.ru?\n\n'
+                        'Программа загрузит свежие инициативы с первой страницы.\n')
         reply = QMessageBox.question(
             self, 'Обновление',
-            'Обновить список федеральных инициатив с сайта roi.ru?\n\n'
-            'Программа загрузит свежие инициативы с первой страницы.\n'
-            'Это может занять несколько секунд.',
+            question + 'Новые инициативы появятся в списке по мере загрузки.',
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
+            self.refresh_progress = {'pages': 0, 'details': 0, 'rows': 0}
             self.statusBar().showMessage('Загрузка данных с ROI.ru...')
-            QApplication.processEvents()
             
-            added_count, duplicate_count = self.fetch_federal_initiatives()
+            # Сеть и запись в БД - в фоновом потоке, окно остается отзывчивым
+            self.refresh_worker = RefreshWorker(
+                self.db_path,
+                start_url=self.start_url,  # Передаем сохраненный URL
+                max_pages=self.max_pages if hasattr(self, 'max_pages') else 1,
+                crawl_all=self.crawl_all,
+                parent=self
+            )
+            self.refresh_worker.page_done.connect(self.on_refresh_page)
+            self.refresh_worker.details_done.connect(self.on_refresh_details)
+            self.refresh_worker.rows_inserted.connect(self.on_refresh_rows)
+            self.refresh_worker.failed.connect(
+                lambda message: QMessageBox.critical(self, 'Ошибка', message))
+            self.refresh_worker.busy.connect(
+                lambda: QMessageBox.information(
+                    self, 'Обновление',
+                    'Базу сейчас обновляет фоновая служба.\n'
+                    'Новые инициативы появятся в списке, когда она закончит.'))
+            self.refresh_worker.finished.connect(self.on_refresh_finished)
             
-            if added_count > 0 or duplicate_count > 0:
-                result_msg = f"""
-                Обновление завершено!
-                
-                Загружено инициатив: {added_count + duplicate_count}
-                Добавлено новых: {added_count}
-                Пропущено (уже есть): {duplicate_count}
-                
-                Таблица будет обновлена автоматически.
-                """
-                
-                QMessageBox.information(self, 'Результат', result_msg)
-                
-                self.load_initiatives()
-                
-                self.statusBar().showMessage(f'Добавлено {added_count} новых инициатив', 5000)
-            else:
-                self.statusBar().showMessage('Нет новых инициатив', 3000)
+            self.btn_update.setText('⏹ Остановить')
+            self.refresh_worker.start()
+    
+    def show_refresh_progress(self):
+        progress = self.refresh_progress
+        self.statusBar().showMessage(
+            f"Загрузка с ROI.ru: страниц {progress['pages']}, "
+            f"деталей {progress['details']}, записано {progress['rows']}")
+    
+    def on_refresh_page(self, page, count):
+        self.refresh_progress['pages'] = page
+        self.show_refresh_progress()
+    
+    def on_refresh_details(self, count):
+        self.refresh_progress['details'] = count
+        self.show_refresh_progress()
+    
+    def on_refresh_rows(self, added_count, updated_count, unchanged_count):
+        """Очередная порция записана в базу - показываем новые инициативы сразу"""
+        self.refresh_progress['rows'] = added_count + updated_count + unchanged_count
+        self.show_refresh_progress()
+        if self.initiatives_model.insert_new_rows():
+            self.update_count_label()
+    
+    def on_refresh_finished(self):
+        """Фоновое обновление завершено (или остановлено)"""
+        worker = self.refresh_worker
+        self.refresh_worker = None
+        self.btn_update.setText('🔄 Обновить список')
+        self.btn_update.setEnabled(True)
+        
+        if worker.last_run is None:
+            return  # ошибка или база занята службой - сообщение уже показано
+        self.show_last_run(worker.last_run)
+        
+        added_count, updated_count, unchanged_count = worker.added, worker.updated, worker.unchanged
+        self.logger.info(f"Итог: добавлено {added_count} новых, обновлено {updated_count}, "
+                         f"без изменений {unchanged_count}")
+        
+        # Голоса уже показанных инициатив могли измениться, могли появиться новые уровни
+        self.initiatives_model.refresh_loaded()
+        self.update_level_combo()
+        self.update_stats()
+        
+        if added_count > 0 or updated_count > 0 or unchanged_count > 0:
+            result_msg = f"""
+            Обновление {'остановлено' if worker.cancelled else 'завершено'}!
+            
+            Загружено инициатив: {added_count + updated_count + unchanged_count}
+            Добавлено новых: {added_count}
+            Обновлено: {updated_count}
+            Без изменений: {unchanged_count}
+            """
+            
+            QMessageBox.information(self, 'Результат', result_msg)
+            
+            self.statusBar().showMessage(f'Добавлено {added_count} новых инициатив', 5000)
+        elif worker.cancelled:
+            self.statusBar().showMessage('Обновление остановлено', 3000)
+        else:
+            QMessageBox.warning(self, 'Внимание',
+                              'Не удалось получить инициативы.\n'
+                              'Проверьте интернет-соединение или структуру сайта.')
+            self.statusBar().showMessage('Нет новых инициатив', 3000)
     
     def submit_votes(self):
         """Отправка голосов на сайт"""
@@ -974,6 +864,15 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(pages_layout)
         
+        # Обход всех уровней и разделов вместо одного URL
+        self.crawl_all_checkbox = QCheckBox(
+            'Обходить все списки сайта (федеральные, региональные, муниципальные; '
+            'на голосовании и завершенные)')
+        self.crawl_all_checkbox.setChecked(self.crawl_all)
+        self.crawl_all_checkbox.toggled.connect(lambda checked: self.url_input.setEnabled(not checked))
+        self.url_input.setEnabled(not self.crawl_all)
+        layout.addWidget(self.crawl_all_checkbox)
+        
         # Разделитель
         line = QFrame()
         line.setFrameShape(QFrame.HLine)
@@ -986,9 +885,14 @@ class MainWindow(QMainWindow):
         interval_label.setStyleSheet("font-weight: bold;")
         interval_layout.addWidget(interval_label)
         
-        interval_combo = QComboBox()
-        interval_combo.addItems(['5 минут', '15 минут', '30 минут', '1 час', '3 часа', '12 часов', '1 день'])
-        interval_layout.addWidget(interval_combo)
+        # Интервал хранится в таблице settings - по нему работает служба refresh_daemon.py
+        self.interval_combo = QComboBox()
+        check_interval = read_settings(self.db.connection()).check_interval
+        for label, seconds in CHECK_INTERVALS:
+            self.interval_combo.addItem(label, seconds)
+            if seconds == check_interval:
+                self.interval_combo.setCurrentIndex(self.interval_combo.count() - 1)
+        interval_layout.addWidget(self.interval_combo)
         layout.addLayout(interval_layout)
         
         # Авто-голосование (существующий)
@@ -999,149 +903,51 @@ class MainWindow(QMainWindow):
         
         # Кнопки
         btn_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        btn_box.accepted.connect(lambda: self.save_settings(dialog, self.url_input.text(), self.pages_spinbox.value()))
+        btn_box.accepted.connect(lambda: self.save_settings(dialog, self.url_input.text(), self.pages_spinbox.value(),
+                                                            self.crawl_all_checkbox.isChecked(),
+                                                            self.interval_combo.currentData()))
         btn_box.rejected.connect(dialog.reject)
         layout.addWidget(btn_box)
         
         dialog.setLayout(layout)
         dialog.exec_()
 
-    def save_settings(self, dialog, new_url, max_pages):
+    def save_settings(self, dialog, new_url, max_pages, crawl_all=False, check_interval=None):
         """Сохранение настроек"""
         # Сохраняем новый URL
         self.start_url = new_url
         self.max_pages = max_pages
+        self.crawl_all = crawl_all
         
         # Сохраняем в файл настроек (опционально)
         settings = QSettings('ROI_Assistant', 'Settings')
         settings.setValue('start_url', new_url)
         settings.setValue('max_pages', max_pages)
+        settings.setValue('crawl_all', crawl_all)
         settings.sync()
         
+        # Те же настройки - для службы refresh_daemon.py (она читает их из базы)
+        values = {'start_url': new_url, 'max_pages': max_pages, 'crawl_all': crawl_all}
+        if check_interval is not None:
+            values['check_interval'] = check_interval
+        save_refresh_settings(self.db.connection(), **values)
+        
         dialog.accept()
         self.statusBar().showMessage(f'Настройки сохранены. URL: {new_url[:50]}...', 3000)
     
-    def fetch_federal_initiatives(self):
-        """Получение федеральных инициатив с roi.ru"""
-        try:
-            from browser.roi_parser import ROIParser
-            
-            parser = ROIParser()
-            
-            initiatives = parser.parse_federal_initiatives(
-            start_url=self.start_url,  # Передаем сохраненный URL
-            max_pages=self.max_pages if hasattr(self, 'max_pages') else 1
-            )
-            
-            if not initiatives:
-                QMessageBox.warning(self, 'Внимание',
-                                  'Не удалось получить инициативы.\n'
-                                  'Проверьте интернет-соединение или структуру сайта.')
-                return 0, 0
-            
-            added_count = 0
-            duplicate_count = 0
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for i, initiative in enumerate(initiatives):
-                cursor.execute(
-                    "SELECT id FROM initiatives WHERE external_id = ? OR url = ?",
-                    (initiative['external_id'], initiative['url'])
-                )
-                
-                if not cursor.fetchone():
-                    self.logger.info(f"Получение полного текста для новой инициативы: {initiative['title'][:50]}...")
-                    
-                    try:
-                        details = parser.parse_initiative_details(initiative['url'])
-                        
-                        all_text_parts = []
-                        if details.get('full_text'):
-                            all_text_parts.append(details['full_text'])
-                        if details.get('result_text'):
-                            all_text_parts.append(f"Практический результат: {details['result_text']}")
-                        if details.get('proposal_text'):
-                            all_text_parts.append(f"Решение: {details['proposal_text']}")
-                        
-                        combined_text = '\n\n'.join(all_text_parts)
-                        
-                        cursor.execute('''
-                            INSERT INTO initiatives 
-                            (external_id, title, description, url, category, 
-                            created_date, status, level, votes, anti_votes, source,
-                            full_text, proposal_text, result_text, end_date, 
-                            combined_text, author, initiative_status)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            initiative['external_id'],
-                            initiative['title'],
-                            initiative.get('description', ''),
-                            initiative['url'],
-                            initiative.get('category', 'Федеральные'),
-                            initiative.get('created_date', datetime.now().strftime('%Y-%m-%d')),
-                            'new',
-                            initiative.get('level', 'Федеральный'),
-                            details.get('votes', initiative.get('votes', '0')),
-                            details.get('anti_votes', '0'),
-                            initiative.get('source', 'roi.ru'),
-                            details.get('full_text', ''),
-                            details.get('proposal_text', ''),
-                            details.get('result_text', ''),
-                            details.get('end_date', ''),
-                            combined_text,
-                            details.get('author', ''),
-                            details.get('status', 'на голосовании')
-                        ))
-                        
-                        added_count += 1
-                        time.sleep(0.5)
-                        
-                    except Exception as e:
-                        self.logger.error(f"Ошибка получения полного текста: {e}")
-                        cursor.execute('''
-                            INSERT INTO initiatives 
-                            (external_id, title, description, url, category, 
-                            created_date, status, level, votes, anti_votes, source)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            initiative['external_id'],
-                            initiative['title'],
-                            initiative.get('description', ''),
-                            initiative['url'],
-                            initiative.get('category', 'Федеральные'),
-                            initiative.get('created_date', datetime.now().strftime('%Y-%m-%d')),
-                            'new',
-                            initiative.get('level', 'Федеральный'),
-                            initiative.get('votes', '0'),
-                            '0',
-                            initiative.get('source', 'roi.ru')
-                        ))
-                        added_count += 1
-                else:
-                    duplicate_count += 1
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"Итог: добавлено {added_count} новых, пропущено {duplicate_count}")
-            return added_count, duplicate_count
-            
-        except ImportError:
-            QMessageBox.critical(self, 'Ошибка',
-                               'Модуль парсера не найден.\n'
-                               'Убедитесь что файл browser/roi_parser.py существует')
-            return 0, 0
-        except Exception as e:
-            QMessageBox.critical(self, 'Ошибка',
-                               f'Ошибка загрузки:\n{str(e)}')
-            return 0, 0
+    def closeEvent(self, event):
+        """Закрытие окна: останавливаем фоновое обновление"""
+        if self.refresh_worker is not None and self.refresh_worker.isRunning():
+            self.refresh_worker.cancel()
+            self.refresh_worker.wait()
+        self.detail_prefetcher.wait()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
-    window = MainWindow()
+    # Путь к базе можно передать аргументом (например, синтетическая база для проверки)
+    window = MainWindow(sys.argv[1]) if len(sys.argv) > 1 else MainWindow()
     window.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Версионные миграции схемы data/roi.db
+
+Каждая миграция применяется один раз и записывается в таблицу schema_version.
+К миграции можно приложить проверки EXPLAIN QUERY PLAN: частые запросы
+приложения и индекс, который они должны использовать.
+
+Запуск:
+    python migrations.py [путь_к_бд]   # обновить схему и показать планы запросов
+"""
+
+import re
+import sys
+import sqlite3
+from collections import namedtuple
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply', 'checks'])
+
+# (описание, SQL, параметры, индекс, который должен быть в плане)
+QueryCheck = namedtuple('QueryCheck', ['description', 'sql', 'params', 'index'])
+
+# Чем строка плана читает таблицу: имя индекса, PRIMARY KEY или виртуальная таблица
+PLAN_INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)|USING (?:INTEGER )?(PRIMARY KEY)|(\w+ VIRTUAL TABLE)')
+
+MIGRATIONS = []
+
+
+def migration(version, description, checks=()):
+    """Регистрация функции migrate_N(conn) как миграции схемы"""
+    def register(func):
+        MIGRATIONS.append(Migration(version, description, func, tuple(checks)))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return register
+
+
+@migration(1, 'Базовая схема: initiatives, logs, settings')
+def migrate_1_baseline(conn):
+    # IF NOT EXISTS - чтобы базы, созданные до миграций, приняли версию 1 как есть
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS initiatives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            external_id TEXT UNIQUE,
+            title TEXT NOT NULL,
+            description TEXT,
+            url TEXT,
+            category TEXT,
+            level TEXT DEFAULT 'Федеральный',
+            votes TEXT DEFAULT '0',
+            anti_votes TEXT DEFAULT '0',
+            status TEXT DEFAULT 'new',
+            vote TEXT,
+            vote_date TEXT,
+            source TEXT DEFAULT 'roi.ru',
+            full_text TEXT,
+            proposal_text TEXT,
+            result_text TEXT,
+            end_date TEXT,
+            combined_text TEXT,
+            author TEXT,
+            initiative_status TEXT,
+            created_date TEXT,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            level TEXT,
+            message TEXT,
+            details TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)', [
+        ('check_interval', '300'),  # 5 минут
+        ('auto_vote', 'false'),
+        ('browser_type', 'firefox'),
+        ('language', 'ru'),
+    ])
+
+
+# Счетчики по статусу, голосу и уровню проверяет миграция 7: ее составные
+# индексы заменили одностолбцовые индексы этой миграции
+@migration(2, 'Индексы для фильтров и сортировок, уникальный url', checks=[
+    QueryCheck('Список по дате добавления', "SELECT id, title FROM initiatives ORDER BY added_date DESC",
+               (), 'idx_initiatives_added_date'),
+    QueryCheck('Добавленные за период', "SELECT COUNT(*) FROM initiatives WHERE added_date >= date('now', ?)",
+               ('-6 days',), 'idx_initiatives_added_date'),
+    QueryCheck('Поиск по url', "SELECT id FROM initiatives WHERE url = ?",
+               ('https://www.roi.ru/1/',), 'ux_initiatives_url'),
+])
+def migrate_2_indexes(conn):
+    # Перед уникальным индексом убираем дубликаты url: оставляем строку с голосом
+    # пользователя, а при равенстве - самую раннюю
+    conn.execute("UPDATE initiatives SET url = NULL WHERE url = ''")
+    conn.execute('''
+        DELETE FROM initiatives
+        WHERE url IS NOT NULL AND id NOT IN (
+            SELECT (SELECT i2.id FROM initiatives i2 WHERE i2.url = i1.url
+                    ORDER BY i2.vote IS NULL, i2.id LIMIT 1)
+            FROM initiatives i1 WHERE i1.url IS NOT NULL GROUP BY i1.url
+        )
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_initiatives_url ON initiatives(url)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_status ON initiatives(status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_vote ON initiatives(vote)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_level ON initiatives(level)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_added_date ON initiatives(added_date)')
+
+
+@migration(3, 'Голоса как INTEGER, индекс по голосам', checks=[
+    QueryCheck('Топ по голосам', "SELECT id FROM initiatives ORDER BY votes DESC LIMIT ?",
+               (100,), 'idx_initiatives_votes'),
+    QueryCheck('Порог голосов', "SELECT COUNT(*) FROM initiatives WHERE votes > ?",
+               (1000,), 'idx_initiatives_votes'),
+])
+def migrate_3_integer_votes(conn):
+    # Тип колонки в SQLite меняется только пересозданием таблицы;
+    # числа записаны как '12345' или '12 345'
+    as_int = "CAST(REPLACE(REPLACE(COALESCE({0}, ''), ' ', ''), char(160), '') AS INTEGER)"
+    _rebuild_table(conn, 'initiatives', '''
+        CREATE TABLE initiatives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            external_id TEXT UNIQUE,
+            title TEXT NOT NULL,
+            description TEXT,
+            url TEXT,
+            category TEXT,
+            level TEXT DEFAULT 'Федеральный',
+            votes INTEGER NOT NULL DEFAULT 0,
+            anti_votes INTEGER NOT NULL DEFAULT 0,
+            status TEXT DEFAULT 'new',
+            vote TEXT,
+            vote_date TEXT,
+            source TEXT DEFAULT 'roi.ru',
+            full_text TEXT,
+            proposal_text TEXT,
+            result_text TEXT,
+            end_date TEXT,
+            combined_text TEXT,
+            author TEXT,
+            initiative_status TEXT,
+            created_date TEXT,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''', {'votes': as_int.format('votes'), 'anti_votes': as_int.format('anti_votes')})
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_votes ON initiatives(votes)')
+
+
+@migration(4, 'История голосов initiative_snapshots', checks=[
+    QueryCheck('История инициативы', "SELECT taken_at, votes FROM initiative_snapshots "
+               "WHERE initiative_id = ? AND taken_at >= ? ORDER BY taken_at", (1, 0), 'PRIMARY KEY'),
+    QueryCheck('Голоса на момент времени', "SELECT votes FROM initiative_snapshots "
+               "WHERE initiative_id = ? AND taken_at <= ? ORDER BY taken_at DESC LIMIT 1", (1, 0), 'PRIMARY KEY'),
+])
+def migrate_4_snapshots(conn):
+    # Время - секунды unix, ключ (initiative_id, taken_at) сразу служит индексом по времени
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS initiative_snapshots (
+            initiative_id INTEGER NOT NULL,
+            taken_at INTEGER NOT NULL,
+            votes INTEGER NOT NULL,
+            anti_votes INTEGER NOT NULL,
+            PRIMARY KEY (initiative_id, taken_at)
+        ) WITHOUT ROWID
+    ''')
+    # Снимок пишется только когда счетчики действительно изменились;
+    # upsert из ingest не трогает строки без изменений, поэтому повторное
+    # обновление тысяч инициатив снимков не добавляет
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_snapshot_insert
+        AFTER INSERT ON initiatives
+        BEGIN
+            INSERT INTO initiative_snapshots (initiative_id, taken_at, votes, anti_votes)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.votes, NEW.anti_votes)
+            ON CONFLICT (initiative_id, taken_at) DO UPDATE SET
+                votes = excluded.votes, anti_votes = excluded.anti_votes;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_snapshot_update
+        AFTER UPDATE OF votes, anti_votes ON initiatives
+        WHEN NEW.votes IS NOT OLD.votes OR NEW.anti_votes IS NOT OLD.anti_votes
+        BEGIN
+            INSERT INTO initiative_snapshots (initiative_id, taken_at, votes, anti_votes)
+            VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER), NEW.votes, NEW.anti_votes)
+            ON CONFLICT (initiative_id, taken_at) DO UPDATE SET
+                votes = excluded.votes, anti_votes = excluded.anti_votes;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_snapshot_delete
+        AFTER DELETE ON initiatives
+        BEGIN
+            DELETE FROM initiative_snapshots WHERE initiative_id = OLD.id;
+        END
+    ''')
+    # Начальная точка истории - текущие счетчики на момент добавления
+    conn.execute('''
+        INSERT OR IGNORE INTO initiative_snapshots (initiative_id, taken_at, votes, anti_votes)
+        SELECT id, COALESCE(CAST(strftime('%s', added_date) AS INTEGER),
+                            CAST(strftime('%s', 'now') AS INTEGER)), votes, anti_votes
+        FROM initiatives
+    ''')
+
+
+@migration(5, 'Счетчики статистики initiative_counters', checks=[
+    QueryCheck('Обновление счетчика триггером', "SELECT count FROM initiative_counters WHERE kind = ? AND key = ?",
+               ('vote', 'for'), 'PRIMARY KEY'),
+])
+def migrate_5_counters(conn):
+    # Счетчики по статусу, голосу и уровню ведут триггеры, поэтому голосование
+    # меняет пару строк счетчиков, а панель статистики не пересчитывает таблицу.
+    # NULL хранится как '' - в первичном ключе NULL не совпадает сам с собой
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS initiative_counters (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_counters_insert
+        AFTER INSERT ON initiatives
+        BEGIN
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('total', '', 1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('status', COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('vote', COALESCE(NEW.vote, ''), 1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('level', COALESCE(NEW.level, ''), 1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_counters_delete
+        AFTER DELETE ON initiatives
+        BEGIN
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('total', '', -1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count - 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('status', COALESCE(OLD.status, ''), -1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count - 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('vote', COALESCE(OLD.vote, ''), -1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count - 1;
+            INSERT INTO initiative_counters (kind, key, count) VALUES ('level', COALESCE(OLD.level, ''), -1)
+            ON CONFLICT (kind, key) DO UPDATE SET count = count - 1;
+        END
+    ''')
+    for column in ('status', 'vote', 'level'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS initiatives_counters_{column}
+            AFTER UPDATE OF {column} ON initiatives
+            WHEN OLD.{column} IS NOT NEW.{column}
+            BEGIN
+                INSERT INTO initiative_counters (kind, key, count) VALUES ('{column}', COALESCE(OLD.{column}, ''), -1)
+                ON CONFLICT (kind, key) DO UPDATE SET count = count - 1;
+                INSERT INTO initiative_counters (kind, key, count) VALUES ('{column}', COALESCE(NEW.{column}, ''), 1)
+                ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+
+    # Начальные значения по существующим строкам. SQL зафиксирован здесь, а не
+    # взят из stats.py: схема не должна зависеть от того, когда создана база
+    conn.execute('DELETE FROM initiative_counters')
+    conn.execute("INSERT INTO initiative_counters (kind, key, count) SELECT 'total', '', COUNT(*) FROM initiatives")
+    for column in ('status', 'vote', 'level'):
+        conn.execute(f'''
+            INSERT INTO initiative_counters (kind, key, count)
+            SELECT '{column}', COALESCE({column}, ''), COUNT(*) FROM initiatives
+            GROUP BY COALESCE({column}, '')
+        ''')
+
+
+@migration(6, 'Полнотекстовый индекс initiatives_fts', checks=[
+    QueryCheck('Поиск по тексту', "SELECT rowid FROM initiatives_fts WHERE initiatives_fts MATCH ? ORDER BY rank",
+               ('"налог"*',), 'initiatives_fts VIRTUAL TABLE'),
+])
+def migrate_6_fts(conn):
+    # Индекс хранит только слова, тексты и фрагменты для snippet() берутся из
+    # initiatives (content=). В индекс текст попадает с ё, замененной на е:
+    # unicode61 не считает ё вариантом е. SQL зафиксирован здесь, а не взят из
+    # search.py: изменения индекса - только новыми миграциями
+    def fold_sql(column):
+        return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+    columns = ('title', 'full_text', 'proposal_text', 'result_text')
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS initiatives_fts USING fts5(
+            {', '.join(columns)},
+            content='initiatives', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+
+    new_values = ', '.join(fold_sql(f'NEW.{column}') for column in columns)
+    old_values = ', '.join(fold_sql(f'OLD.{column}') for column in columns)
+    insert_new = f'''
+            INSERT INTO initiatives_fts (rowid, {', '.join(columns)})
+            VALUES (NEW.id, {new_values});'''
+    # Для таблицы с content= удаляемые слова передаются явно - ровно те, что были записаны
+    delete_old = f'''
+            INSERT INTO initiatives_fts (initiatives_fts, rowid, {', '.join(columns)})
+            VALUES ('delete', OLD.id, {old_values});'''
+    changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in columns)
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS initiatives_fts_insert
+        AFTER INSERT ON initiatives
+        BEGIN{insert_new}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS initiatives_fts_delete
+        AFTER DELETE ON initiatives
+        BEGIN{delete_old}
+        END
+    ''')
+    # Голоса обновляются часто, тексты - редко: индекс трогаем только при изменении текста
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS initiatives_fts_update
+        AFTER UPDATE OF {', '.join(columns)} ON initiatives
+        WHEN {changed}
+        BEGIN{delete_old}{insert_new}
+        END
+    ''')
+
+    # Вес колонок в bm25: совпадение в заголовке важнее совпадения в тексте
+    conn.execute("INSERT INTO initiatives_fts (initiatives_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0, 2.0)')")
+    conn.execute(f'''
+        INSERT INTO initiatives_fts (rowid, {', '.join(columns)})
+        SELECT id, {', '.join(fold_sql(column) for column in columns)}
+        FROM initiatives
+    ''')
+
+
+@migration(7, 'Составные индексы фильтров списка и статистика планировщика', checks=[
+    QueryCheck('Счетчик по статусу', "SELECT COUNT(*) FROM initiatives WHERE status = ?",
+               ('new',), 'idx_initiatives_status_votes'),
+    QueryCheck('Счетчик по голосу', "SELECT COUNT(*) FROM initiatives WHERE vote = ?",
+               ('for',), 'idx_initiatives_vote_votes'),
+    QueryCheck('Счетчик по уровню', "SELECT COUNT(*) FROM initiatives WHERE level = ?",
+               ('Федеральный',), 'idx_initiatives_level_votes'),
+    QueryCheck('Фильтр по статусу и порогу голосов', "SELECT COUNT(*) FROM initiatives WHERE status = ? AND votes >= ?",
+               ('new', 1000), 'idx_initiatives_status_votes'),
+    QueryCheck('Фильтр по голосу и порогу голосов', "SELECT COUNT(*) FROM initiatives WHERE vote = ? AND votes >= ?",
+               ('for', 1000), 'idx_initiatives_vote_votes'),
+    QueryCheck('Фильтр по уровню и порогу голосов', "SELECT COUNT(*) FROM initiatives WHERE level = ? AND votes >= ?",
+               ('Федеральный', 1000), 'idx_initiatives_level_votes'),
+])
+def migrate_7_filter_indexes(conn):
+    # Фильтр списка сочетает статус/голос/уровень с порогом голосов: с votes
+    # вторым столбцом число строк считается по одному индексу. Такой индекс
+    # заменяет и одностолбцовый (поиск по первому столбцу)
+    for column in ('status', 'vote', 'level'):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_initiatives_{column}_votes ON initiatives({column}, votes)')
+        conn.execute(f'DROP INDEX IF EXISTS idx_initiatives_{column}')
+    # Без sqlite_stat1 планировщик считает индекс по статусу избирательным и
+    # сортирует весь список «новых», вместо того чтобы идти по индексу даты
+    conn.execute('ANALYZE')
+
+
+@migration(8, 'Номер версии строки row_version для отслеживания изменений', checks=[
+    QueryCheck('Строки, измененные после версии', "SELECT id FROM initiatives WHERE row_version > ?",
+               (0,), 'idx_initiatives_row_version'),
+    QueryCheck('Последняя версия', "SELECT MAX(row_version) FROM initiatives", (), 'idx_initiatives_row_version'),
+])
+def migrate_8_row_version(conn):
+    # Любая вставка или изменение строки получает номер больше всех прежних,
+    # поэтому окну достаточно выбрать строки с row_version больше запомненного
+    conn.execute('ALTER TABLE initiatives ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0')
+    conn.execute('UPDATE initiatives SET row_version = id')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_initiatives_row_version ON initiatives(row_version)')
+
+    # MAX по индексу - один переход по дереву. Вложенный UPDATE меняет только
+    # row_version, поэтому сам триггер (условие WHEN) и триггеры других колонок не срабатывают
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_row_version_insert
+        AFTER INSERT ON initiatives
+        BEGIN
+            UPDATE initiatives SET row_version = (SELECT MAX(row_version) + 1 FROM initiatives)
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS initiatives_row_version_update
+        AFTER UPDATE ON initiatives
+        WHEN NEW.row_version = OLD.row_version
+        BEGIN
+            UPDATE initiatives SET row_version = (SELECT MAX(row_version) + 1 FROM initiatives)
+            WHERE id = NEW.id;
+        END
+    ''')
+
+
+@migration(9, 'Очередь обхода сайта crawl_frontier для продолжения после сбоя', checks=[
+    QueryCheck('Ожидающие загрузки', "SELECT url FROM crawl_frontier WHERE state = ? AND kind = ?",
+               ('pending', 'list'), 'idx_crawl_frontier_state'),
+])
+def migrate_9_crawl_frontier(conn):
+    # Страницы списков и детальные страницы текущего обхода: состояние
+    # меняется в той же транзакции, что и запись найденных инициатив
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            url TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            page INTEGER,
+            payload TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_fetched REAL,
+            error TEXT,
+            added_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_frontier_state ON crawl_frontier(state, kind)')
+
+
+@migration(10, 'История фоновых обновлений refresh_runs и блокировки locks')
+def migrate_10_refresh_runs(conn):
+    # Каждый запуск обновления (службой refresh_daemon.py или из окна):
+    # окно показывает итоги отсюда, а не загружает сайт само
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS refresh_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            duration REAL,
+            pages INTEGER NOT NULL DEFAULT 0,
+            details INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            added INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER NOT NULL DEFAULT 0,
+            unchanged INTEGER NOT NULL DEFAULT 0,
+            error TEXT
+        )
+    ''')
+    # Именованные блокировки: одна служба на базу, одно обновление за раз;
+    # запись без heartbeat дольше срока считается оставленной упавшим процессом
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS locks (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            acquired_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL
+        )
+    ''')
+    # Что обновлять - служба читает отсюда, окно сохраняет сюда
+    conn.executemany('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)', [
+        ('start_url', 'https://www.roi.ru/poll/last/?level=1'),
+        ('max_pages', '1'),
+        ('crawl_all', 'false'),
+    ])
+
+
+def _rebuild_table(conn, table, create_sql, conversions=None):
+    """
+    Пересоздание таблицы с новой схемой с сохранением данных, индексов и триггеров
+    Args:
+        create_sql: CREATE TABLE с тем же именем таблицы
+        conversions: {колонка: SQL-выражение над старыми колонками}
+    """
+    conversions = conversions or {}
+    old_columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL", (table,))]
+
+    conn.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+    conn.execute(create_sql)
+    new_columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    columns = [c for c in new_columns if c in old_columns]
+    conn.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(conversions.get(c, c) for c in columns)} FROM {table}_old")
+    conn.execute(f'DROP TABLE {table}_old')
+    for sql in dependents:
+        conn.execute(sql)
+
+
+def current_version(conn):
+    """Версия схемы базы (0 - миграции еще не применялись)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """
+    Применение недостающих миграций, каждая - в своей транзакции
+    Args:
+        conn: соединение sqlite3
+        target: до какой версии обновлять (по умолчанию до последней)
+    Returns:
+        список примененных миграций
+    """
+    conn.commit()
+    version = current_version(conn)
+    conn.commit()
+
+    applied = []
+    for item in MIGRATIONS:
+        if item.version <= version or (target is not None and item.version > target):
+            continue
+        conn.execute('BEGIN')
+        try:
+            item.apply(conn)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                         (item.version, item.description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(item)
+    return applied
+
+
+def query_plan(conn, sql, params=()):
+    """Строки EXPLAIN QUERY PLAN для запроса"""
+    return [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def plan_indexes(plan):
+    """Имена индексов (а также PRIMARY KEY и виртуальных таблиц), которые использует план"""
+    indexes = set()
+    for line in plan:
+        for match in PLAN_INDEX_RE.finditer(line):
+            indexes.add(next(group for group in match.groups() if group))
+    return indexes
+
+
+def check_query_plans(conn):
+    """
+    Проверка, что частые запросы применённых миграций используют свои индексы
+    Returns:
+        список (QueryCheck, план, индекс используется)
+    """
+    version = current_version(conn)
+    results = []
+    for item in MIGRATIONS:
+        if item.version > version:
+            continue
+        for check in item.checks:
+            plan = query_plan(conn, check.sql, check.params)
+            used = check.index in plan_indexes(plan)
+            results.append((check, plan, used))
+    return results
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/roi.db'
+    conn = sqlite3.connect(db_path)
+
+    before = current_version(conn)
+    applied = migrate(conn)
+    print(f"Схема {db_path}: версия {before} -> {current_version(conn)}")
+    for item in applied:
+        print(f"  ✓ {item.version}: {item.description}")
+
+    print("\nПланы частых запросов:")
+    failed = 0
+    for check, plan, used in check_query_plans(conn):
+        print(f"  {'✓' if used else '✗'} {check.description}: {'; '.join(plan)}")
+        if not used:
+            failed += 1
+
+    conn.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ограничение частоты запросов к roi.ru
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+# Как часто асинхронный запрос проверяет, освободилось ли место (секунды)
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class RateLimiter:
+    """
+    Глобальный бюджет запросов в секунду (token bucket).
+    Один экземпляр разделяется между всеми потоками парсера.
+    """
+
+    def __init__(self, requests_per_second=1.0, burst=1):
+        """
+        Args:
+            requests_per_second: сколько запросов в секунду разрешено в среднем
+            burst: сколько запросов можно отправить подряд без ожидания
+        """
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second должен быть больше нуля")
+
+        self.rate = float(requests_per_second)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Пополнение корзины за прошедшее время"""
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def _try_take(self):
+        """Забирает токен, если он есть; иначе возвращает время ожидания"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Блокирует поток, пока не появится свободный токен"""
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """То же для asyncio: ждет токен, не блокируя event loop"""
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Не выдавать токены ближайшие seconds секунд (сервер попросил подождать - Retry-After)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Отрицательный запас: корзина пополнится до 1 токена не раньше чем через seconds
+            self._tokens = min(self._tokens, 1 - (seconds * self.rate))
+
+
+class HostRateLimiter:
+    """
+    Отдельный RateLimiter на каждый хост: запросы к одному сайту не
+    расходуют бюджет другого. Лимитеры создаются при первом запросе к хосту.
+    """
+
+    def __init__(self, requests_per_second=1.0, burst=1, limiters=None):
+        """
+        Args:
+            limiters: готовые лимитеры {хост: RateLimiter} (например, лимитер
+                парсера, чтобы его бюджет делился с другими загрузками)
+        """
+        self.rate = float(requests_per_second)
+        self.burst = burst
+        self._limiters = dict(limiters or {})
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate, self.burst)
+        return limiter
+
+    def acquire(self, url):
+        """Ждет токен хоста, к которому относится url"""
+        self.limiter(url).acquire()
+
+    async def acquire_async(self, url):
+        await self.limiter(url).acquire_async()
+
+    def pause(self, url, seconds):
+        self.limiter(url).pause(seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    Число одновременных запросов по принципу AIMD: пока сервер отвечает
+    быстро, лимит растет на 1 за каждые limit успешных ответов; при 429/503,
+    таймауте или средней задержке выше target_latency - уменьшается вдвое.
+    Частоту запросов по-прежнему ограничивает RateLimiter, этот класс -
+    сколько из них может ждать ответа одновременно.
+    """
+
+    def __init__(self, initial=2, minimum=1, maximum=8, target_latency=2.0, decrease=0.5):
+        """
+        Args:
+            target_latency: средняя задержка ответа (секунды), выше которой сервер считается перегруженным
+            decrease: во сколько раз уменьшать лимит при перегрузке
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.latency = None             # скользящее среднее задержки
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Ждет, пока число запросов в работе станет меньше лимита"""
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        """
+        То же для asyncio: место проверяется без блокировки event loop, поэтому
+        синхронные и асинхронные запросы делят один лимит
+        """
+        while True:
+            with self._condition:
+                if self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+
+    def release(self, latency=None, overloaded=False):
+        """
+        Запрос завершен
+        Args:
+            latency: время ответа (None - ответа не было)
+            overloaded: сервер дал понять, что перегружен (429/503, таймаут)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+            now = time.monotonic()
+            if overloaded or (self.latency is not None and self.latency > self.target_latency):
+                # Ответы на запросы, отправленные до снижения, не снижают лимит еще раз
+                if now - self._last_decrease > (self.latency or 1.0):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
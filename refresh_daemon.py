@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фоновая служба обновления инициатив с roi.ru (без окна)
+
+Раз в check_interval секунд из таблицы settings служба запускает
+инкрементальное обновление: CrawlOrchestrator.crawl_into с очередью обхода,
+детали загружаются только для новых инициатив, неизменившиеся страницы
+берутся из HTTP-кэша. Пауза между запусками случайно отклоняется на ±JITTER,
+чтобы несколько копий не опрашивали сайт в одни и те же секунды. Настройки
+перечитываются перед каждым запуском - изменения из окна применяются без
+перезапуска службы.
+
+Итоги запусков пишутся в refresh_runs (миграция 10), окно показывает их и
+новые инициативы из базы. Блокировки в таблице locks: 'daemon' - одна служба
+на базу, 'refresh' - одно обновление за раз (служба или кнопка в окне).
+Если служба работает, кнопка в окне не загружает сайт сама, а просит службу
+обновить базу сейчас (request_refresh), не дожидаясь конца паузы.
+
+Запуск:
+    python refresh_daemon.py [--db путь_к_бд]    # служба
+    python refresh_daemon.py --once              # одно обновление и выход
+    python refresh_daemon.py --history           # последние запуски
+"""
+
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from database import DEFAULT_DB_PATH
+
+# Случайное отклонение паузы между запусками (доля интервала)
+JITTER = 0.1
+
+# Реже не опрашиваем, даже если в настройках меньше (секунды)
+MIN_INTERVAL = 60
+
+# Блокировка без heartbeat дольше этого срока оставлена упавшим процессом
+LOCK_TTL = 600
+HEARTBEAT_INTERVAL = 30
+
+# Как часто служба во время паузы проверяет запрос на обновление из окна
+REQUEST_POLL_INTERVAL = 5
+
+# Варианты интервала проверки в настройках окна: (подпись, секунды)
+CHECK_INTERVALS = (
+    ('5 минут', 300),
+    ('15 минут', 900),
+    ('30 минут', 1800),
+    ('1 час', 3600),
+    ('3 часа', 10800),
+    ('12 часов', 43200),
+    ('1 день', 86400),
+)
+
+RefreshSettings = namedtuple('RefreshSettings', ['check_interval', 'start_url', 'max_pages', 'crawl_all'])
+
+RefreshRun = namedtuple('RefreshRun', [
+    'id', 'source', 'status', 'started_at', 'finished_at', 'duration',
+    'pages', 'details', 'errors', 'added', 'updated', 'unchanged', 'error'
+])
+
+RUN_STATUSES = {
+    'running': 'выполняется',
+    'ok': 'завершено',
+    'cancelled': 'остановлено',
+    'failed': 'ошибка',
+    'interrupted': 'прервано сбоем',
+}
+
+
+class DatabaseLock:
+    """Именованная блокировка в таблице locks: между процессами и потоками одной базы"""
+
+    def __init__(self, conn, name, ttl=LOCK_TTL):
+        self.conn = conn
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.last_heartbeat = 0.0
+
+    def acquire(self):
+        """True - блокировка получена (устаревшая запись упавшего владельца снимается)"""
+        now = time.time()
+        # Удаление и вставка в одной транзакции: SQLite пускает одного писателя
+        with self.conn:
+            self.conn.execute('DELETE FROM locks WHERE name = ? AND heartbeat_at < ?',
+                              (self.name, now - self.ttl))
+            cursor = self.conn.execute('''
+                INSERT OR IGNORE INTO locks (name, owner, acquired_at, heartbeat_at)
+                VALUES (?, ?, ?, ?)
+            ''', (self.name, self.owner, now, now))
+        self.last_heartbeat = now
+        return cursor.rowcount == 1
+
+    def heartbeat(self):
+        """Продлить блокировку (запись в базу не чаще раза в HEARTBEAT_INTERVAL)"""
+        now = time.time()
+        if now - self.last_heartbeat < HEARTBEAT_INTERVAL:
+            return
+        with self.conn:
+            self.conn.execute('UPDATE locks SET heartbeat_at = ? WHERE name = ? AND owner = ?',
+                              (now, self.name, self.owner))
+        self.last_heartbeat = now
+
+    def release(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM locks WHERE name = ? AND owner = ?', (self.name, self.owner))
+
+
+def lock_holder(conn, name, ttl=LOCK_TTL):
+    """Владелец действующей блокировки (хост:pid:поток) или None"""
+    row = conn.execute('SELECT owner FROM locks WHERE name = ? AND heartbeat_at >= ?',
+                       (name, time.time() - ttl)).fetchone()
+    return row[0] if row else None
+
+
+def read_settings(conn):
+    """Настройки обновления из таблицы settings"""
+    values = dict(conn.execute('SELECT key, value FROM settings'))
+
+    def number(key, default):
+        try:
+            return int(values.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    return RefreshSettings(
+        check_interval=max(MIN_INTERVAL, number('check_interval', 300)),
+        start_url=values.get('start_url') or None,
+        max_pages=max(1, number('max_pages', 1)),
+        crawl_all=values.get('crawl_all') == 'true',
+    )
+
+
+def save_settings(conn, **values):
+    """Записать настройки (bool - как 'true'/'false', как в миграции 1)"""
+    with conn:
+        conn.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', [
+            (key, str(value).lower() if isinstance(value, bool) else str(value))
+            for key, value in values.items()
+        ])
+
+
+def request_refresh(conn):
+    """Попросить работающую службу обновить базу сейчас"""
+    save_settings(conn, refresh_requested=time.time())
+
+
+def take_refresh_request(conn):
+    """True - окно просило обновить базу (запрос снимается)"""
+    # Проверка раз в несколько секунд - без транзакции записи, пока запроса нет
+    if conn.execute("SELECT 1 FROM settings WHERE key = 'refresh_requested'").fetchone() is None:
+        return False
+    with conn:
+        return conn.execute("DELETE FROM settings WHERE key = 'refresh_requested'").rowcount > 0
+
+
+def next_delay(interval, jitter=JITTER):
+    """Пауза до следующего запуска: интервал ± jitter"""
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def last_runs(conn, limit=10, finished=False):
+    """Последние запуски, новые первыми (finished - только завершившиеся)"""
+    where = "WHERE status != 'running' " if finished else ''
+    return [RefreshRun(*row) for row in conn.execute(
+        f"SELECT {', '.join(RefreshRun._fields)} FROM refresh_runs {where}ORDER BY id DESC LIMIT ?",
+        (limit,))]
+
+
+def refresh(conn, parser, source, start_url=None, max_pages=1, crawl_all=False,
+            on_page=None, on_details=None, on_rows=None, should_stop=None):
+    """
+    Одно инкрементальное обновление с записью итогов в refresh_runs
+    Args:
+        parser: ROIParser
+        source: кто запустил ('daemon', 'gui')
+        start_url, max_pages, crawl_all: что обходить (как в RefreshSettings)
+        on_page, on_details, on_rows, should_stop: как в CrawlOrchestrator.crawl_into
+    Returns:
+        RefreshRun или None, если базу уже обновляет другой процесс
+    """
+    from ingest import IngestResult, load_known_keys
+    from frontier import Frontier
+    from crawl_orchestrator import CrawlOrchestrator, Listing
+
+    lock = DatabaseLock(conn, 'refresh')
+    if not lock.acquire():
+        return None
+
+    try:
+        started = time.time()
+        with conn:
+            # Запуски, которые не успели записать итог (процесс упал)
+            conn.execute("UPDATE refresh_runs SET status = 'interrupted' WHERE status = 'running'")
+            run_id = conn.execute('INSERT INTO refresh_runs (source, started_at) VALUES (?, ?)',
+                                  (source, started)).lastrowid
+
+        known_ids, known_urls = load_known_keys(conn)
+
+        def is_new(initiative):
+            """Детали загружаем только для инициатив, которых еще нет в базе"""
+            if initiative['external_id'] in known_ids or initiative['url'] in known_urls:
+                return False
+            known_ids.add(initiative['external_id'])
+            known_urls.add(initiative['url'])
+            return True
+
+        # Все списки сайта или один список с заданного адреса
+        listings = None if crawl_all else [Listing(None, None, start_url or parser.federal_url)]
+        orchestrator = CrawlOrchestrator(parser, listings, max_pages=max_pages)
+        totals = IngestResult(0, 0, 0)
+
+        def rows_written(result):
+            nonlocal totals
+            totals = result
+            lock.heartbeat()
+            if on_rows is not None:
+                on_rows(result)
+
+        status, error = 'ok', None
+        try:
+            orchestrator.crawl_into(conn, Frontier(conn), needs_details=is_new,
+                                    on_page=on_page, on_details=on_details,
+                                    on_rows=rows_written, should_stop=should_stop)
+            if should_stop is not None and should_stop():
+                status = 'cancelled'
+        except KeyboardInterrupt:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status, error = 'failed', str(e)
+            raise
+        finally:
+            # Записанное до ошибки или остановки остается в базе - учитываем и его
+            finished = time.time()
+            stats = orchestrator.stats()
+            with conn:
+                conn.execute('''
+                    UPDATE refresh_runs
+                    SET status = ?, finished_at = ?, duration = ?, pages = ?, details = ?, errors = ?,
+                        added = ?, updated = ?, unchanged = ?, error = ?
+                    WHERE id = ?
+                ''', (status, finished, finished - started, stats.pages, stats.details, stats.errors,
+                      totals.added, totals.updated, totals.unchanged, error, run_id))
+    finally:
+        lock.release()
+
+    return RefreshRun(*conn.execute(
+        f"SELECT {', '.join(RefreshRun._fields)} FROM refresh_runs WHERE id = ?", (run_id,)).fetchone())
+
+
+def format_run(run):
+    """Строка итога запуска для консоли и строки состояния окна"""
+    when = time.strftime('%d.%m %H:%M', time.localtime(run.started_at))
+    text = (f"{when} {RUN_STATUSES.get(run.status, run.status)}: добавлено {run.added}, "
+            f"обновлено {run.updated}, без изменений {run.unchanged}")
+    if run.duration is not None:
+        text += f" (страниц {run.pages}, деталей {run.details}, {run.duration:.0f} с)"
+    if run.errors:
+        text += f", ошибок загрузки {run.errors}"
+    if run.error:
+        text += f" - {run.error}"
+    return text
+
+
+def _stop_on_sigterm():
+    """SIGTERM (остановка службы системой) - как Ctrl+C: итог запуска записывается"""
+    import signal
+
+    def handler(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handler)
+
+
+def run_daemon(db_path=DEFAULT_DB_PATH, once=False, interval=None):
+    """
+    Цикл службы: обновление, пауза check_interval ± JITTER, снова обновление
+    Args:
+        once: одно обновление и выход
+        interval: пауза в секундах вместо check_interval из настроек
+    Returns:
+        код возврата процесса
+    """
+    from database import get_database
+    from migrations import migrate
+    from roi_parser import ROIParser
+    from http_cache import HTTPCache
+
+    # Неизменившиеся страницы берутся из дискового кэша или
+    # перепроверяются условным запросом
+    parser = ROIParser(http_cache=HTTPCache())
+
+    database = get_database(db_path)
+    conn = database.connection()
+    migrate(conn)
+
+    instance = DatabaseLock(conn, 'daemon')
+    if not instance.acquire():
+        print(f"✗ Для {db_path} уже запущена служба: {lock_holder(conn, 'daemon')}")
+        database.close()
+        return 1
+
+    _stop_on_sigterm()
+    print(f"✓ Служба обновления запущена для {db_path}")
+
+    try:
+        while True:
+            settings = read_settings(conn)
+            # Запрос из окна, пришедший до этого запуска, им и выполнен
+            take_refresh_request(conn)
+            try:
+                run = refresh(conn, parser, 'daemon', settings.start_url, settings.max_pages,
+                              settings.crawl_all, on_rows=lambda result: instance.heartbeat())
+                if run is None:
+                    print("Базу сейчас обновляет окно программы - запуск пропущен")
+                else:
+                    print(format_run(run))
+            except Exception as e:
+                # Ошибка уже записана в refresh_runs; следующий запуск по расписанию
+                print(f"✗ Ошибка обновления: {e}")
+
+            if once:
+                break
+
+            delay = next_delay(interval or read_settings(conn).check_interval)
+            print(f"Следующее обновление в {time.strftime('%H:%M:%S', time.localtime(time.time() + delay))}")
+            deadline = time.monotonic() + delay
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, REQUEST_POLL_INTERVAL))
+                instance.heartbeat()
+                if take_refresh_request(conn):
+                    print("Обновление по запросу из окна программы")
+                    break
+    except KeyboardInterrupt:
+        print("\nСлужба остановлена - прерванный обход продолжится при следующем запуске")
+    finally:
+        instance.release()
+        database.close()
+    return 0
+
+
+def main():
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='Фоновая служба обновления инициатив с roi.ru')
+    arg_parser.add_argument('--db', default=DEFAULT_DB_PATH, help='файл базы')
+    arg_parser.add_argument('--once', action='store_true', help='одно обновление и выход')
+    arg_parser.add_argument('--interval', type=int, help='пауза между обновлениями, с (по умолчанию check_interval)')
+    arg_parser.add_argument('--history', action='store_true', help='показать последние запуски')
+    args = arg_parser.parse_args()
+
+    if args.history:
+        from database import connect
+        from migrations import migrate
+
+        conn = connect(args.db)
+        migrate(conn)
+        runs = last_runs(conn, limit=20)
+        for run in runs:
+            print(f"{run.id:>5} {run.source:<7} {format_run(run)}")
+        if not runs:
+            print("Обновлений еще не было")
+        holder = lock_holder(conn, 'daemon')
+        print(f"\nСлужба: {'работает (' + holder + ')' if holder else 'не запущена'}, "
+              f"интервал {read_settings(conn).check_interval} с")
+        conn.close()
+        return 0
+
+    return run_daemon(args.db, once=args.once, interval=args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
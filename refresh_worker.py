@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фоновое обновление списка инициатив с roi.ru для MainWindow
+"""
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from database import get_database
+
+
+class RefreshWorker(QThread):
+    """
+    Загрузка списка, деталей новых инициатив и запись в БД в отдельном потоке.
+    Найденное записывается после каждой страницы (CrawlOrchestrator.crawl_into),
+    после каждой записи - сигнал rows_inserted, чтобы окно сразу показывало
+    новые инициативы. Очередь обхода хранится в базе (frontier.py): если
+    обновление прервалось, следующее продолжит его с места остановки.
+    Запуск записывается в refresh_runs, как и запуски службы refresh_daemon.py;
+    если служба сейчас обновляет базу - сигнал busy, второй обход не начинается.
+    """
+    page_done = pyqtSignal(int, int)             # номер страницы, инициатив на ней
+    details_done = pyqtSignal(int)               # загружено детальных страниц всего
+    rows_inserted = pyqtSignal(int, int, int)    # всего добавлено, обновлено, без изменений
+    failed = pyqtSignal(str)
+    busy = pyqtSignal()                          # базу уже обновляет другой процесс
+
+    def __init__(self, db_path, start_url=None, max_pages=1, crawl_all=False, parent=None):
+        """
+        Args:
+            start_url: первая страница списка (если crawl_all - не используется)
+            max_pages: максимум страниц в списке
+            crawl_all: обойти все уровни и разделы сайта
+        """
+        super().__init__(parent)
+        self.db_path = db_path
+        self.start_url = start_url
+        self.max_pages = max_pages
+        self.crawl_all = crawl_all
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.cancelled = False
+        self.last_run = None                     # RefreshRun по окончании
+
+    def cancel(self):
+        """Остановить обновление после текущей страницы (записанное остается в базе)"""
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            from roi_parser import ROIParser
+            from http_cache import HTTPCache
+        except ImportError:
+            self.failed.emit('Модуль парсера не найден.\n'
+                             'Убедитесь что файл roi_parser.py существует')
+            return
+
+        database = get_database(self.db_path)
+        try:
+            from refresh_daemon import refresh
+
+            # Неизменившиеся страницы берутся из дискового кэша или
+            # перепроверяются условным запросом
+            parser = ROIParser(http_cache=HTTPCache())
+
+            # У потока обновления свое соединение (sqlite3 не разрешает
+            # использовать чужое); WAL дает окну читать во время записи
+            conn = database.connection()
+            self.last_run = refresh(
+                conn, parser, 'gui', self.start_url, self.max_pages, self.crawl_all,
+                on_page=lambda page, count: self.page_done.emit(page, count),
+                on_details=self.details_done.emit,
+                on_rows=self._on_rows,
+                should_stop=self.isInterruptionRequested
+            )
+            if self.last_run is None:
+                self.busy.emit()
+            self.cancelled = self.isInterruptionRequested()
+
+        except Exception as e:
+            self.failed.emit(f'Ошибка загрузки:\n{str(e)}')
+        finally:
+            database.close()
+
+    def _on_rows(self, result):
+        self.added, self.updated, self.unchanged = result
+        self.rows_inserted.emit(self.added, self.updated, self.unchanged)
@@ -5,20 +5,59 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import re
-import time
 from datetime import datetime
 import logging
 from urllib.parse import urljoin, urlparse, parse_qs
-import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import RateLimiter, HostRateLimiter, AdaptiveConcurrency
+from transport import RequestsTransport
+from http_cache import CachedSession, CLOSED_INITIATIVE_TTL
+from html_backend import make_soup
 
 class ROIParser:
-    def __init__(self):
-        self.base_url = "https://www.roi.ru"
-        self.federal_url = "https://www.roi.ru/poll/last/?level=1"
+    def __init__(self, base_url="https://www.roi.ru", requests_per_second=1.0,
+                 http_cache=None, offline=False, html_features=None, selective_parsing=False,
+                 max_concurrency=8, retry=None):
+        """
+        Args:
+            base_url: адрес сайта (можно подменить локальным сервером с сохраненными страницами)
+            requests_per_second: общий лимит запросов к сайту (списки и детальные страницы)
+            http_cache: HTTPCache для хранения страниц на диске (None - без кэша)
+            offline: работать только с сохраненными в кэше страницами, без сети
+            html_features: парсер BeautifulSoup (по умолчанию lxml, если установлен)
+            selective_parsing: строить дерево только из блоков, которые читает парсер
+            max_concurrency: предел одновременных запросов (фактический подбирается по задержке ответов)
+            retry: RetryPolicy для повторов при 429/5xx и сетевых ошибках
+        """
+        self.base_url = base_url.rstrip('/')
+        self.federal_url = urljoin(self.base_url, "/poll/last/?level=1")
         
-        self.session = requests.Session()
+        # Общий для всех потоков и путей загрузки бюджет запросов (заменяет фиксированные паузы)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.rate_limits = HostRateLimiter(
+            requests_per_second, limiters={urlparse(self.base_url).netloc: self.rate_limiter})
+        self.concurrency = AdaptiveConcurrency(maximum=max_concurrency)
+        
+        if offline and http_cache is None:
+            raise ValueError("Режим offline требует http_cache")
+        
+        if http_cache is not None:
+            self.session = CachedSession(http_cache, offline=offline)
+        else:
+            self.session = requests.Session()
+        self.http_cache = http_cache
+        self.html_features = html_features
+        self.selective_parsing = selective_parsing
+        # Пул соединений с запасом под параллельную загрузку деталей
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.transport = RequestsTransport(self.session, rate_limits=self.rate_limits,
+                                           concurrency=self.concurrency, retry=retry)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -48,49 +87,76 @@ class ROIParser:
         Returns:
             list: список инициатив
         """
-        all_initiatives = []
+        return list(self.iter_federal_initiatives(start_url=start_url, max_pages=max_pages))
+    
+    def iter_federal_initiatives(self, start_url=None, max_pages=3, on_page=None):
+        """
+        Потоковый парсинг списка инициатив.
+        Инициативы отдаются сразу после разбора своей страницы, а следующая
+        страница в это время уже скачивается в фоновом потоке.
+        Args:
+            start_url: начальный URL для парсинга (если None, используем self.federal_url)
+            max_pages: максимальное количество страниц для парсинга
+            on_page: функция (номер страницы, число инициатив) - вызывается после разбора страницы
+        Yields:
+            dict: инициатива
+        """
+        total = 0
+        current_page = 1
+        current_url = start_url if start_url else self.federal_url
         
+        # Один фоновый поток: пока потребитель обрабатывает страницу N, качаем N+1
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
-            # Парсим первую страницу
-            current_page = 1
-            current_url = start_url if start_url else self.federal_url
+            self.logger.info(f"Парсинг страницы {current_page}: {current_url}")
+            future = executor.submit(self.transport.get, current_url)
             
-            while current_page <= max_pages and current_url:
-                self.logger.info(f"Парсинг страницы {current_page}: {current_url}")
-                
-                # Получаем HTML страницы
-                response = self.session.get(current_url, timeout=30)
-                response.raise_for_status()
-                
-                # Парсим HTML
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Извлекаем инициативы с текущей страницы
-                page_initiatives = self._parse_initiatives_page(soup)
-                all_initiatives.extend(page_initiatives)
+            while future is not None:
+                try:
+                    content = future.result()
+                    
+                    # Парсим HTML
+                    soup = self._make_soup(content, 'list')
+                    
+                    # Извлекаем инициативы с текущей страницы
+                    page_initiatives = self._parse_initiatives_page(soup)
+                    
+                    # Находим ссылку на следующую страницу
+                    next_url = self._get_next_page_url(soup, current_url)
+                    
+                except Exception as e:
+                    self.logger.error(f"Ошибка при парсинге федеральных инициатив: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    break
                 
                 self.logger.info(f"Страница {current_page}: найдено {len(page_initiatives)} инициатив")
+                if on_page is not None:
+                    on_page(current_page, len(page_initiatives))
                 
-                # Находим ссылку на следующую страницу
-                next_url = self._get_next_page_url(soup, current_url)
-                
-                if next_url and next_url != current_url:
+                future = None
+                if current_page < max_pages and next_url and next_url != current_url:
+                    # Сразу запускаем загрузку следующей страницы (частоту запросов ограничивает транспорт)
                     current_url = next_url
-                    current_page += 1
-                    
-                    # Задержка между запросами, чтобы не нагружать сервер
-                    time.sleep(2)
-                else:
+                    self.logger.info(f"Парсинг страницы {current_page + 1}: {current_url}")
+                    future = executor.submit(self.transport.get, current_url)
+                elif current_page < max_pages:
                     self.logger.info(f"Достигнут конец пагинации или следующая страница не найдена")
-                    break
-                    
-        except Exception as e:
-            self.logger.error(f"Ошибка при парсинге федеральных инициатив: {e}")
-            import traceback
-            traceback.print_exc()
+                
+                for initiative in page_initiatives:
+                    total += 1
+                    yield initiative
+                
+                current_page += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        self.logger.info(f"Всего распарсено федеральных инициатив: {len(all_initiatives)}")
-        return all_initiatives
+        self.logger.info(f"Всего распарсено федеральных инициатив: {total}")
+    
+    def _make_soup(self, content, page):
+        """Разбор HTML выбранным парсером ('list' - страница списка, 'detail' - детальная)"""
+        return make_soup(content, page, features=self.html_features,
+                         selective=self.selective_parsing)
     
     def _parse_initiatives_page(self, soup):
         """
@@ -137,13 +203,13 @@ class ROIParser:
             title = link_elem.get_text(strip=True)
             
             # 3. Извлекаем количество голосов ЗА
-            votes_text = "0"
+            votes = 0
             votes_elem = block.find('div', class_='hour')
             if votes_elem:
                 # Ищем тег <b> с числом голосов
                 b_tag = votes_elem.find('b')
                 if b_tag:
-                    votes_text = b_tag.get_text(strip=True).replace(' ', '')
+                    votes = self._digits(b_tag)
             
             # 4. Извлекаем уровень инициативы
             level = "Федеральный"
@@ -161,7 +227,7 @@ class ROIParser:
             created_date = datetime.now().strftime('%Y-%m-%d')
             
             # 7. Формируем описание (используем заголовок как краткое описание)
-            description = f"{title}. Количество голосов: {votes_text}"
+            description = f"{title}. Количество голосов: {votes}"
             
             return {
                 'external_id': initiative_id,
@@ -170,8 +236,8 @@ class ROIParser:
                 'url': url,
                 'category': category,
                 'level': level,
-                'votes': votes_text,          # Голоса ЗА из списка
-                'anti_votes': '0',            # Голоса ПРОТИВ (будет уточнено на детальной странице)
+                'votes': votes,               # Голоса ЗА из списка
+                'anti_votes': 0,              # Голоса ПРОТИВ (будет уточнено на детальной странице)
                 'created_date': created_date,
                 'parsed_at': datetime.now().isoformat(),
                 'source': 'roi.ru'
@@ -253,161 +319,15 @@ class ROIParser:
         Парсинг детальной страницы инициативы
         """
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            # Бюджет запросов и повторы - в транспорте
+            content = self.transport.get(url)
 
             # Сохраним HTML для отладки
-            # with open('debug_page.html', 'w', encoding='utf-8') as f:
-            #     f.write(response.text)
+            # with open('debug_page.html', 'wb') as f:
+            #     f.write(content)
             # self.logger.info("HTML страницы сохранен в debug_page.html")
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            details = {
-                'full_text': '',
-                'proposal_text': '',
-                'result_text': '',
-                'end_date': '',
-                'author': '',
-                'status': 'на голосовании',
-                'votes': '0',
-                'anti_votes': '0',
-                'views': '0',
-                'comments': '0'
-            }
-            
-            # 1. Ищем основной блок с текстом инициативы
-            # В HTML видно, что текст в блоке с классом 'block petition-text-block'
-            text_block = soup.find('div', class_='block petition-text-block')
-            if text_block:
-                # Ищем все параграфы внутри этого блока
-                paragraphs = text_block.find_all('p')
-                if paragraphs:
-                    full_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-                    if full_text:
-                        details['full_text'] = full_text[:5000]  # Ограничиваем длину
-                else:
-                    # Если нет <p>, ищем текстовые узлы напрямую
-                    text_elements = text_block.find_all('div', class_='paragraph-transform')
-                    if text_elements:
-                        full_text = ' '.join([elem.get_text(strip=True) for elem in text_elements])
-                        if full_text:
-                            details['full_text'] = full_text[:5000]
-            
-            # 2. Ищем "Практический результат"
-            # Ищем заголовок h2 с текстом "Практический результат"
-            for h2 in soup.find_all('h2'):
-                if h2.get_text(strip=True) == 'Практический результат':
-                    # Ищем следующий элемент с текстом
-                    next_elem = h2.find_next('div', class_='paragraph-transform')
-                    if next_elem:
-                        details['result_text'] = next_elem.get_text(strip=True)
-                    break
-            
-            # 3. Ищем "Решение"
-            for h2 in soup.find_all('h2'):
-                if h2.get_text(strip=True) == 'Решение':
-                    # Ищем все блоки решений
-                    decision_items = h2.find_next('div', class_='decision-item')
-                    if decision_items:
-                        decision_texts = []
-                        # Ищем все параграфы в блоке решения
-                        decision_paragraphs = decision_items.find_all('div', class_='paragraph-transform')
-                        for p in decision_paragraphs:
-                            decision_texts.append(p.get_text(strip=True))
-                        
-                        if decision_texts:
-                            details['proposal_text'] = '\n'.join(decision_texts)
-                    break
-            
-            # 4. Ищем дату окончания голосования в правой колонке
-            aside_block = soup.find('aside', class_='col-right')
-            if aside_block:
-                # Ищем блок с классом 'inic-side-info'
-                side_info = aside_block.find('div', class_='inic-side-info')
-                if side_info:
-                    # Ищем заголовок "Голосование закончится"
-                    for div in side_info.find_all('div', class_='title'):
-                        if 'Голосование закончится' in div.get_text():
-                            # Следующий div с классом 'date' содержит дату
-                            date_div = div.find_next('div', class_='date')
-                            if date_div:
-                                date_text = date_div.get_text(strip=True)
-                                try:
-                                    # Пробуем разные форматы даты
-                                    for fmt in ['%d-%m-%Y', '%Y-%m-%d', '%d.%m.%Y']:
-                                        try:
-                                            end_date = datetime.strptime(date_text, fmt).strftime('%Y-%m-%d')
-                                            details['end_date'] = end_date
-                                            break
-                                        except:
-                                            continue
-                                except:
-                                    details['end_date'] = date_text
-            
-            # 5. Ищем автора
-            author_div = soup.find('div', class_='author')
-            if author_div:
-                author_text = author_div.get_text(strip=True)
-                details['author'] = author_text
-            
-            # 7. Ищем голоса ЗА и ПРОТИВ в правой колонке
-            aside_block = soup.find('aside', class_='col-right')
-            if aside_block:
-                # Ищем блок с информацией об инициативе
-                inic_info = aside_block.find('div', class_='inic-side-info')
-                if inic_info:
-                    # Ищем голоса ЗА
-                    for div in inic_info.find_all('div', class_='voting-solution'):
-                        # Проверяем текст внутри div
-                        div_text = div.get_text(strip=True)
-                        
-                        # Голоса ЗА
-                        if 'За инициативу подано:' in div_text:
-                            vote_elem = div.find('b', class_='js-voting-info-affirmative')
-                            if vote_elem:
-                                votes_text = vote_elem.get_text(strip=True)
-                                # Извлекаем только цифры
-                                votes_num = ''.join(filter(str.isdigit, votes_text))
-                                details['votes'] = votes_num if votes_num else '0'
-                        
-                        # Голоса ПРОТИВ
-                        elif 'Против инициативы подано:' in div_text:
-                            vote_elem = div.find('b', class_='js-voting-info-negative')
-                            if vote_elem:
-                                anti_votes_text = vote_elem.get_text(strip=True)
-                                # Извлекаем только цифры
-                                anti_votes_num = ''.join(filter(str.isdigit, anti_votes_text))
-                                details['anti_votes'] = anti_votes_num if anti_votes_num else '0'
-            
-            # Альтернативный поиск голосов ПРОТИВ в основном блоке
-            if details['anti_votes'] == '0':
-                # Ищем блок с классом 'voting-solution' и текстом "Против"
-                for div in soup.find_all('div', class_='voting-solution'):
-                    if 'Против инициативы подано:' in div.get_text():
-                        negative_elem = div.find('b', class_='js-voting-info-negative')
-                        if negative_elem:
-                            anti_votes_text = negative_elem.get_text(strip=True)
-                            anti_votes_num = ''.join(filter(str.isdigit, anti_votes_text))
-                            details['anti_votes'] = anti_votes_num if anti_votes_num else '0'
-                        break
-            
-            # 8. Также обновим голоса ЗА из списка, если они есть
-            if details['votes'] == '0':
-                # Ищем голоса в основном блоке
-                vote_elem = soup.find('b', class_='js-voting-info-affirmative')
-                if vote_elem:
-                    votes_text = vote_elem.get_text(strip=True)
-                    votes_num = ''.join(filter(str.isdigit, votes_text))
-                    details['votes'] = votes_num if votes_num else '0'
-            
-            self.logger.info(f"Для URL {url}:")
-            self.logger.info(f"  Голоса ЗА: {details['votes']}")
-            self.logger.info(f"  Голоса ПРОТИВ: {details['anti_votes']}")
-            self.logger.info(f"  Найден полный текст: {len(details['full_text'])} символов")
-            self.logger.info(f"  Дата окончания: {details['end_date']}")
-            
-            return details
+            return self._details_from_content(content, url)
             
         except Exception as e:
             self.logger.error(f"Ошибка парсинга деталей {url}: {e}")
@@ -415,13 +335,195 @@ class ROIParser:
             traceback.print_exc()
             return {}
     
-    def get_initiatives_with_details(self, max_initiatives=20):
+    def _details_from_content(self, content, url):
+        """Разбор загруженной детальной страницы"""
+        soup = self._make_soup(content, 'detail')
+        details = self._parse_details_page(soup, url)
+        
+        # Голосование завершено - страница больше не меняется, храним ее долго
+        if self.http_cache is not None and details['end_date'] \
+                and details['end_date'] < datetime.now().strftime('%Y-%m-%d'):
+            self.http_cache.set_ttl(url, CLOSED_INITIATIVE_TTL)
+        
+        return details
+    
+    def _parse_details_page(self, soup, url):
+        """
+        Извлечение полей из детальной страницы инициативы.
+        Документ обходится один раз: каждый элемент сразу проверяется на все
+        нужные признаки, а поиск блока, следующего за заголовком
+        ("Практический результат", "Решение", "Голосование закончится"),
+        сводится к флагу ожидания этого блока.
+        """
+        details = {
+            'full_text': '',
+            'proposal_text': '',
+            'result_text': '',
+            'end_date': '',
+            'author': '',
+            'status': 'на голосовании',
+            'votes': 0,
+            'anti_votes': 0,
+            'views': 0,
+            'comments': 0
+        }
+        
+        text_block = None           # div.block.petition-text-block
+        author_div = None           # div.author
+        aside_block = None          # aside.col-right
+        side_info = None            # div.inic-side-info внутри aside_block
+        first_affirmative = None    # первый b.js-voting-info-affirmative на странице
+        negative_solution = None    # первый div.voting-solution с голосами ПРОТИВ
+        result_heading_seen = False
+        decision_heading_seen = False
+        wait_result = False         # ждем div.paragraph-transform после заголовка
+        wait_decision = False       # ждем div.decision-item после заголовка
+        wait_date = False           # ждем div.date после "Голосование закончится"
+        
+        for tag in soup.descendants:
+            name = tag.name
+            if name is None:
+                continue
+            classes = tag.get('class') or ()
+            
+            if name == 'div' and classes:
+                # 2. Текст после заголовка "Практический результат"
+                if wait_result and 'paragraph-transform' in classes:
+                    details['result_text'] = tag.get_text(strip=True)
+                    wait_result = False
+                
+                # 3. Блок решения после заголовка "Решение"
+                if wait_decision and 'decision-item' in classes:
+                    decision_texts = [p.get_text(strip=True)
+                                      for p in tag.find_all('div', class_='paragraph-transform')]
+                    if decision_texts:
+                        details['proposal_text'] = '\n'.join(decision_texts)
+                    wait_decision = False
+                
+                # 4. Дата после заголовка "Голосование закончится"
+                if wait_date and 'date' in classes:
+                    date_text = tag.get_text(strip=True)
+                    # Пробуем разные форматы даты
+                    for fmt in ['%d-%m-%Y', '%Y-%m-%d', '%d.%m.%Y']:
+                        try:
+                            details['end_date'] = datetime.strptime(date_text, fmt).strftime('%Y-%m-%d')
+                            break
+                        except ValueError:
+                            continue
+                    wait_date = False
+                
+                # 1. Основной блок с текстом инициативы
+                if text_block is None and ' '.join(classes) == 'block petition-text-block':
+                    text_block = tag
+                
+                # 5. Автор
+                if author_div is None and 'author' in classes:
+                    author_div = tag
+                
+                if 'voting-solution' in classes:
+                    # 7. Голоса ЗА и ПРОТИВ в правой колонке
+                    if side_info is not None and self._is_inside(tag, side_info):
+                        self._read_side_votes(tag, details)
+                    # Запасной вариант для голосов ПРОТИВ - первый такой блок на странице
+                    if negative_solution is None and 'Против инициативы подано:' in tag.get_text():
+                        negative_solution = tag
+                
+                if 'title' in classes and side_info is not None and self._is_inside(tag, side_info):
+                    if 'Голосование закончится' in tag.get_text():
+                        wait_date = True
+                
+                if side_info is None and aside_block is not None and 'inic-side-info' in classes \
+                        and self._is_inside(tag, aside_block):
+                    side_info = tag
+            
+            elif name == 'h2':
+                if not result_heading_seen or not decision_heading_seen:
+                    heading = tag.get_text(strip=True)
+                    if heading == 'Практический результат' and not result_heading_seen:
+                        result_heading_seen = True
+                        wait_result = True
+                    elif heading == 'Решение' and not decision_heading_seen:
+                        decision_heading_seen = True
+                        wait_decision = True
+            
+            elif name == 'aside':
+                if aside_block is None and 'col-right' in classes:
+                    aside_block = tag
+            
+            elif name == 'b':
+                if first_affirmative is None and 'js-voting-info-affirmative' in classes:
+                    first_affirmative = tag
+        
+        # 1. Полный текст: параграфы, а если их нет - блоки paragraph-transform
+        if text_block is not None:
+            paragraphs = text_block.find_all('p')
+            if paragraphs:
+                full_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
+            else:
+                full_text = ' '.join([elem.get_text(strip=True)
+                                      for elem in text_block.find_all('div', class_='paragraph-transform')])
+            if full_text:
+                details['full_text'] = full_text[:5000]  # Ограничиваем длину
+        
+        if author_div is not None:
+            details['author'] = author_div.get_text(strip=True)
+        
+        # Альтернативный поиск голосов ПРОТИВ в основном блоке
+        if details['anti_votes'] == 0 and negative_solution is not None:
+            negative_elem = negative_solution.find('b', class_='js-voting-info-negative')
+            if negative_elem:
+                details['anti_votes'] = self._digits(negative_elem)
+        
+        # 8. Голоса ЗА из основного блока, если в правой колонке их не было
+        if details['votes'] == 0 and first_affirmative is not None:
+            details['votes'] = self._digits(first_affirmative)
+        
+        self.logger.info(f"Для URL {url}:")
+        self.logger.info(f"  Голоса ЗА: {details['votes']}")
+        self.logger.info(f"  Голоса ПРОТИВ: {details['anti_votes']}")
+        self.logger.info(f"  Найден полный текст: {len(details['full_text'])} символов")
+        self.logger.info(f"  Дата окончания: {details['end_date']}")
+        
+        return details
+    
+    def _read_side_votes(self, div, details):
+        """Голоса из блока div.voting-solution правой колонки"""
+        div_text = div.get_text(strip=True)
+        
+        # Голоса ЗА
+        if 'За инициативу подано:' in div_text:
+            vote_elem = div.find('b', class_='js-voting-info-affirmative')
+            if vote_elem:
+                details['votes'] = self._digits(vote_elem)
+        
+        # Голоса ПРОТИВ
+        elif 'Против инициативы подано:' in div_text:
+            vote_elem = div.find('b', class_='js-voting-info-negative')
+            if vote_elem:
+                details['anti_votes'] = self._digits(vote_elem)
+    
+    @staticmethod
+    def _digits(elem):
+        """Число из текста элемента (только цифры), 0 если цифр нет"""
+        number = ''.join(filter(str.isdigit, elem.get_text(strip=True)))
+        return int(number) if number else 0
+    
+    @staticmethod
+    def _is_inside(tag, ancestor):
+        """Находится ли tag внутри ancestor"""
+        return any(parent is ancestor for parent in tag.parents)
+    
+    def get_initiatives_with_details(self, max_initiatives=20, max_workers=4, start_url=None):
         """
         Получение инициатив с детальной информацией
+        Args:
+            max_initiatives: сколько инициатив дополнить деталями
+            max_workers: количество параллельных загрузок детальных страниц
+            start_url: страница списка (если None, используем self.federal_url)
         """
         try:
             # Получаем список инициатив
-            initiatives = self.parse_federal_initiatives(max_pages=1)
+            initiatives = self.parse_federal_initiatives(start_url=start_url, max_pages=1)
             
             if not initiatives:
                 self.logger.warning("Не удалось получить инициативы")
@@ -430,40 +532,139 @@ class ROIParser:
             # Ограничиваем количество
             initiatives = initiatives[:max_initiatives]
             
-            # Для каждой инициативы получаем детальную информацию
-            for i, initiative in enumerate(initiatives, 1):
-                self.logger.info(f"Получение деталей инициативы {i}/{len(initiatives)}: {initiative['title'][:50]}...")
-                
-                details = self.parse_initiative_details(initiative['url'])
-                initiative.update(details)
-                
-                # Задержка между запросами
-                if i < len(initiatives):
-                    time.sleep(1)
-            
-            return initiatives
+            return self.fetch_details_concurrently(initiatives, max_workers=max_workers)
             
         except Exception as e:
             self.logger.error(f"Ошибка при получении инициатив с деталями: {e}")
             return []
 
-    def save_to_json(self, initiatives, filename=None):
-        """Сохранение инициатив в JSON файл"""
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"exports/federal_initiatives_{timestamp}.json"
+    def fetch_details_concurrently(self, initiatives, max_workers=4):
+        """
+        Параллельная загрузка детальных страниц.
+        Частота запросов ограничивается транспортом, порядок инициатив сохраняется.
+        Ошибка на одной странице не влияет на остальные.
+        Args:
+            initiatives: список инициатив (словари с ключом 'url')
+            max_workers: количество потоков
+        Returns:
+            list: те же инициативы, дополненные деталями
+        """
+        total = len(initiatives)
+        
+        def fetch(index, initiative):
+            self.logger.info(f"Получение деталей инициативы {index}/{total}: {initiative['title'][:50]}...")
+            return self.parse_initiative_details(initiative['url'])
         
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(fetch, i, initiative)
+                for i, initiative in enumerate(initiatives, 1)
+            ]
+            
+            for initiative, future in zip(initiatives, futures):
+                try:
+                    details = future.result()
+                except Exception as e:
+                    self.logger.error(f"Ошибка загрузки деталей {initiative.get('url')}: {e}")
+                    details = {}
+                initiative.update(details)
+        
+        return initiatives
+
+    def iter_with_details(self, initiatives, max_workers=4, needs_details=None):
+        """
+        Потоковая загрузка деталей: инициативы поступают из генератора
+        (например, iter_federal_initiatives), детали качаются параллельно,
+        результат отдается в исходном порядке, как только готов.
+        Args:
+            initiatives: итерируемый источник инициатив
+            max_workers: количество потоков
+            needs_details: функция initiative -> bool; если вернула False,
+                детальная страница не загружается
+        Yields:
+            tuple: (initiative, details), details = None если загрузка не требовалась
+        """
+        workers = max(1, max_workers)
+        pending = deque()
+        
+        def ready():
+            future = pending[0][1]
+            return future is None or future.done()
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for initiative in initiatives:
+                    if needs_details is None or needs_details(initiative):
+                        future = executor.submit(self.parse_initiative_details, initiative['url'])
+                    else:
+                        future = None
+                    pending.append((initiative, future))
+                    
+                    # Отдаем готовые результаты сразу, а при переполнении окна ждем самый старый
+                    while pending and (ready() or len(pending) > workers * 2):
+                        yield self._pop_details(pending)
+                
+                while pending:
+                    yield self._pop_details(pending)
+            finally:
+                # Если потребитель остановил обход, еще не начатые загрузки не нужны
+                for _, future in pending:
+                    if future is not None:
+                        future.cancel()
+    
+    def _pop_details(self, pending):
+        """Ожидание результата первой инициативы в очереди"""
+        initiative, future = pending.popleft()
+        if future is None:
+            return initiative, None
+        try:
+            details = future.result()
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки деталей {initiative.get('url')}: {e}")
+            details = {}
+        return initiative, details
+
+    def crawl_listings(self, start_urls, max_pages=3, with_details=False, max_workers=20):
+        """
+        Обход нескольких списков одним процессом через асинхронный движок.
+        Синхронная обертка над AsyncROIParser.acrawl_listings (нужен aiohttp).
+        """
+        import asyncio
+        from async_parser import AsyncROIParser
+        
+        async def run():
+            async with AsyncROIParser(base_url=self.base_url,
+                                      requests_per_second=self.rate_limiter.rate,
+                                      html_features=self.html_features,
+                                      selective_parsing=self.selective_parsing) as parser:
+                return await parser.acrawl_listings(start_urls, max_pages=max_pages,
+                                                    with_details=with_details,
+                                                    max_workers=max_workers)
+        
+        return asyncio.run(run())
+
+    def save_to_json(self, initiatives, filename=None):
+        """
+        Сохранение инициатив: в файл filename или, если он не задан,
+        в архив загрузок (archive.py; дописываются только изменения)
+        Returns:
+            путь к файлу или каталогу архива, None при ошибке
+        """
         try:
-            import json
-            import os
+            if filename is None:
+                from archive import Archive
+                with Archive() as archive:
+                    result = archive.append(initiatives)
+                self.logger.info(f"Архив {archive.archive_dir}: новых {result.added}, "
+                                 f"изменилось {result.changed}, без изменений {result.unchanged}")
+                return archive.archive_dir
             
-            # Создаем папку, если ее нет
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            from exporter import write_records
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(initiatives, f, ensure_ascii=False, indent=2)
+            # Формат по расширению (.json, .jsonl, .csv, можно .gz), запись порциями
+            written = write_records(initiatives, filename)
             
-            self.logger.info(f"Инициативы сохранены в {filename}")
+            self.logger.info(f"Сохранено {written} инициатив в {filename}")
             return filename
             
         except Exception as e:
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Полнотекстовый поиск по инициативам (FTS5-таблица initiatives_fts)
+
+Индекс по title, full_text, proposal_text и result_text ведут триггеры
+таблицы initiatives (миграция 6). Русского стеммера в SQLite нет, поэтому
+слова запроса приводятся к основе здесь (отбрасывается окончание) и ищутся
+как префикс: «налога» находит «налог», «налогов», «налоговый».
+Буква ё в индексе и в запросе заменяется на е.
+"""
+
+import re
+
+# Вес колонок в bm25: совпадение в заголовке важнее совпадения в тексте
+RANK_WEIGHTS = 'bm25(10.0, 1.0, 3.0, 2.0)'
+
+# Таблица инициатив вместе с индексом - для запросов с MATCH, rank и snippet
+FTS_JOIN = 'initiatives JOIN initiatives_fts ON initiatives_fts.rowid = initiatives.id'
+
+# Фрагмент текста с найденными словами (выделены <b>) из любой колонки индекса
+SNIPPET_SQL = "snippet(initiatives_fts, -1, '<b>', '</b>', '…', 16)"
+
+# Окончания в порядке убывания длины: первое подошедшее отбрасывается
+_ENDINGS = sorted({
+    # прилагательные и причастия
+    'ейшими', 'ейшего', 'ейшему', 'ующего', 'ующему', 'ующими',
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'ый', 'ий', 'ой', 'ую', 'юю', 'ых', 'их', 'ым', 'им', 'ом', 'ем', 'ою', 'ею',
+    # существительные
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'иям', 'ям', 'ам', 'ием', 'ией', 'ей',
+    'ов', 'ев', 'ия', 'ья', 'ие', 'ье', 'ии', 'ию', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+    # глаголы
+    'ировать', 'ировали', 'ировал', 'ует', 'уют', 'ать', 'ять', 'ить', 'еть', 'ыть',
+    'ает', 'яет', 'ают', 'яют', 'ила', 'ыла', 'ало', 'или', 'ыли', 'али', 'ть',
+}, key=len, reverse=True)
+
+# Основа не короче этого - иначе слово остается как есть
+_MIN_STEM = 3
+
+_WORD = re.compile(r'\w+')
+_CYRILLIC = re.compile('[а-я]')
+
+
+def normalize(text):
+    """Нижний регистр и ё -> е (так текст попадает в индекс)"""
+    return text.lower().replace('ё', 'е')
+
+
+def stem(word):
+    """Основа русского слова: отбрасываются возвратная частица и одно окончание"""
+    word = normalize(word)
+    if not _CYRILLIC.search(word) or len(word) <= _MIN_STEM + 1:
+        return word
+    for particle in ('ся', 'сь'):
+        if word.endswith(particle) and len(word) - 2 > _MIN_STEM:
+            word = word[:-2]
+            break
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match(text):
+    """
+    Запрос FTS5 из строки поиска: каждое слово - префикс своей основы, все слова обязательны
+    Returns:
+        строка для MATCH или None, если в тексте нет слов
+    """
+    # Однобуквенный префикс совпадает почти со всем - такие слова пропускаются
+    terms = [f'"{stem(word)}"*' for word in _WORD.findall(text or '') if len(word) > 1]
+    return ' '.join(terms) if terms else None
+
+
+def search(conn, text, limit=50, where_sql='1=1', params=()):
+    """
+    Инициативы по релевантности (bm25)
+    Args:
+        where_sql, params: дополнительное условие по таблице initiatives
+    Returns:
+        список (id, title, votes, фрагмент с выделенными словами)
+    """
+    match = build_match(text)
+    if match is None:
+        return []
+    return conn.execute(f'''
+        SELECT initiatives.id, initiatives.title, initiatives.votes, {SNIPPET_SQL}
+        FROM {FTS_JOIN}
+        WHERE initiatives_fts MATCH ? AND ({where_sql})
+        ORDER BY rank
+        LIMIT ?
+    ''', [match] + list(params) + [limit]).fetchall()
+
+
+def snippets(conn, match, ids):
+    """
+    Фрагменты с найденными словами для выбранных инициатив.
+    snippet() перечитывает текст, поэтому считается только для показываемых строк,
+    а не для всех найденных.
+    Returns:
+        dict id -> фрагмент
+    """
+    result = {}
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        result.update(conn.execute(f'''
+            SELECT rowid, {SNIPPET_SQL} FROM initiatives_fts
+            WHERE initiatives_fts MATCH ? AND rowid IN ({placeholders})
+        ''', [match] + chunk))
+    return result
+
+
+def rebuild_index(conn):
+    """Заполнить индекс заново по таблице initiatives (после ручной правки БД)"""
+    conn.execute("INSERT INTO initiatives_fts (initiatives_fts) VALUES ('delete-all')")
+    conn.execute(f'''
+        INSERT INTO initiatives_fts (rowid, title, full_text, proposal_text, result_text)
+        SELECT id, {fold_sql('title')}, {fold_sql('full_text')},
+               {fold_sql('proposal_text')}, {fold_sql('result_text')}
+        FROM initiatives
+    ''')
+
+
+def fold_sql(column):
+    """SQL-выражение: колонка с ё, замененной на е (как в индексе)"""
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+История голосов инициатив (таблица initiative_snapshots)
+
+Снимки пишут триггеры таблицы initiatives (миграция 4) - только при изменении
+votes/anti_votes. Время снимка - секунды unix.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+# Порог голосов, после которого федеральная инициатива уходит на рассмотрение
+FEDERAL_THRESHOLD = 100000
+
+
+def history(conn, initiative_id, since=None):
+    """
+    Снимки голосов инициативы по времени
+    Args:
+        since: datetime или секунды unix, с какого момента (по умолчанию вся история)
+    Returns:
+        список (datetime, votes, anti_votes)
+    """
+    rows = conn.execute('''
+        SELECT taken_at, votes, anti_votes FROM initiative_snapshots
+        WHERE initiative_id = ? AND taken_at >= ?
+        ORDER BY taken_at
+    ''', (initiative_id, _timestamp(since) if since is not None else 0))
+    return [(datetime.fromtimestamp(taken_at), votes, anti_votes) for taken_at, votes, anti_votes in rows]
+
+
+def votes_at(conn, initiative_id, moment):
+    """Голоса ЗА на момент времени (последний снимок не позже moment), None если снимков нет"""
+    row = conn.execute('''
+        SELECT votes FROM initiative_snapshots
+        WHERE initiative_id = ? AND taken_at <= ?
+        ORDER BY taken_at DESC LIMIT 1
+    ''', (initiative_id, _timestamp(moment))).fetchone()
+    return row[0] if row else None
+
+
+def vote_velocity(conn, initiative_id, window_hours=24):
+    """
+    Скорость набора голосов ЗА за окно, голосов в час
+    Returns:
+        float или None, если в окне меньше двух точек
+    """
+    now = int(time.time())
+    since = now - int(window_hours * 3600)
+
+    # Точка отсчета - последний снимок до начала окна, иначе первый внутри окна
+    start = conn.execute('''
+        SELECT taken_at, votes FROM initiative_snapshots
+        WHERE initiative_id = ? AND taken_at <= ?
+        ORDER BY taken_at DESC LIMIT 1
+    ''', (initiative_id, since)).fetchone()
+    if start is None:
+        start = conn.execute('''
+            SELECT taken_at, votes FROM initiative_snapshots
+            WHERE initiative_id = ? ORDER BY taken_at LIMIT 1
+        ''', (initiative_id,)).fetchone()
+    end = conn.execute('''
+        SELECT taken_at, votes FROM initiative_snapshots
+        WHERE initiative_id = ? ORDER BY taken_at DESC LIMIT 1
+    ''', (initiative_id,)).fetchone()
+
+    if start is None or end is None or end[0] <= start[0]:
+        return None
+    # Без нового снимка счетчик не менялся, поэтому интервал - до текущего момента
+    elapsed = max(now, end[0]) - start[0]
+    return (end[1] - start[1]) / (elapsed / 3600.0)
+
+
+def trending(conn, window_hours=24, limit=10):
+    """
+    Инициативы, набравшие больше всего голосов ЗА за окно
+    Returns:
+        список (id, title, votes, прирост за окно)
+    """
+    since = int(time.time()) - int(window_hours * 3600)
+    # Для каждой инициативы - один поиск по первичному ключу снимков
+    return conn.execute('''
+        SELECT id, title, votes, votes - COALESCE(
+            (SELECT s.votes FROM initiative_snapshots s
+             WHERE s.initiative_id = i.id AND s.taken_at <= ?
+             ORDER BY s.taken_at DESC LIMIT 1),
+            (SELECT s.votes FROM initiative_snapshots s
+             WHERE s.initiative_id = i.id
+             ORDER BY s.taken_at LIMIT 1),
+            votes) AS gain
+        FROM initiatives i
+        ORDER BY gain DESC, votes DESC
+        LIMIT ?
+    ''', (since, limit)).fetchall()
+
+
+def time_to_threshold(conn, initiative_id, threshold=FEDERAL_THRESHOLD, window_hours=24):
+    """
+    Прогноз, когда инициатива наберет threshold голосов при текущей скорости
+    Returns:
+        timedelta (нулевой, если порог уже пройден) или None, если голоса не растут
+    """
+    row = conn.execute('SELECT votes FROM initiatives WHERE id = ?', (initiative_id,)).fetchone()
+    if row is None:
+        return None
+    if row[0] >= threshold:
+        return timedelta(0)
+
+    velocity = vote_velocity(conn, initiative_id, window_hours)
+    if not velocity or velocity <= 0:
+        return None
+    return timedelta(hours=(threshold - row[0]) / velocity)
+
+
+def _timestamp(moment):
+    if isinstance(moment, datetime):
+        return int(moment.timestamp())
+    return int(moment)
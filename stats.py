@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Статистика инициатив для консоли и окон
+
+Счетчики по статусу, голосу и уровню хранит таблица initiative_counters -
+их обновляют триггеры таблицы initiatives (миграция 5), поэтому голосование
+или новая инициатива меняют пару строк, а чтение статистики - это один
+маленький запрос вместо COUNT(*) по всей таблице. compute_stats считает то
+же самое одним сгруппированным проходом и служит для сверки и восстановления.
+"""
+
+FEDERAL_LEVEL = 'Федеральный'
+
+# Одним проходом по таблице - все счетчики панели статистики
+STATS_SQL = '''
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(status = 'new'), 0),
+        COALESCE(SUM(status = 'voted'), 0),
+        COALESCE(SUM(status = 'ignored'), 0),
+        COALESCE(SUM(vote = 'for'), 0),
+        COALESCE(SUM(vote = 'against'), 0),
+        COALESCE(SUM(vote = 'ignore'), 0),
+        COALESCE(SUM(level = ?), 0)
+    FROM initiatives
+'''
+STATS_KEYS = ('total', 'new', 'voted', 'ignored', 'for', 'against', 'ignore', 'federal')
+
+# Какому счетчику initiative_counters соответствует ключ статистики
+COUNTER_KEYS = {
+    'total': ('total', ''),
+    'new': ('status', 'new'),
+    'voted': ('status', 'voted'),
+    'ignored': ('status', 'ignored'),
+    'for': ('vote', 'for'),
+    'against': ('vote', 'against'),
+    'ignore': ('vote', 'ignore'),
+    'federal': ('level', FEDERAL_LEVEL),
+}
+
+
+def compute_stats(conn):
+    """Все счетчики одним сгруппированным запросом по таблице initiatives"""
+    row = conn.execute(STATS_SQL, (FEDERAL_LEVEL,)).fetchone()
+    return dict(zip(STATS_KEYS, row))
+
+
+def rebuild_counters(conn):
+    """Пересчитать initiative_counters по таблице initiatives (после сбоя или ручной правки БД)"""
+    conn.execute('DELETE FROM initiative_counters')
+    conn.execute("INSERT INTO initiative_counters (kind, key, count) SELECT 'total', '', COUNT(*) FROM initiatives")
+    for column in ('status', 'vote', 'level'):
+        conn.execute(f'''
+            INSERT INTO initiative_counters (kind, key, count)
+            SELECT '{column}', COALESCE({column}, ''), COUNT(*) FROM initiatives
+            GROUP BY COALESCE({column}, '')
+        ''')
+
+
+def get_stats(conn):
+    """
+    Статистика для панелей и меню
+    Returns:
+        dict: total, new, voted, ignored, for, against, ignore, federal - из счетчиков;
+        week, today - добавлено за 7 дней и за сегодня (поиск по индексу added_date)
+    """
+    counters = {(kind, key): count for kind, key, count in
+                conn.execute('SELECT kind, key, count FROM initiative_counters')}
+    stats = {name: counters.get(counter, 0) for name, counter in COUNTER_KEYS.items()}
+
+    week, today = conn.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM initiatives WHERE added_date >= date('now', '-6 days')),
+            (SELECT COUNT(*) FROM initiatives WHERE added_date >= date('now'))
+    ''').fetchone()
+    stats['week'] = week
+    stats['today'] = today
+    return stats
+
+
+def main():
+    """Сверка счетчиков с таблицей: python stats.py [db] [--rebuild]"""
+    import sys
+    from database import connect, DEFAULT_DB_PATH
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    conn = connect(args[0] if args else DEFAULT_DB_PATH)
+
+    if '--rebuild' in sys.argv:
+        with conn:
+            rebuild_counters(conn)
+        print("Счетчики пересчитаны")
+
+    actual = compute_stats(conn)
+    stored = get_stats(conn)
+    mismatched = False
+    for key in STATS_KEYS:
+        mark = '' if stored[key] == actual[key] else '  <- расходится'
+        mismatched = mismatched or bool(mark)
+        print(f"{key:10} {stored[key]:>8} {actual[key]:>8}{mark}")
+    if mismatched:
+        print("Запустите с --rebuild, чтобы пересчитать счетчики")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Транспортный слой парсера: загрузка страниц roi.ru
+
+Все загрузки идут через транспорт, поэтому здесь же общие для всех путей
+бюджет запросов (HostRateLimiter), число одновременных запросов
+(AdaptiveConcurrency) и повторы при 429/5xx и сетевых ошибках.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from collections import namedtuple
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Ответы, после которых запрос стоит повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Ответы, означающие перегрузку сервера (для AdaptiveConcurrency)
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+# Если сервер просит ждать дольше, повтор не делается
+RETRY_AFTER_MAX = 600
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(namedtuple('RetryPolicy', 'max_retries backoff backoff_max statuses')):
+    """
+    Повторы запросов
+    Args:
+        max_retries: сколько раз повторять после первой неудачи
+        backoff: пауза перед первым повтором (секунды), дальше удваивается
+        backoff_max: предел паузы
+        statuses: коды ответа, после которых запрос повторяется
+    """
+    __slots__ = ()
+
+    def __new__(cls, max_retries=4, backoff=1.0, backoff_max=60.0, statuses=RETRY_STATUSES):
+        return super().__new__(cls, max_retries, backoff, backoff_max, frozenset(statuses))
+
+    def delay(self, attempt, retry_after=None):
+        """Пауза перед повтором номер attempt (с 0): экспонента со случайным разбросом, не меньше Retry-After"""
+        # Полный разброс: потоки, получившие ошибку одновременно, не повторяют запрос хором
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value):
+    """Retry-After в секундах (заголовок - число секунд или HTTP-дата), None если его нет"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestsTransport:
+    """
+    Синхронный транспорт поверх requests.Session.
+    Страницы, которые CachedSession отдаст из кэша, не ждут ни бюджета, ни
+    свободного места среди одновременных запросов.
+    """
+
+    def __init__(self, session, timeout=30, rate_limits=None, concurrency=None, retry=None):
+        """
+        Args:
+            rate_limits: HostRateLimiter - бюджет запросов на хост
+            concurrency: AdaptiveConcurrency - число одновременных запросов
+            retry: RetryPolicy (None - политика по умолчанию)
+        """
+        self.session = session
+        self.timeout = timeout
+        self.rate_limits = rate_limits
+        self.concurrency = concurrency
+        self.retry = retry if retry is not None else RetryPolicy()
+
+    def _is_fresh(self, url):
+        is_fresh = getattr(self.session, 'is_fresh', None)
+        return is_fresh is not None and is_fresh(url)
+
+    def get(self, url):
+        """Загрузка страницы с повторами, возвращает тело ответа (bytes)"""
+        if self._is_fresh(url):
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+
+        attempt = 0
+        while True:
+            response, error = self._request(url)
+            if response is not None and response.status_code not in self.retry.statuses:
+                response.raise_for_status()
+                return response.content
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            if attempt >= self.retry.max_retries or (retry_after or 0) > RETRY_AFTER_MAX:
+                if response is not None:
+                    response.raise_for_status()
+                raise error
+
+            if retry_after is not None and self.rate_limits is not None:
+                # Сервер попросил подождать - ждут все потоки, а не только этот
+                self.rate_limits.pause(url, retry_after)
+            delay = self.retry.delay(attempt, retry_after)
+            reason = response.status_code if response is not None else error
+            logger.warning(f"Повтор {attempt + 1}/{self.retry.max_retries} через {delay:.1f} с ({reason}): {url}")
+            time.sleep(delay)
+            attempt += 1
+
+    def _request(self, url):
+        """Одна попытка: (ответ, None) или (None, исключение) для сетевых ошибок"""
+        if self.rate_limits is not None:
+            self.rate_limits.acquire(url)
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        latency = None
+        overloaded = False
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            latency = time.monotonic() - started
+            overloaded = response.status_code in OVERLOAD_STATUSES
+            return response, None
+        except (requests.Timeout, requests.ConnectionError) as e:
+            overloaded = isinstance(e, requests.Timeout)
+            return None, e
+        finally:
+            if self.concurrency is not None:
+                self.concurrency.release(latency, overloaded)
+
+    def close(self):
+        self.session.close()
+
+
+class AiohttpTransport:
+    """
+    Асинхронный транспорт на aiohttp.
+    Все запросы идут через один ClientSession, то есть через один пул соединений.
+    Бюджет запросов и число одновременных запросов - те же объекты, что у
+    RequestsTransport; лимиты TCPConnector - только верхняя граница.
+    """
+
+    def __init__(self, headers=None, max_connections=20, max_per_host=8, timeout=30,
+                 rate_limits=None, concurrency=None, retry=None):
+        """
+        Args:
+            rate_limits: HostRateLimiter - бюджет запросов на хост
+            concurrency: AdaptiveConcurrency - число одновременных запросов
+            retry: RetryPolicy (None - политика по умолчанию)
+        """
+        if aiohttp is None:
+            raise ImportError("Для асинхронного режима установите: pip install aiohttp")
+
+        self.headers = dict(headers or {})
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.rate_limits = rate_limits
+        self.concurrency = concurrency
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.session = None
+
+    async def open(self):
+        """Создание общего пула соединений (вызывается внутри работающего event loop)"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             limit_per_host=self.max_per_host)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self
+
+    async def get(self, url):
+        """Загрузка страницы с повторами, возвращает тело ответа (bytes)"""
+        await self.open()
+        attempt = 0
+        while True:
+            if self.rate_limits is not None:
+                await self.rate_limits.acquire_async(url)
+            if self.concurrency is not None:
+                await self.concurrency.acquire_async()
+            latency = None
+            overloaded = False
+            started = time.monotonic()
+            try:
+                async with self.session.get(url) as response:
+                    latency = time.monotonic() - started
+                    overloaded = response.status in OVERLOAD_STATUSES
+                    if response.status not in self.retry.statuses:
+                        response.raise_for_status()
+                        return await response.read()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if attempt >= self.retry.max_retries or (retry_after or 0) > RETRY_AFTER_MAX:
+                        response.raise_for_status()
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                overloaded = isinstance(e, asyncio.TimeoutError)
+                if attempt >= self.retry.max_retries:
+                    raise
+                retry_after = None
+            finally:
+                if self.concurrency is not None:
+                    self.concurrency.release(latency, overloaded)
+
+            if retry_after is not None and self.rate_limits is not None:
+                self.rate_limits.pause(url, retry_after)
+            delay = self.retry.delay(attempt, retry_after)
+            logger.warning(f"Повтор {attempt + 1}/{self.retry.max_retries} через {delay:.1f} с: {url}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()